@@ -0,0 +1,187 @@
+"""
+Модуль пакетной оценки раскладок
+Скомпилированные раскладки складываются в матрицу стоимости
+(раскладки x метрики x символы), и итоги всех раскладок для корпуса
+считаются одним умножением матрицы на вектор частот символов.
+С numpy умножение векторное, без numpy - по ненулевым элементам матрицы
+"""
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from layout_registry import FINGERS, LEFT_THUMB, CompiledLayout, get_layout
+from main import KeyboardAnalyzer
+from prefilter import fold_case
+
+# Строки метрик одной раскладки: штрафы по пальцам, нажатия по пальцам, shift, символы
+FINGER_COUNT = len(FINGERS)
+PENALTY_ROWS = 0
+COUNT_ROWS = FINGER_COUNT
+SHIFT_ROW = 2 * FINGER_COUNT
+CHARACTER_ROW = 2 * FINGER_COUNT + 1
+METRIC_COUNT = 2 * FINGER_COUNT + 2
+
+
+class LayoutBatch:
+    def __init__(self, layouts, common_chars=None, use_numpy=True, capital_shift=True):
+        """Матрица стоимости для списка раскладок (имена из реестра или CompiledLayout)
+
+        common_chars и capital_shift - как в KeyboardAnalyzer: учитываются
+        только common_chars, иначе каждая раскладка считает свои символы.
+        Столбцы матрицы: строчные символы алфавита, затем те же символы заглавными.
+        """
+        self.layouts = [layout if isinstance(layout, CompiledLayout) else get_layout(layout)
+                        for layout in layouts]
+        self.names = [layout.name for layout in self.layouts]
+        self.common_chars = common_chars
+        self.capital_shift = capital_shift
+
+        alphabet = set(common_chars) if common_chars else set()
+        for layout in self.layouts:
+            alphabet.update(layout.keys)
+            alphabet.update(layout.shift_keys)
+        self.alphabet = sorted(alphabet)
+        self.columns = {char: j for j, char in enumerate(self.alphabet)}
+
+        # Ненулевые элементы по столбцам: символ -> [(строка, значение)]
+        # Строка = индекс раскладки * METRIC_COUNT + индекс метрики
+        size = len(self.alphabet)
+        self.column_entries = [[] for _ in range(2 * size)]
+        for k, layout in enumerate(self.layouts):
+            base = k * METRIC_COUNT
+            table = layout.char_table
+            own_chars = set(layout.keys).union(layout.shift_keys)
+            for j, char in enumerate(self.alphabet):
+                entries = self.column_entries[j]
+                if common_chars:
+                    if char not in common_chars:
+                        continue
+                elif char not in own_chars:
+                    continue
+                entries.append((base + CHARACTER_ROW, 1))
+                code = ord(char)
+                entry = table[code] if code < len(table) else None
+                if entry is None:
+                    continue  # общий символ, которого нет в раскладке: считается, но без штрафа
+                finger, penalty, shift = entry
+                if penalty:
+                    entries.append((base + PENALTY_ROWS + finger, penalty))
+                entries.append((base + COUNT_ROWS + finger, 1))
+                # Shift-символ = +1 штрафа и +1 нажатие левого большого пальца;
+                # заглавная буква добавляет Shift, только если её строчная набирается без него
+                shift_entries = [(base + SHIFT_ROW, 1), (base + PENALTY_ROWS + LEFT_THUMB, 1),
+                                 (base + COUNT_ROWS + LEFT_THUMB, 1)]
+                if shift:
+                    entries.extend(shift_entries)
+                else:
+                    self.column_entries[size + j].extend(shift_entries)
+
+        self.matrix = None
+        if use_numpy and np is not None:
+            # Плотная матрица (раскладки * метрики) x символы; float64 точен для частот до 2**53
+            self.matrix = np.zeros((len(self.layouts) * METRIC_COUNT, 2 * size))
+            rows, columns, values = [], [], []
+            for j, entries in enumerate(self.column_entries):
+                for row, value in entries:
+                    rows.append(row)
+                    columns.append(j)
+                    values.append(value)
+            np.add.at(self.matrix, (rows, columns), values)
+
+    def histogram_vector(self, histogram):
+        """Вектор частот: строчные символы алфавита, затем заглавные (как в analyze_histogram)"""
+        size = len(self.alphabet)
+        vector = [0] * (2 * size)
+        columns = self.columns
+        lowered, capitals = fold_case(histogram, self.capital_shift)
+        for offset, counts in ((0, lowered), (size, capitals)):
+            for char, count in counts.items():
+                j = columns.get(char)
+                if j is not None:
+                    vector[offset + j] += count
+        return vector
+
+    def score(self, histogram, text_name=''):
+        """Итоги всех раскладок для гистограммы корпуса (BatchScores)"""
+        vector = self.histogram_vector(histogram)
+        if self.matrix is not None:
+            totals = array('q', np.rint(self.matrix @ np.array(vector, dtype=np.float64))
+                           .astype(np.int64).tobytes())
+        else:
+            totals = array('q', bytes(8 * len(self.layouts) * METRIC_COUNT))
+            for entries, count in zip(self.column_entries, vector):
+                if count:
+                    for row, value in entries:
+                        totals[row] += value * count
+        return BatchScores(self.layouts, totals, text_name)
+
+
+class BatchScores:
+    """Итоги пакетной оценки: одна строка из METRIC_COUNT чисел на раскладку"""
+
+    def __init__(self, layouts, totals, text_name=''):
+        self.layouts = layouts  # CompiledLayout в порядке строк
+        self.names = [layout.name for layout in layouts]
+        self.totals = totals  # array('q'), раскладки x метрики
+        self.text_name = text_name
+
+    def __len__(self):
+        return len(self.names)
+
+    def _row(self, k):
+        base = k * METRIC_COUNT
+        return self.totals[base:base + METRIC_COUNT]
+
+    def total_penalty(self, k):
+        return sum(self._row(k)[PENALTY_ROWS:PENALTY_ROWS + FINGER_COUNT])
+
+    def average_penalty(self, k):
+        characters = self.totals[k * METRIC_COUNT + CHARACTER_ROW]
+        return self.total_penalty(k) / characters if characters > 0 else 0
+
+    def ranking(self):
+        """Индексы раскладок от меньшего среднего штрафа к большему"""
+        return sorted(range(len(self)), key=self.average_penalty)
+
+    def result(self, k):
+        """Словарь результата раскладки k в формате KeyboardAnalyzer.analyze_histogram"""
+        row = self._row(k)
+        return KeyboardAnalyzer(self.layouts[k]).make_result(
+            self.text_name,
+            list(row[PENALTY_ROWS:PENALTY_ROWS + FINGER_COUNT]),
+            list(row[COUNT_ROWS:COUNT_ROWS + FINGER_COUNT]),
+            row[CHARACTER_ROW], row[SHIFT_ROW])
+
+    def to_numpy(self):
+        """Структурированный массив numpy: одна запись на раскладку"""
+        if np is None:
+            raise ImportError("для to_numpy нужен numpy")
+        dtype = np.dtype([
+            ('layout', f"U{max(map(len, self.names), default=1)}"),
+            ('total_penalty', np.int64),
+            ('average_penalty', np.float64),
+            ('characters_analyzed', np.int64),
+            ('shift_count', np.int64),
+            ('finger_penalties', np.int64, (FINGER_COUNT,)),
+            ('finger_counts', np.int64, (FINGER_COUNT,))
+        ])
+        totals = np.frombuffer(self.totals, dtype=np.int64).reshape(len(self), METRIC_COUNT)
+        records = np.zeros(len(self), dtype=dtype)
+        records['layout'] = self.names
+        records['finger_penalties'] = totals[:, PENALTY_ROWS:PENALTY_ROWS + FINGER_COUNT]
+        records['finger_counts'] = totals[:, COUNT_ROWS:COUNT_ROWS + FINGER_COUNT]
+        records['total_penalty'] = records['finger_penalties'].sum(axis=1)
+        records['characters_analyzed'] = totals[:, CHARACTER_ROW]
+        records['shift_count'] = totals[:, SHIFT_ROW]
+        characters = np.maximum(records['characters_analyzed'], 1)
+        records['average_penalty'] = np.where(records['characters_analyzed'] > 0,
+                                              records['total_penalty'] / characters, 0)
+        return records
+
+
+def score_layouts(layouts, histogram, text_name='', common_chars=None):
+    """Пакетная оценка списка раскладок на одной гистограмме"""
+    return LayoutBatch(layouts, common_chars).score(histogram, text_name)
@@ -0,0 +1,295 @@
+"""
+Модуль замеров скорости анализатора
+Генерирует синтетические русские корпуса заданного размера, замеряет время,
+символы в секунду и пиковую память каждого режима анализа для каждой
+раскладки и сравнивает результаты с сохранённым базовым JSON
+
+Запуск: python benchmark.py --sizes 1MB,100MB,1GB --baseline baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+# Частоты букв русского языка, % (по корпусу художественных текстов)
+LETTER_FREQUENCIES = {
+    'о': 10.97, 'е': 8.45, 'а': 8.01, 'и': 7.35, 'н': 6.70, 'т': 6.26, 'с': 5.47,
+    'р': 4.73, 'в': 4.54, 'л': 4.40, 'к': 3.49, 'м': 3.21, 'д': 2.98, 'п': 2.81,
+    'у': 2.62, 'я': 2.01, 'ы': 1.90, 'ь': 1.74, 'г': 1.70, 'з': 1.65, 'б': 1.59,
+    'ч': 1.44, 'й': 1.21, 'х': 0.97, 'ж': 0.94, 'ш': 0.73, 'ю': 0.64, 'ц': 0.48,
+    'щ': 0.36, 'э': 0.32, 'ф': 0.26, 'ъ': 0.04, 'ё': 0.04
+}
+# Знаки после слова и их вероятности (остальное - просто пробел)
+PUNCTUATION = {',': 0.07, '.': 0.05, '!': 0.004, '?': 0.004, ';': 0.002, ':': 0.003}
+SENTENCE_ENDS = '.!?'
+
+SIZES = {'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30}
+DEFAULT_SIZES = '1MB,100MB,1GB'
+MODES = ['text', 'stream', 'mmap', 'parallel', 'transitions', 'penalty']
+TEXT_MODE_LIMIT = 200 << 20  # режим text держит весь текст в памяти: только для небольших корпусов
+CORPUS_DIR = os.path.join(tempfile.gettempdir(), 'keyboard_typing_benchmark')
+# Поля пиковой памяти результата замера и их названия в отчёте о регрессиях
+MEMORY_FIELDS = {'peak_rss_mb': 'память', 'children_peak_rss_mb': 'память воркеров'}
+
+
+def parse_size(size):
+    """'100MB' -> 104857600"""
+    size = size.strip().upper()
+    for suffix, factor in SIZES.items():
+        if size.endswith(suffix):
+            return int(float(size[:-len(suffix)]) * factor)
+    return int(size)
+
+
+def make_vocabulary(rng, words=20000):
+    """Словарь синтетических слов с частотами букв русского языка"""
+    letters = list(LETTER_FREQUENCIES)
+    weights = list(LETTER_FREQUENCIES.values())
+    vocabulary = []
+    for _ in range(words):
+        length = min(max(int(rng.gauss(5.5, 2.5)), 1), 15)
+        vocabulary.append(''.join(rng.choices(letters, weights, k=length)))
+    return vocabulary
+
+
+def generate_corpus(path, size, seed=0):
+    """Пишет в path синтетический русский текст размером около size байт
+
+    Слова выбираются по закону Ципфа, предложения начинаются с заглавной
+    буквы и заканчиваются точкой, абзацы разделяются переводом строки.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    word_weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    marks = list(PUNCTUATION) + [' ']
+    mark_weights = list(PUNCTUATION.values()) + [1 - sum(PUNCTUATION.values())]
+
+    written = 0
+    capitalize = True
+    with open(path, 'wb') as file:
+        while written < size:
+            words = rng.choices(vocabulary, word_weights, k=10000)
+            tails = rng.choices(marks, mark_weights, k=10000)
+            parts = []
+            for word, tail in zip(words, tails):
+                if capitalize:
+                    word = word.capitalize()
+                capitalize = tail in SENTENCE_ENDS
+                parts.append(word)
+                parts.append(tail if tail == ' ' else tail + ' ')
+                if capitalize and rng.random() < 0.2:
+                    parts.append('\n')
+            chunk = ''.join(parts).encode('utf-8')
+            file.write(chunk)
+            written += len(chunk)
+
+
+def corpus_path(size, corpus_dir=CORPUS_DIR, seed=0):
+    """Путь к корпусу нужного размера; корпус генерируется один раз"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    path = os.path.join(corpus_dir, f"corpus_{size}_{seed}.txt")
+    if not os.path.exists(path):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        generate_corpus(temp_path, size, seed)
+        os.replace(temp_path, path)
+    return path
+
+
+def _peak_rss_mb(who):
+    """Пиковая память, МБ (ru_maxrss: КБ в Linux, байты в macOS)
+
+    who - resource.RUSAGE_SELF (сам процесс замера) или resource.RUSAGE_CHILDREN
+    (самый большой из завершённых дочерних процессов: воркеры пула в режиме parallel).
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(mode, layout, path, repeats=3, jobs=None):
+    """Один замер в отдельном процессе: лучшее время из repeats, символы/с, пиковая память"""
+    from corpus import mmap_histogram
+    from main import KeyboardAnalyzer
+    from transitions import TransitionAnalyzer
+
+    analyzer = KeyboardAnalyzer(layout)
+    with open(path, encoding='utf-8', newline='') as file:
+        characters = sum(len(chunk) for chunk in iter(lambda: file.read(1 << 20), ''))
+
+    if mode == 'text':
+        with open(path, encoding='utf-8', newline='') as file:
+            text = file.read()
+        work = lambda: analyzer.analyze_text(text, 'benchmark')
+    elif mode == 'stream':
+        work = lambda: analyzer.analyze_file(path, 'benchmark')
+    elif mode == 'mmap':
+        work = lambda: analyzer.analyze_histogram(mmap_histogram(path), 'benchmark')
+    elif mode == 'parallel':
+        work = lambda: analyzer.analyze_all_files(files=[(path, 'benchmark')], jobs=jobs)
+    elif mode == 'transitions':
+        transitions = TransitionAnalyzer(analyzer)
+        work = lambda: transitions.analyze_file(path, 'benchmark')
+    elif mode == 'penalty':
+        # Микрозамер _calculate_penalty: по одному вызову на каждую клавишу раскладки
+        keys = (list(analyzer.keys.values()) + list(analyzer.shift_keys.values())) * 10000
+        characters = len(keys)
+
+        def work():
+            for key_code, finger in keys:
+                analyzer._calculate_penalty(key_code, finger)
+    else:
+        raise ValueError(f"Неизвестный режим замера: {mode}")
+
+    timings = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            work()
+            timings.append(time.perf_counter() - start)
+    seconds = min(timings)
+    return {
+        'seconds': seconds,
+        'characters': characters,
+        'chars_per_second': characters / seconds if seconds > 0 else 0,
+        'peak_rss_mb': _peak_rss_mb(resource.RUSAGE_SELF),
+        # Пик воркеров пула (режим parallel) - отдельно: пики разных процессов не складываются
+        'children_peak_rss_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    }
+
+
+class CaseFailed(RuntimeError):
+    """Процесс замера не вернул результат"""
+
+
+def _case_process(connection, *args):
+    """Тело процесса замера: результат или текст ошибки отправляется в канал"""
+    try:
+        connection.send(run_case(*args))
+    except Exception as e:
+        connection.send(e)
+    finally:
+        connection.close()
+
+
+def run_isolated(mode, layout, path, repeats, jobs):
+    """Замер в новом процессе, чтобы пиковая память не смешивалась между замерами
+
+    Обычный (не демонический) процесс: режиму parallel нужен свой пул процессов.
+    """
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_case_process,
+                              args=(sender, mode, layout, path, repeats, jobs))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = None  # процесс умер, не отправив результат (например, убит из-за памяти)
+    process.join()
+    if result is None:
+        raise CaseFailed(f"процесс замера завершился без результата (код {process.exitcode})")
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Список регрессий: замедление или рост памяти больше допуска"""
+    regressions = []
+    for case, result in results.items():
+        reference = baseline.get(case)
+        if not reference or 'error' in reference:
+            continue
+        if 'error' in result:
+            regressions.append(f"{case}: замер не выполнен: {result['error']}")
+            continue
+        if result['chars_per_second'] < reference['chars_per_second'] * (1 - tolerance):
+            regressions.append(f"{case}: скорость {result['chars_per_second']:.0f} симв/с, "
+                               f"базовая {reference['chars_per_second']:.0f}")
+        for field, label in MEMORY_FIELDS.items():
+            # В старых базовых JSON нет поля памяти воркеров: сравнивать не с чем
+            if field not in reference or field not in result:
+                continue
+            if result[field] > reference[field] * (1 + tolerance):
+                regressions.append(f"{case}: {label} {result[field]:.1f} МБ, "
+                                   f"базовая {reference[field]:.1f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры скорости анализатора раскладок")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="размеры корпусов через запятую")
+    parser.add_argument('--layouts', default='standard,challenge,zubachev')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=None, help="процессов для режима parallel")
+    parser.add_argument('--corpus-dir', default=CORPUS_DIR)
+    parser.add_argument('--output', help="сохранить результаты в JSON")
+    parser.add_argument('--baseline', help="базовый JSON для сравнения")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="записать результаты в --baseline вместо сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="допустимое ухудшение (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    layouts = args.layouts.split(',')
+    modes = args.modes.split(',')
+    results = {}
+
+    print(f"{'Замер':<36} {'Время, с':<10} {'Символов/с':<14} {'Память, МБ':<12} "
+          f"{'Воркеры, МБ':<12}")
+    print('-' * 86)
+    for size_name in args.sizes.split(','):
+        size = parse_size(size_name)
+        path = corpus_path(size, args.corpus_dir)
+        for mode in modes:
+            if mode == 'text' and size > TEXT_MODE_LIMIT:
+                continue
+            if mode == 'penalty' and size_name != args.sizes.split(',')[0]:
+                continue  # от размера корпуса не зависит
+            for layout in layouts:
+                case = f"{size_name}/{layout}/{mode}"
+                try:
+                    result = run_isolated(mode, layout, path, args.repeats, args.jobs)
+                except Exception as e:
+                    results[case] = {'error': f"{type(e).__name__}: {e}"}
+                    print(f"{case:<36} ОШИБКА: {results[case]['error']}")
+                    continue
+                results[case] = result
+                print(f"{case:<36} {result['seconds']:<10.3f} "
+                      f"{result['chars_per_second']:<14.0f} {result['peak_rss_mb']:<12.1f} "
+                      f"{result['children_peak_rss_mb']:<12.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        print(f"\nБазовые результаты сохранены в {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nРЕГРЕССИИ:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nРегрессий нет")
+    # Упавший замер - ошибка прогона, даже если сравнивать не с чем
+    if any('error' in result for result in results.values()):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Модуль дискового кэша гистограмм корпусов
+Гистограммы символов и пар символов хранятся в компактных двоичных файлах,
+ключ - хэш содержимого файла, поэтому изменённый файл пересчитывается сам
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+
+from corpus import SCAN_MODES, file_pair_histogram
+
+CACHE_DIR = os.environ.get(
+    'KEYBOARD_TYPING_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'keyboard_typing')
+)
+CACHE_LIMIT = 256 << 20  # байт на все записи кэша
+
+# Заголовок записи: сигнатура вида гистограммы + число строк
+# Версия 2: гистограммы строятся по тексту в форме NFC, записи версии 1 пересчитываются
+# Версия 3: куски текста не отрывают чамо хангыля от слога при нормализации
+MAGIC = {'chars': b'KTC3', 'pairs': b'KTP3'}
+HEADER = struct.Struct('<4sQ')
+INDEX_NAME = 'index.json'
+HASH_BLOCK = 1 << 20
+
+
+def content_hash(filename):
+    """Хэш содержимого файла (читается блоками)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _little_endian(column):
+    """Записи кэша всегда хранятся в порядке байт little-endian"""
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+def encode_histogram(kind, histogram):
+    """Гистограмма -> байты: заголовок, колонки кодов символов, колонка частот"""
+    items = sorted(histogram.items())
+    if kind == 'chars':
+        columns = [array('I', (ord(char) for char, _ in items))]
+    else:
+        columns = [array('I', (ord(pair[0]) for pair, _ in items)),
+                   array('I', (ord(pair[1]) for pair, _ in items))]
+    columns.append(array('Q', (count for _, count in items)))
+    return HEADER.pack(MAGIC[kind], len(items)) + b''.join(
+        _little_endian(column).tobytes() for column in columns)
+
+
+def decode_histogram(kind, data):
+    """Байты -> гистограмма (Counter); ValueError для повреждённой записи"""
+    magic, rows = HEADER.unpack_from(data)
+    if magic != MAGIC[kind]:
+        raise ValueError(f"неверная сигнатура записи кэша: {magic!r}")
+
+    columns = []
+    offset = HEADER.size
+    for typecode in ('I', 'I', 'Q') if kind == 'pairs' else ('I', 'Q'):
+        column = array(typecode)
+        end = offset + rows * column.itemsize
+        column.frombytes(data[offset:end])
+        columns.append(_little_endian(column))
+        offset = end
+    if offset != len(data):
+        raise ValueError("неверный размер записи кэша")
+
+    if kind == 'chars':
+        return Counter(dict(zip(map(chr, columns[0]), columns[1])))
+    return Counter(dict(zip(zip(map(chr, columns[0]), map(chr, columns[1])), columns[2])))
+
+
+class HistogramCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_LIMIT):
+        """Кэш в каталоге directory, общий размер записей не больше max_bytes"""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = None
+
+    def _load_index(self):
+        """Индекс: путь к файлу -> [размер, mtime, хэш содержимого]"""
+        if self._index is None:
+            try:
+                with open(os.path.join(self.directory, INDEX_NAME), encoding='utf-8') as file:
+                    self._index = json.load(file)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        try:
+            self._write_atomic(INDEX_NAME, json.dumps(self._index).encode('utf-8'))
+        except OSError:
+            pass  # без индекса кэш работает, просто хэш считается заново
+
+    def _write_atomic(self, name, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+    def file_key(self, filename):
+        """Хэш содержимого файла
+
+        Если размер и время изменения файла совпадают с индексом,
+        хэш берётся из индекса без чтения файла.
+        """
+        stat = os.stat(filename)
+        path = os.path.abspath(filename)
+        index = self._load_index()
+        entry = index.get(path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        key = content_hash(filename)
+        index[path] = [stat.st_size, stat.st_mtime_ns, key]
+        self._save_index()
+        return key
+
+    def _entry_path(self, key, kind):
+        return os.path.join(self.directory, f"{key}.{kind}.bin")
+
+    def load(self, filename, kind='chars'):
+        """Гистограмма из кэша или None, если записи нет или файл изменился"""
+        path = self._entry_path(self.file_key(filename), kind)
+        try:
+            with open(path, 'rb') as file:
+                histogram = decode_histogram(kind, file.read())
+        except (OSError, ValueError, struct.error):
+            return None
+        try:
+            os.utime(path)  # отметка последнего использования для вытеснения LRU
+        except OSError:
+            pass
+        return histogram
+
+    def store(self, filename, histogram, kind='chars'):
+        """Сохраняет гистограмму файла и вытесняет самые старые записи
+
+        Ошибка записи не мешает анализу: запись просто не попадает в кэш.
+        """
+        try:
+            key = self.file_key(filename)
+            self._write_atomic(os.path.basename(self._entry_path(key, kind)),
+                               encode_histogram(kind, histogram))
+            self._evict()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Удаляет давно не использованные записи, пока кэш больше max_bytes"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.bin'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def char_histogram(self, filename, progress=None, scan='text'):
+        """Гистограмма символов файла: из кэша или чтением способом scan (corpus.SCAN_MODES)"""
+        histogram = self.load(filename, 'chars')
+        if histogram is None:
+            histogram = SCAN_MODES[scan](filename, progress=progress)
+            self.store(filename, histogram, 'chars')
+        return histogram
+
+    def pair_histogram(self, filename):
+        """Гистограмма пар символов файла: из кэша или потоковым чтением"""
+        pairs = self.load(filename, 'pairs')
+        if pairs is None:
+            pairs = file_pair_histogram(filename)
+            self.store(filename, pairs, 'pairs')
+        return pairs
@@ -0,0 +1,374 @@
+"""
+Модуль работы с корпусами текстов
+Строит частотные гистограммы символов, по которым считаются все метрики
+"""
+import mmap
+import os
+from collections import Counter
+from itertools import islice
+
+from prefilter import nfc, nfc_chunks, nfc_inert
+
+
+# Короче этого numpy не окупает создание массивов
+BINCOUNT_MIN_CHARS = 1 << 14
+
+
+def count_chars(text):
+    """Частоты символов строки: numpy.bincount по кодам символов, без numpy - Counter"""
+    if len(text) < BINCOUNT_MIN_CHARS:
+        return Counter(text)
+    try:
+        import numpy as np  # необязательная зависимость; импорт здесь, чтобы модуль грузился быстро
+    except ImportError:
+        return Counter(text)
+
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    if codes.max() < 0x10000:
+        counts = np.bincount(codes)
+        codes = np.flatnonzero(counts)
+        counts = counts[codes]
+    else:
+        codes, counts = np.unique(codes, return_counts=True)
+    return Counter(dict(zip(map(chr, codes.tolist()), counts.tolist())))
+
+
+def char_histogram(text):
+    """Частоты символов текста в форме NFC (без изменения регистра)"""
+    return count_chars(nfc(text))
+
+
+def lower_pair_histogram(pairs):
+    """Переводит гистограмму пар символов в нижний регистр"""
+    lowered = Counter()
+    for (first, second), count in pairs.items():
+        lowered[first.lower(), second.lower()] += count
+    return lowered
+
+
+# Размер одного чтения в символах: память не зависит от размера файла
+CHUNK_SIZE = 1 << 20
+
+
+class AnalysisCancelled(Exception):
+    """Анализ остановлен по запросу (исключение из обработчика progress)"""
+
+
+def read_chunks(filename, chunk_size=CHUNK_SIZE, progress=None):
+    """Читает файл кусками по chunk_size символов
+
+    UTF-8 декодируется потоково, поэтому многобайтные символы
+    (кириллица) на границе кусков не разрываются. После каждого куска
+    вызывается progress(прочитано байт, размер файла); чтобы прервать
+    чтение, обработчик может выбросить AnalysisCancelled.
+    """
+    with open(filename, 'r', encoding='utf-8', newline='') as file:
+        total = os.fstat(file.fileno()).st_size
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+            if progress is not None:
+                progress(file.buffer.tell(), total)
+
+
+def file_histogram(filename, chunk_size=CHUNK_SIZE, progress=None):
+    """Частоты символов файла (в форме NFC) без загрузки всего файла в память"""
+    histogram = Counter()
+    for chunk in nfc_chunks(read_chunks(filename, chunk_size, progress)):
+        histogram.update(count_chars(chunk))
+    return histogram
+
+
+# Размер куска файла в байтах для параллельного анализа
+CHUNK_BYTES = 8 << 20
+
+
+def byte_ranges(filename, chunk_bytes=CHUNK_BYTES):
+    """Делит файл на диапазоны байт [начало, конец) по границам символов UTF-8"""
+    size = os.path.getsize(filename)
+    boundaries = [0]
+    with open(filename, 'rb') as file:
+        position = chunk_bytes
+        while position < size:
+            file.seek(position)
+            # Байты продолжения UTF-8 имеют вид 10xxxxxx: сдвигаемся к началу символа
+            while position < size and file.read(1)[0] & 0xC0 == 0x80:
+                position += 1
+            position = _skip_to_boundary(file, position, size)
+            if position < size:
+                boundaries.append(position)
+            position += chunk_bytes
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+
+def _skip_to_boundary(file, position, size):
+    """Сдвигает начало куска за диакритические знаки и чамо: они нормализуются вместе с буквой"""
+    while position < size:
+        file.seek(position)
+        head = file.read(4).decode('utf-8', 'ignore')
+        if not head or nfc_inert(head[0]):
+            break
+        position += len(head[0].encode('utf-8'))
+    return position
+
+
+def range_histogram(filename, start, end):
+    """Частоты символов в диапазоне байт файла (выполняется в процессе-воркере)"""
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    return count_chars(nfc(data.decode('utf-8')))
+
+
+def parallel_file_histograms(filenames, jobs=None, chunk_bytes=CHUNK_BYTES):
+    """Гистограммы нескольких файлов в пуле процессов
+
+    Файлы и куски больших файлов считаются параллельно, частичные
+    гистограммы складываются в порядке кусков, поэтому результат
+    совпадает с file_histogram. Возвращает список в порядке filenames:
+    для каждого файла гистограмма или исключение, возникшее при чтении.
+    """
+    return list(iter_parallel_file_histograms(filenames, jobs, chunk_bytes))
+
+
+def iter_parallel_file_histograms(filenames, jobs=None, chunk_bytes=CHUNK_BYTES):
+    """То же, что parallel_file_histograms, но генератор
+
+    Куски всех файлов сразу отправляются в пул, а гистограмма файла
+    отдаётся, как только готовы его куски, не дожидаясь остальных файлов.
+    """
+    # multiprocessing импортируется только здесь: импорт модуля должен быть быстрым
+    from concurrent.futures import ProcessPoolExecutor
+
+    pool = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        pending = []
+        for filename in filenames:
+            try:
+                ranges = byte_ranges(filename, chunk_bytes)
+            except OSError as e:
+                pending.append(e)
+                continue
+            pending.append([pool.submit(range_histogram, filename, start, end)
+                            for start, end in ranges])
+
+        for futures in pending:
+            if isinstance(futures, Exception):
+                yield futures
+                continue
+            histogram = Counter()
+            try:
+                for future in futures:
+                    histogram.update(future.result())
+            except Exception as e:
+                histogram = e
+            yield histogram
+    finally:
+        # Генератор могли закрыть раньше времени: невыполненные куски не нужны
+        pool.shutdown(cancel_futures=True)
+
+
+def pair_histogram(text, previous=''):
+    """Частоты пар соседних символов текста
+
+    previous - последний символ предыдущего куска, чтобы не потерять
+    пару на границе кусков.
+    """
+    text = previous + text
+    return Counter(zip(text, islice(text, 1, None)))
+
+
+def file_pair_histogram(filename, chunk_size=CHUNK_SIZE):
+    """Частоты пар соседних символов файла за один потоковый проход"""
+    pairs = Counter()
+    previous = ''
+    for chunk in nfc_chunks(read_chunks(filename, chunk_size)):
+        pairs.update(pair_histogram(chunk, previous))
+        previous = chunk[-1]
+    return pairs
+
+
+def read_ngram_table(filename, progress=None):
+    """Частотная таблица n-грамм: строки вида 'n-грамма<TAB>частота'
+
+    Каждая строка учитывается один раз с весом частоты, поэтому время
+    зависит от числа строк, а не от суммы частот. Возвращает
+    (гистограмма символов, гистограмма пар, число пропущенных строк):
+    в первую идут 1-граммы, во вторую 2-граммы; строки другого вида
+    (разметка, заголовки, n-граммы длиннее двух) пропускаются.
+    """
+    unigrams = Counter()
+    pairs = Counter()
+    skipped = 0
+    with open(filename, 'r', encoding='utf-8') as file:
+        total = os.fstat(file.fileno()).st_size
+        for line_number, line in enumerate(file, 1):
+            ngram, separator, count = line.rstrip('\n').rpartition('\t')
+            count = count.strip()
+            if not separator or not count.isascii() or not count.isdigit():
+                skipped += 1
+            elif len(ngram) == 1:
+                unigrams[ngram] += int(count)
+            elif len(ngram) == 2:
+                pairs[ngram[0], ngram[1]] += int(count)
+            else:
+                skipped += 1
+            if progress is not None and line_number % 100000 == 0:
+                progress(file.buffer.tell(), total)
+    return unigrams, pairs, skipped
+
+
+# Наименьший код символа UTF-8 каждой длины: меньшие коды - запрещённая избыточная запись
+UTF8_MIN_CODES = {2: 0x80, 3: 0x800, 4: 0x10000}
+
+
+def _utf8_codes(window, start, width, lead_mask):
+    """Коды символов UTF-8 длины width по позициям start ведущих байт
+
+    Как и декодер Python, отвергает избыточную запись, суррогаты и коды больше 0x10FFFF.
+    """
+    import numpy as np
+
+    codes = (window[start] & lead_mask).astype(np.uint32)
+    for offset in range(1, width):
+        following = window[start + offset]
+        if not ((following & 0xC0) == 0x80).all():
+            raise ValueError("файл не в кодировке UTF-8")
+        codes = (codes << 6) | (following & 0x3F)
+    invalid = codes < UTF8_MIN_CODES[width]
+    if width == 3:
+        invalid |= (codes >= 0xD800) & (codes <= 0xDFFF)
+    elif width == 4:
+        invalid |= codes > 0x10FFFF
+    if invalid.any():
+        raise ValueError("файл не в кодировке UTF-8")
+    return codes
+
+
+def _scan_window(window, totals, rare):
+    """Добавляет в totals (коды до 0xFFFF) и rare (остальные) частоты символов окна байт"""
+    import numpy as np
+
+    ascii_bytes = window[window < 0x80]
+    totals[:0x80] += np.bincount(ascii_bytes, minlength=0x80)
+    classified = len(ascii_bytes)
+    # (длина, биты кода в ведущем байте, маска и значение ведущего байта)
+    for width, lead_mask, pattern_mask, pattern in ((2, 0x1F, 0xE0, 0xC0), (3, 0x0F, 0xF0, 0xE0),
+                                                    (4, 0x07, 0xF8, 0xF0)):
+        start = np.flatnonzero((window & pattern_mask) == pattern)
+        if not len(start):
+            continue
+        if start[-1] + width > len(window):
+            raise ValueError("файл не в кодировке UTF-8: оборванный символ в конце")
+        codes = _utf8_codes(window, start, width, lead_mask)
+        classified += len(start) * width
+        if width < 4:
+            totals += np.bincount(codes, minlength=len(totals))[:len(totals)]
+        else:
+            values, counts = np.unique(codes, return_counts=True)
+            rare.update(dict(zip(values.tolist(), counts.tolist())))
+    # Каждый байт окна должен принадлежать ровно одному символу
+    if classified != len(window):
+        raise ValueError("файл не в кодировке UTF-8")
+
+
+# Окно сканирования байт: временные массивы numpy в несколько раз больше окна
+SCAN_WINDOW_BYTES = 1 << 20
+
+
+def mmap_histogram(filename, window_bytes=SCAN_WINDOW_BYTES, progress=None):
+    """Частоты символов файла прямо по байтам UTF-8 отображённого в память файла
+
+    С numpy строки не декодируются вовсе: ведущие байты и байты продолжения
+    складываются в коды символов окнами по window_bytes, память ограничена
+    окном, а не файлом. Без numpy окна декодируются по очереди (тоже
+    с ограниченной памятью). Результат совпадает с file_histogram: если
+    в файле есть символы, которые может изменить нормализация NFC
+    (диакритические знаки, чамо хангыля, символы вроде 'Ω' U+2126),
+    файл перечитывается через file_histogram.
+    """
+    try:
+        import numpy as np  # импортируется здесь, чтобы импорт модуля оставался быстрым
+    except ImportError:
+        np = None
+
+    size = os.path.getsize(filename)
+    if size == 0:
+        return Counter()
+
+    with open(filename, 'rb') as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        ranges = _window_ranges(mapped, size, window_bytes)
+        if np is None:
+            histogram = Counter()
+            for start, end in ranges:
+                histogram.update(mapped[start:end].decode('utf-8'))
+                if progress is not None:
+                    progress(end, size)
+        else:
+            try:
+                histogram = _scan_mapped(np, mapped, ranges, size, progress)
+            except BaseException as e:
+                # Кадры трассировки держат представления numpy, а с ними закрыть mmap нельзя
+                error = e.with_traceback(None)
+            else:
+                error = None
+            if error is not None:
+                raise error
+
+    if not all(nfc_inert(char) for char in histogram):
+        return file_histogram(filename, progress=progress)
+    return histogram
+
+
+def _scan_mapped(np, mapped, ranges, size, progress):
+    """Гистограмма отображённого файла по окнам байт (numpy)"""
+    buffer = np.frombuffer(mapped, dtype=np.uint8)
+    totals = np.zeros(0x10000, dtype=np.int64)
+    rare = Counter()
+    released = 0
+    for start, end in ranges:
+        try:
+            _scan_window(buffer[start:end], totals, rare)
+            valid = True
+        except ValueError:
+            valid = False
+        if not valid:
+            # Та же ошибка UnicodeDecodeError, что и при чтении в режиме text
+            # (вне except: цепочка исключений держала бы представления numpy)
+            mapped[start:end].decode('utf-8')
+            raise ValueError("файл не в кодировке UTF-8")
+        # Прочитанные страницы файла больше не нужны: не держим их в памяти процесса
+        page_end = end - end % mmap.PAGESIZE
+        if hasattr(mmap, 'MADV_DONTNEED') and page_end > released:
+            mapped.madvise(mmap.MADV_DONTNEED, released, page_end - released)
+            released = page_end
+        if progress is not None:
+            progress(end, size)
+    codes = np.flatnonzero(totals)
+    histogram = Counter(dict(zip(map(chr, codes.tolist()), totals[codes].tolist())))
+    histogram.update({chr(code): count for code, count in rare.items()})
+    return histogram
+
+
+def _window_ranges(mapped, size, window_bytes):
+    """Диапазоны окон [начало, конец), которые не разрывают символы UTF-8"""
+    ranges = []
+    start = 0
+    while start < size:
+        end = min(start + window_bytes, size)
+        # Байты продолжения UTF-8 имеют вид 10xxxxxx: конец окна - начало символа
+        while start < end < size and mapped[end] & 0xC0 == 0x80:
+            end -= 1
+        if end == start:
+            end = min(start + window_bytes, size)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+# Способы чтения файла в гистограмму: потоковое декодирование или сканирование байт
+SCAN_MODES = {'text': file_histogram, 'mmap': mmap_histogram}
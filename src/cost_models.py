@@ -0,0 +1,263 @@
+"""
+Модуль моделей стоимости набора
+Модель оценивает время набора корпуса: время нажатия (скорость пальца
+и путь от домашней позиции по геометрии клавиатуры), Shift и задержки
+переходов между соседними нажатиями (один палец, одна рука, прыжок через ряд).
+Для раскладки модель один раз компилируется в таблицы по символам и парам
+клавиш, поэтому подсчёт по корпусу - те же обращения к спискам, что
+в analyze_histogram, какую бы модель ни подставили
+"""
+import math
+
+from layout_registry import (FINGERS, KEYBOARD_MAP, LEFT_THUMB, CompiledLayout, capital_shifts,
+                             get_layout)
+from main import KeyboardAnalyzer
+from prefilter import fold_case
+from transitions import THUMBS, TransitionAnalyzer
+
+# Сдвиг рядов обычной клавиатуры вправо относительно цифрового ряда, в ширинах клавиши
+ROW_STAGGER = {0: 0.0, 1: 0.5, 2: 0.75, 3: 1.25, 4: 0.0}
+
+# Множитель времени пальца: чем больше, тем медленнее палец
+DEFAULT_FINGER_SPEED = {
+    'left_pinky': 1.5, 'left_ring': 1.25, 'left_middle': 1.05, 'left_index': 1.0,
+    'right_index': 1.0, 'right_middle': 1.05, 'right_ring': 1.25, 'right_pinky': 1.5,
+    'left_thumb': 1.0, 'right_thumb': 1.0
+}
+
+
+class Geometry:
+    def __init__(self, metric='manhattan', stagger=None, row_weight=1.0):
+        """Расстояние между клавишами KEYBOARD_MAP
+
+        metric - 'manhattan' или 'euclidean', stagger - сдвиг рядов (ROW_STAGGER)
+        или None для прямой сетки, row_weight - цена шага по вертикали.
+        """
+        if metric not in ('manhattan', 'euclidean'):
+            raise ValueError(f"Неизвестная метрика расстояния: {metric}")
+        self.metric = metric
+        self.stagger = stagger or {}
+        self.row_weight = row_weight
+
+    def position(self, key_code):
+        """Координаты (x, y) клавиши в ширинах клавиши или None"""
+        coords = KEYBOARD_MAP.get(key_code)
+        if not coords:
+            return None
+        row, col = coords
+        return col + self.stagger.get(row, 0.0), row * self.row_weight
+
+    def distance(self, first_code, second_code):
+        """Расстояние между клавишами; 0, если одной из них нет на карте"""
+        first = self.position(first_code)
+        second = self.position(second_code)
+        if not first or not second:
+            return 0
+        dx = abs(first[0] - second[0])
+        dy = abs(first[1] - second[1])
+        if self.metric == 'euclidean':
+            return math.hypot(dx, dy)
+        return dx + dy
+
+
+GEOMETRIES = {
+    'manhattan': Geometry('manhattan'),
+    'euclidean': Geometry('euclidean'),
+    'staggered': Geometry('euclidean', ROW_STAGGER)
+}
+
+
+class CostModel:
+    def __init__(self, name, geometry='staggered', finger_speed=None, base_time=150.0,
+                 travel_time=40.0, shift_time=80.0, repeat_time=40.0, same_finger_time=60.0,
+                 same_finger_travel_time=40.0, same_hand_time=15.0, row_jump_time=30.0,
+                 alternation_time=0.0):
+        """Модель времени набора, все времена - в миллисекундах
+
+        Нажатие: (base_time + travel_time * путь от домашней позиции) * множитель пальца.
+        Переход к следующей клавише: смена руки - alternation_time, та же рука -
+        same_hand_time (+ row_jump_time при прыжке через ряд), тот же палец на другую
+        клавишу - ещё same_finger_time и same_finger_travel_time * путь между клавишами,
+        та же клавиша - repeat_time.
+        Для своей модели достаточно переопределить key_time и transition_time.
+        """
+        self.name = name
+        self.geometry = GEOMETRIES[geometry] if isinstance(geometry, str) else geometry
+        self.finger_speed = dict(DEFAULT_FINGER_SPEED)
+        if finger_speed:
+            self.finger_speed.update(finger_speed)
+        self.base_time = base_time
+        self.travel_time = travel_time
+        self.shift_time = shift_time
+        self.repeat_time = repeat_time
+        self.same_finger_time = same_finger_time
+        self.same_finger_travel_time = same_finger_travel_time
+        self.same_hand_time = same_hand_time
+        self.row_jump_time = row_jump_time
+        self.alternation_time = alternation_time
+
+    def key_time(self, key_code, finger, home_positions):
+        """Время нажатия клавиши пальцем; большой палец не сходит с места"""
+        distance = 0
+        if finger not in THUMBS:
+            distance = self.geometry.distance(home_positions[finger], key_code)
+        return (self.base_time + self.travel_time * distance) * self.finger_speed[finger]
+
+    def transition_time(self, first_code, first_finger, second_code, second_finger):
+        """Задержка перехода от одной клавиши к следующей"""
+        if first_finger in THUMBS or second_finger in THUMBS:
+            return 0.0
+        if first_finger.split('_')[0] != second_finger.split('_')[0]:
+            return self.alternation_time
+
+        time = self.same_hand_time
+        first_coords = KEYBOARD_MAP.get(first_code)
+        second_coords = KEYBOARD_MAP.get(second_code)
+        if first_coords and second_coords and abs(first_coords[0] - second_coords[0]) >= 2:
+            time += self.row_jump_time
+        if first_code == second_code:
+            time += self.repeat_time
+        elif first_finger == second_finger:
+            distance = self.geometry.distance(first_code, second_code)
+            time += (self.same_finger_time
+                     + self.same_finger_travel_time * distance * self.finger_speed[first_finger])
+        return time
+
+    def compile(self, layout, capital_shift=True):
+        """Таблицы модели для раскладки (имя из реестра или CompiledLayout)"""
+        return CompiledCostModel(self, layout, capital_shift)
+
+
+class CompiledCostModel:
+    def __init__(self, model, layout, capital_shift=True):
+        """Таблица символов (палец, время, shift) и таблица задержек пар клавиш"""
+        if not isinstance(layout, CompiledLayout):
+            layout = get_layout(layout)
+        self.model = model
+        self.layout = layout.name
+        self.capital_shift = capital_shift
+        self.allowed_chars = set(layout.keys).union(layout.shift_keys)
+
+        # Как в CompiledLayout.char_table: обычная клавиша имеет приоритет над shift
+        self.char_table = [None] * len(layout.char_table)
+        for shift, keys in ((1, layout.shift_keys), (0, layout.keys)):
+            for char, (key_code, finger) in keys.items():
+                time = model.key_time(key_code, finger, layout.home_positions)
+                self.char_table[ord(char)] = (FINGERS.index(finger), time, shift)
+
+        # Пары нумеруются так же, как в TransitionAnalyzer: индекс = i * size + j
+        self.transitions = TransitionAnalyzer(KeyboardAnalyzer(layout, capital_shift))
+        positions = dict(layout.shift_keys)
+        positions.update(layout.keys)
+        keys = [positions[char] for char in self.transitions.slot_chars]
+        self.pair_time = [model.transition_time(first_code, first_finger, second_code, second_finger)
+                          for first_code, first_finger in keys
+                          for second_code, second_finger in keys]
+
+    def estimate(self, histogram, text_name, pairs=None, common_chars=None):
+        """Оценка времени набора по частотам символов и (если есть) пар символов"""
+        histogram, capitals = fold_case(histogram, self.capital_shift)
+        allowed_chars = common_chars if common_chars else self.allowed_chars
+
+        finger_time = [0.0] * len(FINGERS)
+        character_count = 0
+        shift_count = 0
+        table = self.char_table
+        table_size = len(table)
+        for char, count in histogram.items():
+            if char not in allowed_chars:
+                continue
+            character_count += count
+            code = ord(char)
+            entry = table[code] if code < table_size else None
+            if entry is not None:
+                finger, time, shift = entry
+                finger_time[finger] += time * count
+                shift_count += shift * count
+        shift_count += capital_shifts(capitals, table, allowed_chars)
+
+        key_time = sum(finger_time)
+        shift_time = shift_count * self.model.shift_time
+        finger_time[LEFT_THUMB] += shift_time
+
+        pair_count = 0
+        transition_time = 0.0
+        if pairs:
+            pair_time = self.pair_time
+            for index, count in enumerate(self.transitions.count_matrix(pairs, common_chars)):
+                if count:
+                    pair_count += count
+                    transition_time += pair_time[index] * count
+
+        total_time = key_time + shift_time + transition_time
+        return {
+            'text_name': text_name,
+            'layout': self.layout,
+            'model': self.model.name,
+            'characters_analyzed': character_count,
+            'shift_count': shift_count,
+            'pair_count': pair_count,
+            'key_time_ms': key_time,
+            'shift_time_ms': shift_time,
+            'transition_time_ms': transition_time,
+            'total_time_ms': total_time,
+            'finger_time_ms': dict(zip(FINGERS, finger_time)),
+            'average_time_ms': total_time / character_count if character_count > 0 else 0,
+            'chars_per_minute': character_count / total_time * 60000 if total_time > 0 else 0
+        }
+
+
+# Модели по именам: 'distance' в единицах штрафа повторяет analyze_histogram
+MODELS = {}
+
+
+def register_model(model):
+    """Добавляет модель в MODELS (модель с тем же именем заменяется)"""
+    MODELS[model.name] = model
+    return model
+
+
+def get_model(name):
+    try:
+        return MODELS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестная модель стоимости: {name}") from None
+
+
+register_model(CostModel('distance', 'manhattan', finger_speed=dict.fromkeys(FINGERS, 1.0),
+                         base_time=0.0, travel_time=1.0, shift_time=1.0, repeat_time=0.0,
+                         same_finger_time=0.0, same_finger_travel_time=0.0, same_hand_time=0.0,
+                         row_jump_time=0.0))
+register_model(CostModel('timing'))
+register_model(CostModel('timing-grid', 'euclidean'))
+
+
+def estimate_typing_time(layouts, histogram, text_name, pairs=None, model='timing',
+                         common_chars=None, capital_shift=True):
+    """Оценка времени набора одного корпуса на каждой раскладке списка"""
+    if isinstance(model, str):
+        model = get_model(model)
+    return [model.compile(layout, capital_shift).estimate(histogram, text_name, pairs, common_chars)
+            for layout in layouts]
+
+
+def print_timing_results(results):
+    """Вывод оценки времени набора для всех текстов"""
+    for result in results:
+        print(f"\n{'='*50}")
+        print(f"=== ВРЕМЯ НАБОРА: {result['text_name']} ===")
+        print(f"=== РАСКЛАДКА: {result['layout']}, МОДЕЛЬ: {result['model']} ===")
+        print(f"{'='*50}")
+        print(f"Символов: {result['characters_analyzed']}, пар: {result['pair_count']}")
+        print(f"Нажатия: {result['key_time_ms'] / 1000:.1f} с")
+        print(f"Shift: {result['shift_time_ms'] / 1000:.1f} с")
+        print(f"Переходы: {result['transition_time_ms'] / 1000:.1f} с")
+        print(f"ОБЩЕЕ ВРЕМЯ: {result['total_time_ms'] / 60000:.1f} мин")
+        print(f"В среднем на символ: {result['average_time_ms']:.1f} мс "
+              f"({result['chars_per_minute']:.0f} симв/мин)")
+
+        print(f"\nВремя по пальцам:")
+        for finger in FINGERS:
+            time = result['finger_time_ms'][finger]
+            if time > 0:
+                print(f"  {finger}: {time / 1000:.1f} с")
@@ -1,19 +1,31 @@
 '''
-Модуль построения графиков 
+Модуль построения графиков
 Импортирует результаты анализа из модуля main.py
 Строит два типа графиков(столбчатую и круговую диаграммы)
 Столбчатая диаграмма показывает показывает абсолютные штрафы по каждому пальцу
-Круговая диограмма показывает процентное распределение нагрузки по пальцам 
+Круговая диограмма показывает процентное распределение нагрузки по пальцам
+Анализ выполняется в фоновом потоке, результаты запоминаются для каждой раскладки
 '''
 import sys  # модуль sys нужен для корректного завершения приложения (sys.exit)
+import threading  # threading.Event - флаг отмены для фонового анализа
 import matplotlib
 matplotlib.use("Qt5Agg")  # указываем Matplotlib использовать бэкенд Qt5Agg вместо TkAgg
 
-from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+# QObject — базовый класс для объектов с сигналами
+# QRunnable — задача для пула потоков
+# QThreadPool — пул потоков Qt, анализ идёт в нём, а не в цикле событий окна
+# pyqtSignal — сигнал, через который фоновый поток сообщает окну о ходе работы
+
+from PyQt5.QtWidgets import (QApplication, QComboBox, QLabel, QMainWindow, QProgressBar,
+                             QPushButton, QVBoxLayout, QWidget)
 # импортируем классы из PyQt5:
 # QApplication — главный объект приложения
 # QMainWindow — главное окно
 # QPushButton — кнопка
+# QComboBox — выпадающий список раскладок
+# QProgressBar — индикатор хода анализа
+# QLabel — строка состояния
 # QVBoxLayout — вертикальный менеджер компоновки
 # QWidget — базовый контейнер для виджетов
 
@@ -21,7 +33,48 @@ from matplotlib.figure import Figure  # класс Figure для создани
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 # FigureCanvasQTAgg — холст, который позволяет встроить график Matplotlib в окно Qt
 
-from main import KeyboardAnalyzer  # импортируем твой класс анализатора из main.py
+from cache import HistogramCache  # дисковый кэш гистограмм корпусов
+from corpus import AnalysisCancelled  # исключение для отмены анализа
+from layout_registry import REGISTRY  # реестр раскладок (layouts/*.json)
+from main import FILES_TO_ANALYZE, KeyboardAnalyzer, get_common_chars, load_total_histogram
+
+
+class AnalysisSignals(QObject):  # сигналы фоновой задачи (QRunnable сам сигналы иметь не может)
+    progress = pyqtSignal(int)        # процент прочитанного текста
+    finished = pyqtSignal(object, object)  # (ключ результата, словарь результата)
+    failed = pyqtSignal(object, str)  # (ключ результата, текст ошибки)
+    cancelled = pyqtSignal(object)    # ключ результата
+
+
+class AnalysisTask(QRunnable):  # анализ раскладки на наборе файлов в пуле потоков
+    def __init__(self, key, layout, files):
+        super().__init__()
+        self.key = key          # (раскладка, набор файлов) - ключ для запоминания результата
+        self.layout = layout
+        self.files = files
+        self.signals = AnalysisSignals()
+        self.cancel_event = threading.Event()  # установленный флаг = просьба остановиться
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _progress(self, fraction):
+        """Вызывается из чтения файла: сообщает процент и проверяет отмену"""
+        if self.cancel_event.is_set():
+            raise AnalysisCancelled()
+        self.signals.progress.emit(int(fraction * 100))
+
+    def run(self):
+        try:
+            histogram = load_total_histogram(self.files, HistogramCache(), self._progress)
+            analyzer = KeyboardAnalyzer(self.layout)
+            result = analyzer.analyze_histogram(histogram, 'Все тексты', get_common_chars())
+        except AnalysisCancelled:
+            self.signals.cancelled.emit(self.key)
+        except Exception as e:
+            self.signals.failed.emit(self.key, str(e))
+        else:
+            self.signals.finished.emit(self.key, result)
 
 
 class MatplotlibWindow(QMainWindow):  # создаём класс окна, наследуем от QMainWindow
@@ -34,18 +87,93 @@ class MatplotlibWindow(QMainWindow):  # создаём класс окна, на
         self.setCentralWidget(central_widget)  # делаем его центральным в окне
         self.layout = QVBoxLayout(central_widget)  # вертикальный layout для кнопок и графиков
 
+        # выбор раскладки из реестра
+        self.layout_box = QComboBox()
+        self.layout_box.addItems(REGISTRY.names())
+        self.layout_box.setCurrentText('standard')
+        self.layout.addWidget(self.layout_box)
+
         # создаём кнопки
         self.btn_bar = QPushButton("Показать столбчатую диаграмму")  # кнопка для bar chart
         self.btn_pie = QPushButton("Показать круговую диаграмму")    # кнопка для pie chart
+        self.btn_cancel = QPushButton("Отменить анализ")            # кнопка отмены
+        self.btn_cancel.setEnabled(False)  # пока анализ не идёт, отменять нечего
         self.layout.addWidget(self.btn_bar)  # добавляем кнопку в layout
         self.layout.addWidget(self.btn_pie)  # добавляем вторую кнопку в layout
+        self.layout.addWidget(self.btn_cancel)
+
+        # индикатор хода анализа и строка состояния
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.status_label = QLabel("")
+        self.layout.addWidget(self.progress_bar)
+        self.layout.addWidget(self.status_label)
 
         # холст для графика (изначально пустой)
         self.canvas = None
 
+        self.thread_pool = QThreadPool.globalInstance()  # пул потоков для анализа
+        self.results = {}         # (раскладка, файлы) -> результат анализа
+        self.task = None          # текущая фоновая задача
+        self.pending_chart = None  # какой график нарисовать, когда анализ закончится
+
         # подключаем обработчики кнопок
-        self.btn_bar.clicked.connect(self.show_bar_chart)  # при нажатии вызвать show_bar_chart
-        self.btn_pie.clicked.connect(self.show_pie_chart)  # при нажатии вызвать show_pie_chart
+        self.btn_bar.clicked.connect(lambda: self.request_chart(self.draw_bar_chart))
+        self.btn_pie.clicked.connect(lambda: self.request_chart(self.draw_pie_chart))
+        self.btn_cancel.clicked.connect(self.cancel_analysis)
+
+    def current_key(self):
+        """Ключ результата для выбранной раскладки и набора файлов"""
+        return (self.layout_box.currentText(), tuple(FILES_TO_ANALYZE))
+
+    def request_chart(self, draw):
+        """Рисует график сразу из запомненного результата или запускает анализ"""
+        key = self.current_key()
+        if key in self.results:
+            draw(self.results[key])  # результат уже есть - только перерисовка
+            return
+
+        self.pending_chart = draw
+        if self.task is not None and self.task.key == key:
+            return  # этот анализ уже идёт, график нарисуется по его окончании
+        self.cancel_analysis()
+
+        self.task = AnalysisTask(key, key[0], list(key[1]))
+        self.task.signals.progress.connect(self.progress_bar.setValue)
+        self.task.signals.finished.connect(self.on_finished)
+        self.task.signals.failed.connect(self.on_failed)
+        self.task.signals.cancelled.connect(self.on_cancelled)
+        self.progress_bar.setValue(0)
+        self.status_label.setText(f"Анализ раскладки {key[0]}...")
+        self.btn_cancel.setEnabled(True)
+        self.thread_pool.start(self.task)
+
+    def cancel_analysis(self):
+        """Просит текущую фоновую задачу остановиться"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.btn_cancel.setEnabled(False)
+
+    def on_finished(self, key, result):
+        self.results[key] = result  # запоминаем результат для быстрой смены графика
+        if self.task is not None and self.task.key == key:
+            self.task = None
+            self.btn_cancel.setEnabled(False)
+            self.status_label.setText(f"Готово: раскладка {key[0]}")
+            if self.pending_chart is not None:
+                self.pending_chart(result)
+                self.pending_chart = None
+
+    def on_failed(self, key, message):
+        if self.task is not None and self.task.key == key:
+            self.task = None
+            self.btn_cancel.setEnabled(False)
+        self.status_label.setText(f"ОШИБКА анализа: {message}")
+
+    def on_cancelled(self, key):
+        if self.task is None:  # если уже идёт новый анализ, его статус не перетираем
+            self.status_label.setText(f"Анализ раскладки {key[0]} отменён")
 
     def clear_canvas(self):
         """Удаляет старый график перед отрисовкой нового"""
@@ -54,10 +182,8 @@ class MatplotlibWindow(QMainWindow):  # создаём класс окна, на
             self.canvas.setParent(None)  # отвязываем от родителя
             self.canvas = None  # обнуляем ссылку
 
-    def show_bar_chart(self):
+    def draw_bar_chart(self, results):
         """Строит столбчатую диаграмму"""
-        analyzer = KeyboardAnalyzer()  # создаём объект анализатора
-        results = analyzer.analyze()   # получаем результаты анализа
         penalties = results['finger_penalties']  # словарь штрафов по пальцам
         fingers = list(penalties.keys())   # список названий пальцев
         values = list(penalties.values())  # список значений штрафов
@@ -75,10 +201,8 @@ class MatplotlibWindow(QMainWindow):  # создаём класс окна, на
         self.layout.addWidget(self.canvas)    # добавляем его в layout
         self.canvas.draw()  # отрисовываем график
 
-    def show_pie_chart(self):
+    def draw_pie_chart(self, results):
         """Строит круговую диаграмму"""
-        analyzer = KeyboardAnalyzer()  # создаём объект анализатора
-        results = analyzer.analyze()   # получаем результаты анализа
         penalties = results['finger_penalties']  # словарь штрафов
         fingers = list(penalties.keys())   # список пальцев
         values = list(penalties.values())  # список штрафов
@@ -93,6 +217,10 @@ class MatplotlibWindow(QMainWindow):  # создаём класс окна, на
         self.layout.addWidget(self.canvas)    # добавляем его в layout
         self.canvas.draw()  # отрисовываем график
 
+    def closeEvent(self, event):
+        self.cancel_analysis()  # не оставляем анализ работать после закрытия окна
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":  # точка входа в программу
     app = QApplication(sys.argv)  # создаём объект приложения Qt
@@ -0,0 +1,157 @@
+"""
+Модуль замеров этапов анализа
+Для каждого этапа (загрузка файла, перевод в нижний регистр, подсчёт штрафов,
+вывод) и каждой пары (раскладка, файл) записывает время, байты, символы
+и скорость, а под tracemalloc (--profile) - ещё и пик памяти Python за этап.
+Пока замеры выключены, этапы почти ничего не стоят
+"""
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class _NullStage:
+    """Этап при выключенных замерах: ничего не измеряет"""
+
+    def __init__(self):
+        self.record = {}
+
+    def __enter__(self):
+        return self.record
+
+    def __exit__(self, *exc_info):
+        self.record.clear()
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class Instrumentation:
+    def __init__(self, enabled=False):
+        """Журнал замеров; при enabled=False stage() возвращает пустой контекст"""
+        self.enabled = enabled
+        self.records = []
+        # Пики tracemalloc открытых этапов до начала вложенного: его reset_peak их не теряет
+        self._open_peaks = []
+        self._earlier_peak = 0  # пик трассировки до последнего reset_peak
+
+    def reset_peak(self):
+        """Начало отсчёта пика памяти (после tracemalloc.start)"""
+        tracemalloc.reset_peak()
+        self._earlier_peak = 0
+
+    def peak_memory(self):
+        """Пик tracemalloc с последнего reset_peak, включая пики, сброшенные этапами"""
+        return max(self._earlier_peak, tracemalloc.get_traced_memory()[1])
+
+    def stage(self, name, layout='', file=''):
+        """Контекст замера этапа: with stage('load', file=...) as record
+
+        file - название текста (как в результатах анализа), чтобы этапы одного
+        файла сводились в отчёте вместе. В record можно дописать 'bytes'
+        и 'characters' - по ним считается скорость.
+        """
+        if not self.enabled:
+            return NULL_STAGE
+        return self._measure(name, layout, file)
+
+    @contextmanager
+    def _measure(self, name, layout, file):
+        record = {'stage': name, 'layout': layout, 'file': file, 'bytes': 0, 'characters': 0,
+                  'peak_memory_bytes': None}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            start_memory, peak = tracemalloc.get_traced_memory()
+            self._earlier_peak = max(self._earlier_peak, peak)
+            if self._open_peaks:
+                self._open_peaks[-1] = max(self._open_peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._open_peaks.append(start_memory)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            record['seconds'] = seconds
+            record['chars_per_second'] = record['characters'] / seconds if seconds > 0 else 0
+            if tracing:
+                # Пик за этап сверх памяти, занятой к его началу; пик вложенных этапов
+                # входит в пик трассировки, которая после их сброса не сбрасывалась
+                peak = max(self._open_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                record['peak_memory_bytes'] = peak - start_memory
+            self.records.append(record)
+
+    def report(self):
+        """Итоги по (этап, раскладка, файл): сумма времени, байт, символов и максимум памяти
+
+        peak_memory_bytes - None, если этапы шли без tracemalloc.
+        """
+        totals = {}
+        for record in self.records:
+            key = (record['stage'], record['layout'], record['file'])
+            total = totals.setdefault(key, {
+                'stage': record['stage'], 'layout': record['layout'], 'file': record['file'],
+                'calls': 0, 'seconds': 0.0, 'bytes': 0, 'characters': 0,
+                'peak_memory_bytes': None
+            })
+            total['calls'] += 1
+            total['seconds'] += record['seconds']
+            total['bytes'] += record['bytes']
+            total['characters'] += record['characters']
+            if record['peak_memory_bytes'] is not None:
+                total['peak_memory_bytes'] = max(total['peak_memory_bytes'] or 0,
+                                                 record['peak_memory_bytes'])
+        report = list(totals.values())
+        for total in report:
+            seconds = total['seconds']
+            total['chars_per_second'] = total['characters'] / seconds if seconds > 0 else 0
+        return report
+
+    def to_json(self):
+        return json.dumps(self.report(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Отчёт в текстовом формате Prometheus"""
+        metrics = [
+            ('keyboard_typing_stage_calls_total', 'counter', 'calls'),
+            ('keyboard_typing_stage_seconds_total', 'counter', 'seconds'),
+            ('keyboard_typing_stage_bytes_total', 'counter', 'bytes'),
+            ('keyboard_typing_stage_characters_total', 'counter', 'characters'),
+            ('keyboard_typing_stage_chars_per_second', 'gauge', 'chars_per_second'),
+            ('keyboard_typing_stage_peak_memory_bytes', 'gauge', 'peak_memory_bytes')
+        ]
+        report = self.report()
+        lines = []
+        for metric, metric_type, field in metrics:
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for total in report:
+                if total[field] is None:
+                    continue
+                labels = ','.join(f'{label}="{_escape_label(total[label])}"'
+                                  for label in ('stage', 'layout', 'file'))
+                lines.append(f"{metric}{{{labels}}} {total[field]}")
+        return '\n'.join(lines) + '\n'
+
+    def print_report(self, stream=None):
+        """Таблица этапов"""
+        stream = stream or sys.stdout
+        print(f"{'Этап':<10} {'Раскладка':<12} {'Файл':<20} {'Время, с':<10} "
+              f"{'Символов/с':<14} {'Память, МБ':<10}", file=stream)
+        print('-' * 80, file=stream)
+        for total in self.report():
+            memory = total['peak_memory_bytes']
+            memory = f"{memory / (1 << 20):.1f}" if memory is not None else '-'
+            print(f"{total['stage']:<10} {total['layout']:<12} {total['file']:<20} "
+                  f"{total['seconds']:<10.4f} {total['chars_per_second']:<14.0f} "
+                  f"{memory:<10}", file=stream)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Общий журнал: main и keyboard_typing пишут сюда, по умолчанию выключен
+INSTRUMENTATION = Instrumentation()
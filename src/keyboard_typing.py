@@ -0,0 +1,292 @@
+"""
+Командная строка анализатора раскладок
+Запуск из каталога src (без --files читаются корпуса из корня проекта):
+    python -m keyboard_typing analyze --layout standard,zubachev --files ../voina_i_mir.txt --format json
+    python -m keyboard_typing layouts
+    python -m keyboard_typing timing --model timing --files ../voina_i_mir.txt
+    python -m keyboard_typing analyze --metrics metrics.prom --metrics-format prometheus --profile
+Результаты печатаются в stdout по мере готовности каждого корпуса,
+сообщения о загрузке файлов - в stderr, чтобы не мешать конвейерам.
+Код выхода 1, если не загружен ни один корпус, 2 - ошибка в аргументах или раскладке
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+
+from corpus import SCAN_MODES
+from cost_models import MODELS, print_timing_results
+from instrumentation import INSTRUMENTATION
+from layout_registry import FINGERS, REGISTRY, LayoutError
+from main import (FILES_TO_ANALYZE, LAYOUTS, KeyboardAnalyzer, get_common_chars, load_histogram,
+                  load_ngram_table, load_pair_histogram, stream_corpora)
+from results import ResultTable
+
+FORMATS = ['table', 'json', 'csv']
+METRICS_FORMATS = ['table', 'json', 'prometheus']
+PROFILE_LINES = 25  # строк отчёта cProfile
+
+# Столбцы CSV: итоги результата и штраф каждого пальца
+CSV_FIELDS = ['text_name', 'layout', 'characters_analyzed', 'total_penalty', 'average_penalty',
+              'shift_count', 'left_hand_percentage', 'right_hand_percentage'] + [
+              f"penalty_{finger}" for finger in FINGERS]
+
+
+def iter_corpora(files, jobs=1, cache=None, ngrams=False, scan='text'):
+    """По одному (название текста, гистограмма) на файл, сразу после его чтения
+
+    При --jobs все файлы читаются параллельно в одном пуле процессов.
+    """
+    if not ngrams:
+        yield from stream_corpora(files, jobs, cache, scan)
+        return
+    for filename, text_name in files:
+        table = load_ngram_table(filename)
+        if table and table[0]:
+            yield text_name, table[0]
+
+
+class ResultWriter:
+    """Печать результатов в выбранном формате по одному"""
+
+    def __init__(self, output_format, stream=None):
+        self.format = output_format
+        self.stream = stream if stream is not None else sys.stdout
+        self.csv_writer = None
+        if output_format == 'csv':
+            self.csv_writer = csv.DictWriter(self.stream, CSV_FIELDS, extrasaction='ignore')
+            self.csv_writer.writeheader()
+
+    def write(self, analyzer, result):
+        if self.format == 'json':
+            self.stream.write(json.dumps(result.to_dict(), ensure_ascii=False) + '\n')
+        elif self.format == 'csv':
+            row = dict(result)
+            for finger, penalty in result['finger_penalties'].items():
+                row[f"penalty_{finger}"] = penalty
+            self.csv_writer.writerow(row)
+        else:
+            with contextlib.redirect_stdout(self.stream):
+                analyzer.print_results([result])
+        self.stream.flush()
+
+
+def command_analyze(args):
+    files = [(filename, os.path.basename(filename)) for filename in args.files] \
+        if args.files else FILES_TO_ANALYZE
+    try:
+        analyzers = [KeyboardAnalyzer(layout, not args.no_capital_shift) for layout in args.layout]
+    except LayoutError as e:
+        print(f"ОШИБКА: {e}", file=sys.stderr)
+        return 2
+    common_chars = None if args.all_chars else get_common_chars()
+    cache = None
+    if not args.no_cache and not args.ngrams:
+        from cache import HistogramCache
+        cache = HistogramCache()
+
+    writer = ResultWriter(args.format)
+    table = ResultTable()
+    loaded = 0
+    corpora = iter_corpora(files, args.jobs, cache, args.ngrams, args.scan)
+    while True:
+        # Служебные сообщения анализатора уходят в stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            corpus = next(corpora, None)
+            if corpus is None:
+                break
+            text_name, histogram = corpus
+            loaded += 1
+            results = [(analyzer, analyzer.analyze_histogram(histogram, text_name, common_chars))
+                       for analyzer in analyzers]
+        for analyzer, result in results:
+            with INSTRUMENTATION.stage('output', analyzer.layout, text_name) as record:
+                writer.write(analyzer, result)
+                record['characters'] = result.characters_analyzed
+            table.append(result)
+    if not loaded:
+        print("ОШИБКА: не загружен ни один корпус", file=sys.stderr)
+        return 1
+    if args.npy:
+        table.save_npy(args.npy)
+    return 0
+
+
+def command_timing(args):
+    files = [(filename, os.path.basename(filename)) for filename in args.files] \
+        if args.files else FILES_TO_ANALYZE
+    try:
+        models = [MODELS[args.model].compile(layout, not args.no_capital_shift)
+                  for layout in args.layout]
+    except LayoutError as e:
+        print(f"ОШИБКА: {e}", file=sys.stderr)
+        return 2
+    common_chars = None if args.all_chars else get_common_chars()
+    cache = None
+    if not args.no_cache:
+        from cache import HistogramCache
+        cache = HistogramCache()
+
+    loaded = 0
+    for filename, text_name in files:
+        with contextlib.redirect_stdout(sys.stderr):
+            histogram = load_histogram(filename, cache, text_name=text_name)
+            pairs = load_pair_histogram(filename, cache) if histogram else None
+        if not histogram:
+            continue
+        loaded += 1
+        results = [model.estimate(histogram, text_name, pairs, common_chars) for model in models]
+        if args.format == 'json':
+            for result in results:
+                sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+        else:
+            print_timing_results(results)
+        sys.stdout.flush()
+    if not loaded:
+        print("ОШИБКА: не загружен ни один корпус", file=sys.stderr)
+        return 1
+    return 0
+
+
+def command_layouts(args):
+    for name in REGISTRY.names():
+        try:
+            layout = REGISTRY.get(name)
+        except LayoutError as e:
+            print(f"ОШИБКА: {e}", file=sys.stderr)
+            continue
+        print(f"{name:<15} {layout.title}")
+        for warning in layout.warnings:
+            print(f"ПРЕДУПРЕЖДЕНИЕ: Раскладка {name}: {warning}", file=sys.stderr)
+    return 0
+
+
+def write_metrics(args):
+    """Сохраняет замеры этапов в формате --metrics-format"""
+    if not getattr(args, 'metrics', None):
+        return
+    if args.metrics_format == 'json':
+        text = INSTRUMENTATION.to_json() + '\n'
+    elif args.metrics_format == 'prometheus':
+        text = INSTRUMENTATION.to_prometheus()
+    else:
+        stream = io.StringIO()
+        INSTRUMENTATION.print_report(stream)
+        text = stream.getvalue()
+    if args.metrics == '-':
+        sys.stderr.write(text)
+    else:
+        with open(args.metrics, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+
+def run_profiled(args):
+    """Запуск команды под cProfile и tracemalloc: самые долгие функции и места выделения памяти"""
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    INSTRUMENTATION.reset_peak()
+    try:
+        code = profiler.runcall(args.handler, args)
+        snapshot = tracemalloc.take_snapshot()
+        current = tracemalloc.get_traced_memory()[0]
+        peak = INSTRUMENTATION.peak_memory()  # этапы сбрасывают пик tracemalloc
+    finally:
+        tracemalloc.stop()
+
+    write_metrics(args)
+    if not args.metrics:
+        INSTRUMENTATION.print_report(sys.stderr)
+    print(f"\nПамять Python: сейчас {current / (1 << 20):.1f} МБ, пик {peak / (1 << 20):.1f} МБ",
+          file=sys.stderr)
+    for statistic in snapshot.statistics('lineno')[:10]:
+        print(f"  {statistic}", file=sys.stderr)
+    pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return code
+
+
+def job_count(value):
+    """Значение --jobs: число процессов, 0 - по числу ядер (None для пула)"""
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError(f"число процессов не может быть отрицательным: {value}")
+    return jobs or None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='keyboard_typing',
+                                     description="Анализ нагрузки на пальцы для раскладок клавиатуры")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyze = commands.add_parser('analyze', help="анализ корпусов на раскладках")
+    analyze.add_argument('--layout', default=','.join(code for code, _ in LAYOUTS),
+                         type=lambda value: value.split(','),
+                         help="раскладки через запятую (по умолчанию все три)")
+    analyze.add_argument('--files', nargs='+', help="файлы корпусов (по умолчанию FILES_TO_ANALYZE)")
+    analyze.add_argument('--format', choices=FORMATS, default='table')
+    analyze.add_argument('--jobs', type=job_count, default=1,
+                         help="процессов для чтения файлов (0 - по числу ядер)")
+    analyze.add_argument('--all-chars', action='store_true',
+                         help="учитывать все символы раскладки, а не только общие")
+    analyze.add_argument('--scan', choices=list(SCAN_MODES), default='text',
+                         help="mmap - считать символы по байтам файла без декодирования")
+    analyze.add_argument('--no-capital-shift', action='store_true',
+                         help="не считать заглавные буквы нажатиями Shift "
+                              "(текст всё равно приводится к NFC)")
+    analyze.add_argument('--ngrams', action='store_true',
+                         help="файлы - частотные таблицы 'n-грамма<TAB>частота'")
+    analyze.add_argument('--no-cache', action='store_true', help="не использовать кэш гистограмм")
+    analyze.add_argument('--npy', help="сохранить все результаты в таблицу .npy")
+    analyze.add_argument('--metrics',
+                         help="записать замеры этапов в файл ('-' - в stderr); "
+                              "пик памяти этапов - только вместе с --profile")
+    analyze.add_argument('--metrics-format', choices=METRICS_FORMATS, default='table')
+    analyze.add_argument('--profile', action='store_true',
+                         help="запуск под cProfile и tracemalloc, отчёт в stderr")
+    analyze.set_defaults(handler=command_analyze)
+
+    timing = commands.add_parser('timing', help="оценка времени набора корпусов")
+    timing.add_argument('--layout', default=','.join(code for code, _ in LAYOUTS),
+                        type=lambda value: value.split(','),
+                        help="раскладки через запятую (по умолчанию все три)")
+    timing.add_argument('--files', nargs='+', help="файлы корпусов (по умолчанию FILES_TO_ANALYZE)")
+    timing.add_argument('--model', choices=list(MODELS), default='timing',
+                        help="модель стоимости (distance - в единицах штрафа)")
+    timing.add_argument('--format', choices=['table', 'json'], default='table')
+    timing.add_argument('--all-chars', action='store_true',
+                        help="учитывать все символы раскладки, а не только общие")
+    timing.add_argument('--no-capital-shift', action='store_true',
+                        help="не считать заглавные буквы нажатиями Shift "
+                             "(текст всё равно приводится к NFC)")
+    timing.add_argument('--no-cache', action='store_true', help="не использовать кэш гистограмм")
+    timing.set_defaults(handler=command_timing)
+
+    layouts = commands.add_parser('layouts', help="список доступных раскладок")
+    layouts.set_defaults(handler=command_layouts)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    profile = getattr(args, 'profile', False)
+    INSTRUMENTATION.enabled = profile or bool(getattr(args, 'metrics', None))
+    try:
+        if profile:
+            return run_profiled(args)
+        code = args.handler(args)
+        write_metrics(args)
+        return code
+    except BrokenPipeError:
+        # Читатель конвейера (например, head) закрыл stdout раньше времени
+        sys.stderr.close()
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Модуль реестра раскладок клавиатуры
+Раскладки описываются файлами layouts/<имя>.json (или .toml) с полями
+keys, shift_keys и home_positions, проверяются при загрузке и один раз
+компилируются в таблицу стоимости символов
+"""
+import json
+import os
+
+# Порядок пальцев: индекс в этом списке используется в скомпилированных таблицах
+FINGERS = [
+    'left_pinky', 'left_ring', 'left_middle', 'left_index',
+    'right_index', 'right_middle', 'right_ring', 'right_pinky',
+    'left_thumb', 'right_thumb'
+]
+LEFT_THUMB = FINGERS.index('left_thumb')
+
+# Карта клавиатуры: код -> (ряд, колонка) - общая для всех раскладок
+KEYBOARD_MAP = {
+    # Цифровой ряд
+    2: (0, 0), 3: (0, 1), 4: (0, 2), 5: (0, 3), 6: (0, 4),
+    7: (0, 5), 8: (0, 6), 9: (0, 7), 10: (0, 8), 11: (0, 9),
+    12: (0, 10), 13: (0, 11), 14: (0, 12),
+
+    # Верхний ряд
+    16: (1, 0), 17: (1, 1), 18: (1, 2), 19: (1, 3), 20: (1, 4),
+    21: (1, 5), 22: (1, 6), 23: (1, 7), 24: (1, 8), 25: (1, 9),
+    26: (1, 10), 27: (1, 11),
+
+    # Домашний ряд
+    30: (2, 0), 31: (2, 1), 32: (2, 2), 33: (2, 3), 34: (2, 4),
+    35: (2, 5), 36: (2, 6), 37: (2, 7), 38: (2, 8), 39: (2, 9),
+    40: (2, 10),
+
+    # Нижний ряд
+    41: (3, 2), 44: (3, 0), 45: (3, 1), 46: (3, 2), 47: (3, 3),
+    48: (3, 4), 49: (3, 5), 50: (3, 6), 51: (3, 7), 52: (3, 8),
+    53: (3, 9),
+
+    # Особые клавиши
+    42: (3, -1),  # Shift
+    43: (1, 12),  # \ (обратный слеш)
+    57: (4, 5)    # Пробел
+}
+
+LAYOUTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouts')
+LAYOUT_EXTENSIONS = ('.json', '.toml')
+
+
+class LayoutError(ValueError):
+    """Ошибка в описании раскладки"""
+
+
+def key_penalty(key_code, finger, home_positions):
+    """Штраф нажатия: манхэттенское расстояние клавиши от домашней позиции пальца"""
+    if finger in ['left_thumb', 'right_thumb']:
+        return 0
+
+    home_coords = KEYBOARD_MAP.get(home_positions[finger])
+    target_coords = KEYBOARD_MAP.get(key_code)
+    if not home_coords or not target_coords:
+        return 0
+
+    home_row, home_col = home_coords
+    target_row, target_col = target_coords
+    return abs(target_row - home_row) + abs(target_col - home_col)
+
+
+class CompiledLayout:
+    """Проверенная раскладка с таблицей: код символа -> (индекс пальца, штраф, shift)"""
+
+    def __init__(self, name, definition):
+        validate_layout(name, definition)
+        self.name = name
+        self.title = definition.get('title', name.upper())
+        self.short_name = definition.get('short_name', name)
+        self.keys = {char: tuple(key) for char, key in definition['keys'].items()}
+        self.shift_keys = {char: tuple(key) for char, key in definition.get('shift_keys', {}).items()}
+        self.home_positions = dict(definition['home_positions'])
+        self.warnings = layout_warnings(definition)
+
+        all_chars = set(self.keys).union(self.shift_keys)
+        self.char_table = [None] * (max(map(ord, all_chars), default=-1) + 1)
+        # Сначала shift-символы, затем обычные: обычная клавиша имеет приоритет
+        for char, (key_code, finger) in self.shift_keys.items():
+            penalty = key_penalty(key_code, finger, self.home_positions)
+            self.char_table[ord(char)] = (FINGERS.index(finger), penalty, 1)
+        for char, (key_code, finger) in self.keys.items():
+            penalty = key_penalty(key_code, finger, self.home_positions)
+            self.char_table[ord(char)] = (FINGERS.index(finger), penalty, 0)
+
+    def definition(self):
+        """Описание раскладки в том виде, в каком оно хранится в файле"""
+        return {
+            'title': self.title,
+            'short_name': self.short_name,
+            'keys': {char: list(key) for char, key in self.keys.items()},
+            'shift_keys': {char: list(key) for char, key in self.shift_keys.items()},
+            'home_positions': dict(self.home_positions)
+        }
+
+
+def capital_shifts(capitals, char_table, allowed_chars):
+    """Нажатия Shift для заглавных букв (гистограмма из fold_case) по таблице char_table
+
+    Заглавная буква = Shift, если её строчная не набирается с Shift сама.
+    """
+    shift_count = 0
+    table_size = len(char_table)
+    for char, count in capitals.items():
+        if char not in allowed_chars:
+            continue
+        code = ord(char)
+        entry = char_table[code] if code < table_size else None
+        if entry is not None and not entry[2]:
+            shift_count += count
+    return shift_count
+
+
+def _is_key_code(value):
+    """Код клавиши из KEYBOARD_MAP (bool - тоже int, но кодом не считается)"""
+    return isinstance(value, int) and not isinstance(value, bool) and value in KEYBOARD_MAP
+
+
+def validate_layout(name, definition):
+    """Проверяет описание раскладки; LayoutError со списком всех ошибок"""
+    errors = []
+    if not isinstance(definition, dict):
+        raise LayoutError(f"Раскладка {name}: описание должно быть объектом")
+
+    for section in ('keys', 'home_positions'):
+        if section not in definition:
+            errors.append(f"нет раздела {section}")
+    sections = {}
+    for section in ('keys', 'shift_keys', 'home_positions'):
+        value = definition.get(section, {})
+        if isinstance(value, dict):
+            sections[section] = value
+        else:
+            errors.append(f"раздел {section} должен быть объектом")
+            sections[section] = {}
+
+    used_fingers = set()
+    for section in ('keys', 'shift_keys'):
+        for char, key in sections[section].items():
+            where = f"{section}[{char!r}]"
+            if not isinstance(char, str) or len(char) != 1:
+                errors.append(f"{where}: ожидается один символ")
+            if not isinstance(key, (list, tuple)) or len(key) != 2:
+                errors.append(f"{where}: ожидается [код клавиши, палец]")
+                continue
+            key_code, finger = key
+            if not _is_key_code(key_code):
+                errors.append(f"{where}: неизвестный код клавиши {key_code!r}")
+            if isinstance(finger, str) and finger in FINGERS:
+                used_fingers.add(finger)
+            else:
+                errors.append(f"{where}: неизвестный палец {finger!r}")
+
+    home_positions = sections['home_positions']
+    for finger, key_code in home_positions.items():
+        if finger not in FINGERS:
+            errors.append(f"home_positions: неизвестный палец {finger!r}")
+        elif not _is_key_code(key_code):
+            errors.append(f"home_positions[{finger!r}]: неизвестный код клавиши {key_code!r}")
+    for finger in sorted(used_fingers - set(home_positions)):
+        errors.append(f"home_positions: нет домашней позиции для {finger}")
+
+    if errors:
+        raise LayoutError(f"Раскладка {name}: " + "; ".join(errors))
+
+
+def layout_warnings(definition):
+    """Замечания к проверенной раскладке, которые не мешают её загрузке
+
+    Несколько символов на одной клавише одного слоя (в zubachev '_' и '-'
+    на клавише 12) - не ошибка: раскладка считается так, как описана,
+    а решение остаётся за её автором.
+    """
+    warnings = []
+    for section in ('keys', 'shift_keys'):
+        chars_by_key = {}  # код клавиши -> символы этого слоя
+        for char, (key_code, _) in definition.get(section, {}).items():
+            chars_by_key.setdefault(key_code, []).append(char)
+        for key_code, chars in chars_by_key.items():
+            if len(chars) > 1:
+                warnings.append(f"{section}: на клавише {key_code} символы "
+                                + ", ".join(repr(char) for char in chars))
+    return warnings
+
+
+def _reject_duplicates(pairs):
+    """object_pairs_hook для json: повторный ключ - ошибка, а не тихая перезапись"""
+    result = {}
+    duplicates = []
+    for key, value in pairs:
+        if key in result:
+            duplicates.append(key)
+        result[key] = value
+    if duplicates:
+        raise LayoutError("повторяющиеся ключи: " + ", ".join(repr(key) for key in duplicates))
+    return result
+
+
+def load_layout_file(path):
+    """Читает и проверяет файл раскладки, возвращает CompiledLayout"""
+    name, extension = os.path.splitext(os.path.basename(path))
+    try:
+        if extension == '.toml':
+            try:
+                import tomllib  # Python 3.11+; импортируется только для .toml-раскладок
+            except ImportError:
+                raise LayoutError("для .toml нужен Python 3.11+") from None
+            with open(path, 'rb') as file:
+                definition = tomllib.load(file)  # TOML сам запрещает повторные ключи
+        else:
+            with open(path, encoding='utf-8') as file:
+                definition = json.load(file, object_pairs_hook=_reject_duplicates)
+    except ValueError as e:  # повторные ключи и ошибки синтаксиса JSON и TOML
+        raise LayoutError(f"Раскладка {name} ({path}): {e}") from None
+    return CompiledLayout(name, definition)
+
+
+def save_layout_file(path, layout):
+    """Сохраняет CompiledLayout в JSON-файл, пригодный для реестра"""
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(layout.definition(), file, ensure_ascii=False, indent=4)
+        file.write('\n')
+
+
+class LayoutRegistry:
+    def __init__(self, directories=(LAYOUTS_DIR,)):
+        """Реестр раскладок из файлов в каталогах directories (поздние перекрывают ранние)"""
+        self.directories = list(directories)
+        self._compiled = {}   # имя -> (путь, mtime, CompiledLayout)
+        self._registered = {}  # раскладки, добавленные из кода
+
+    def _paths(self):
+        """Имя раскладки -> путь к файлу"""
+        paths = {}
+        for directory in self.directories:
+            try:
+                entries = sorted(os.listdir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                name, extension = os.path.splitext(entry)
+                if extension in LAYOUT_EXTENSIONS:
+                    paths[name] = os.path.join(directory, entry)
+        return paths
+
+    def names(self):
+        """Имена всех доступных раскладок"""
+        return sorted(set(self._paths()).union(self._registered))
+
+    def register(self, name, definition):
+        """Добавляет раскладку из описания (dict) без файла"""
+        layout = definition if isinstance(definition, CompiledLayout) else CompiledLayout(name, definition)
+        self._registered[name] = layout
+        return layout
+
+    def get(self, name):
+        """Скомпилированная раскладка; файл перечитывается, только если изменился"""
+        if name in self._registered:
+            return self._registered[name]
+
+        cached = self._compiled.get(name)
+        if cached:
+            path, mtime, layout = cached
+            try:
+                if os.stat(path).st_mtime_ns == mtime:
+                    return layout
+            except OSError:
+                pass
+
+        path = self._paths().get(name)
+        if path is None:
+            raise LayoutError(f"Неизвестная раскладка: {name}")
+        mtime = os.stat(path).st_mtime_ns
+        layout = load_layout_file(path)
+        self._compiled[name] = (path, mtime, layout)
+        return layout
+
+
+# Реестр по умолчанию: layouts/ рядом с модулем и каталоги из KEYBOARD_TYPING_LAYOUTS
+REGISTRY = LayoutRegistry([LAYOUTS_DIR] + [
+    directory for directory in os.environ.get('KEYBOARD_TYPING_LAYOUTS', '').split(os.pathsep)
+    if directory
+])
+
+
+def get_layout(name):
+    """Скомпилированная раскладка из реестра по умолчанию"""
+    return REGISTRY.get(name)
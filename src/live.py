@@ -0,0 +1,114 @@
+"""
+Модуль анализа нагрузки во время набора текста
+Каждое нажатие обновляет накопленные штрафы и нажатия по пальцам за O(1),
+последние нажатия можно отменить, текущий результат доступен в любой момент
+"""
+from collections import deque
+
+from main import FINGERS, LEFT_THUMB, KeyboardAnalyzer
+
+
+class LiveAnalyzer:
+    def __init__(self, layout='standard', common_chars=None, undo_depth=1000, capital_shift=True):
+        """Анализатор набора для раскладки layout; undo_depth - сколько нажатий можно отменить
+
+        capital_shift - заглавная буква считается нажатием Shift, как в analyze_histogram.
+        """
+        self.analyzer = KeyboardAnalyzer(layout, capital_shift)
+        if common_chars:
+            self.allowed_chars = common_chars
+        else:
+            self.allowed_chars = set(self.analyzer.keys).union(self.analyzer.shift_keys)
+
+        # Нажатие клавиши (код, shift) -> (символ, (палец, штраф, shift)) для событий клавиатуры.
+        # Нажатие считается по самой клавише: символ может быть и в другом слое на другой клавише
+        self.key_entries = {}
+        for shift, layer in ((True, self.analyzer.shift_keys), (False, self.analyzer.keys)):
+            for char, (key_code, finger) in layer.items():
+                self.key_entries[key_code, shift] = (char, self._key_entry(key_code, finger, shift))
+        if capital_shift:
+            # Буквенная клавиша с Shift без своего shift-символа печатает заглавную букву
+            for char, (key_code, finger) in self.analyzer.keys.items():
+                if char.upper() != char and (key_code, True) not in self.key_entries:
+                    self.key_entries[key_code, True] = (char.upper(),
+                                                        self._key_entry(key_code, finger, True))
+        self.history = deque(maxlen=undo_depth)
+        self.reset()
+
+    def _key_entry(self, key_code, finger, shift):
+        """Запись нажатия в формате char_table: (индекс пальца, штраф, shift)"""
+        return FINGERS.index(finger), self.analyzer._calculate_penalty(key_code, finger), int(shift)
+
+    def reset(self):
+        """Сбрасывает накопленную статистику"""
+        self.finger_penalties = [0] * len(FINGERS)
+        self.finger_counts = [0] * len(FINGERS)
+        self.character_count = 0
+        self.shift_count = 0
+        self.history.clear()
+
+    def _apply(self, entry, sign):
+        """Добавляет (sign=1) или убирает (sign=-1) одно нажатие из статистики"""
+        self.character_count += sign
+        if entry is None:
+            return  # символ алфавита, которого нет в раскладке: только считается
+        finger, penalty, shift = entry
+        self.finger_penalties[finger] += sign * penalty
+        self.finger_counts[finger] += sign
+        if shift:
+            self.finger_penalties[LEFT_THUMB] += sign
+            self.finger_counts[LEFT_THUMB] += sign
+            self.shift_count += sign
+
+    def type_char(self, char):
+        """Учитывает набранный символ; возвращает число учтённых символов"""
+        counted = 0
+        table = self.analyzer.char_table
+        lower = char.lower()
+        capital = self.analyzer.capital_shift and lower != char
+        for position, lower_char in enumerate(lower):
+            if lower_char not in self.allowed_chars:
+                continue
+            code = ord(lower_char)
+            entry = table[code] if code < len(table) else None
+            # Заглавная буква - то же нажатие с Shift (один Shift, даже если lower() дал несколько)
+            if capital and position == 0 and entry is not None and not entry[2]:
+                entry = (entry[0], entry[1], 1)
+            self._apply(entry, 1)
+            self.history.append(entry)
+            counted += 1
+        return counted
+
+    def type_text(self, text):
+        """Учитывает небольшую порцию набранного текста"""
+        return sum(self.type_char(char) for char in text)
+
+    def press_key(self, key_code, shift=False):
+        """Учитывает нажатие клавиши key_code (с Shift или без); неизвестные клавиши пропускаются
+
+        Палец, штраф и Shift берутся от нажатой клавиши, а не от символа:
+        в раскладке Вызов Shift+2 печатает 'ё', которая есть и на клавише 21 без Shift.
+        """
+        pressed = self.key_entries.get((key_code, shift))
+        if pressed is None:
+            return 0
+        char, entry = pressed
+        if char.lower() not in self.allowed_chars:
+            return 0
+        self._apply(entry, 1)
+        self.history.append(entry)
+        return 1
+
+    def undo(self, count=1):
+        """Отменяет последние count нажатий (не больше undo_depth); возвращает число отменённых"""
+        undone = 0
+        while undone < count and self.history:
+            self._apply(self.history.pop(), -1)
+            undone += 1
+        return undone
+
+    def snapshot(self, text_name='Набор'):
+        """Текущий результат в формате KeyboardAnalyzer.analyze_text"""
+        return self.analyzer.make_result(text_name, list(self.finger_penalties),
+                                         list(self.finger_counts), self.character_count,
+                                         self.shift_count)
@@ -4,400 +4,201 @@
 Рассчитывает штрафы за движения пальцев от home ряда
 Автор: Vero
 """
+import os
+import sys
+from collections import Counter
+
+from cache import HistogramCache
+from corpus import (SCAN_MODES, AnalysisCancelled, char_histogram, file_pair_histogram,
+                    iter_parallel_file_histograms, read_ngram_table)
+from instrumentation import INSTRUMENTATION
+from layout_registry import (FINGERS, KEYBOARD_MAP, LEFT_THUMB, CompiledLayout, capital_shifts,
+                             get_layout, key_penalty)
+from prefilter import fold_case
+from results import AnalysisResult, ResultTable
+
+# Корень проекта: корпуса лежат в нём, а скрипты запускаются из src
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Файлы для анализа: путь к файлу -> название текста
+FILES_TO_ANALYZE = [
+    (os.path.join(PROJECT_DIR, 'voina_i_mir.txt'), 'Война и мир'),
+    (os.path.join(PROJECT_DIR, 'digramms.txt'), 'Диграммы'),
+    (os.path.join(PROJECT_DIR, '1grams.txt'), '1-граммы')
+]
+
+# Раскладки для сравнения: код -> название
+LAYOUTS = [
+    ('standard', 'СТАНДАРТНАЯ'),
+    ('challenge', 'ВЫЗОВ'),
+    ('zubachev', 'ЗУБАЧЕВ')
+]
+
 
 class KeyboardAnalyzer:
-    def __init__(self, layout='standard'):
-        self.layout = layout
-        
-        if layout == 'standard':
-            self._init_standard_layout()
-        elif layout == 'challenge':
-            self._init_challenge_layout()
-        elif layout == 'zubachev':
-            self._init_zubachev_layout()
-        
-        # Карта клавиатуры: код -> (ряд, колонка) - общая для всех раскладок
-        self.keyboard_map = {
-            # Цифровой ряд
-            2: (0, 0), 3: (0, 1), 4: (0, 2), 5: (0, 3), 6: (0, 4),
-            7: (0, 5), 8: (0, 6), 9: (0, 7), 10: (0, 8), 11: (0, 9),
-            12: (0, 10), 13: (0, 11), 14: (0, 12),
-            
-            # Верхний ряд
-            16: (1, 0), 17: (1, 1), 18: (1, 2), 19: (1, 3), 20: (1, 4),
-            21: (1, 5), 22: (1, 6), 23: (1, 7), 24: (1, 8), 25: (1, 9),
-            26: (1, 10), 27: (1, 11),
-            
-            # Домашний ряд
-            30: (2, 0), 31: (2, 1), 32: (2, 2), 33: (2, 3), 34: (2, 4),
-            35: (2, 5), 36: (2, 6), 37: (2, 7), 38: (2, 8), 39: (2, 9),
-            40: (2, 10),
-            
-            # Нижний ряд
-            41: (3, 2), 44: (3, 0), 45: (3, 1), 46: (3, 2), 47: (3, 3), 
-            48: (3, 4), 49: (3, 5), 50: (3, 6), 51: (3, 7), 52: (3, 8), 
-            53: (3, 9),
-            
-            # Особые клавиши
-            42: (3, -1),  # Shift
-            43: (1, 12),  # \ (обратный слеш)
-            57: (4, 5)    # Пробел
-        }
-
-    def _init_standard_layout(self):
-        """Стандартная русская раскладка"""
-        # Объединяем все в один словарь: буква -> (код, палец)
-        self.keys = {
-            # Левый мизинец
-            'й': (16, 'left_pinky'), 'ф': (30, 'left_pinky'), 'я': (44, 'left_pinky'), 'ё': (41, 'left_pinky'),
-            
-            # Левый безымянный
-            'ц': (17, 'left_ring'), 'ы': (31, 'left_ring'), 'ч': (45, 'left_ring'),
-            
-            # Левый средний
-            'у': (18, 'left_middle'), 'в': (32, 'left_middle'), 'с': (46, 'left_middle'),
-            
-            # Левый указательный
-            'к': (19, 'left_index'), 'а': (33, 'left_index'), 'м': (47, 'left_index'), 
-            'п': (34, 'left_index'), 'е': (20, 'left_index'), 'и': (48, 'left_index'),
-            
-            # Правый указательный
-            'р': (35, 'right_index'), 'о': (36, 'right_index'), 'ь': (50, 'right_index'),
-            'н': (21, 'right_index'), 'т': (49, 'right_index'), 'г': (22, 'right_index'),
-            
-            # Правый средний
-            'ш': (23, 'right_middle'), 'л': (37, 'right_middle'), 'б': (51, 'right_middle'),
-            
-            # Правый безымянный
-            'щ': (24, 'right_ring'), 'д': (38, 'right_ring'), 'ю': (52, 'right_ring'),
-            
-            # Правый мизинец
-            'ж': (39, 'right_pinky'), 'з': (25, 'right_pinky'), 'х': (26, 'right_pinky'),
-            'э': (40, 'right_pinky'), 'ъ': (27, 'right_pinky'), '.': (53, 'right_pinky'),
-            '\\': (43, 'right_pinky'),
-            
-            # Большие пальцы
-            ' ': (57, 'right_thumb')
-        }
-
-        # Символы с Shift
-        self.shift_keys = {
-            '!': (2, 'left_pinky'), '"': (3, 'left_ring'), '№': (4, 'left_middle'), ';': (5, 'left_index'),
-            '%': (6, 'right_index'), ':': (7, 'right_middle'), '?': (8, 'right_ring'), 
-            '*': (9, 'right_pinky'), '(': (10, 'right_pinky'), ')': (11, 'right_pinky'),
-            '_': (12, 'right_pinky'), '+': (13, 'right_pinky'), '/': (43, 'right_pinky'),
-            ',': (53, 'right_pinky')
-        }
-        
-        # Домашние позиции для каждого пальца
-        self.home_positions = {
-            'left_pinky': 30,   # ф
-            'left_ring': 31,    # ы
-            'left_middle': 32,  # в
-            'left_index': 33,   # а
-            'right_index': 36,  # о
-            'right_middle': 37, # л
-            'right_ring': 38,   # д
-            'right_pinky': 39,  # ж
-            'left_thumb': 42,   # shift
-            'right_thumb': 57   # пробел
-        }
-
-    def _init_challenge_layout(self):
-        """Раскладка Вызов (по твоим данным)"""
-        self.keys = {
-            # Левый мизинец
-            'б': (16, 'left_pinky'), 'ч': (30, 'left_pinky'), 'ш': (44, 'left_pinky'),
-            
-            # Левый безымянный
-            'ы': (17, 'left_ring'), 'и': (31, 'left_ring'), 'х': (45, 'left_ring'),
-            
-            # Левый средний
-            'о': (18, 'left_middle'), 'е': (32, 'left_middle'), 'й': (46, 'left_middle'),
-            
-            # Левый указательный
-            'у': (19, 'left_index'), 'а': (33, 'left_index'), 'к': (47, 'left_index'),
-            ',': (34, 'left_index'), 'ь': (20, 'left_index'), '-': (48, 'left_index'),
-            
-            # Правый указательный
-            '.': (35, 'right_index'), 'н': (36, 'right_index'), 'р': (50, 'right_index'),
-            'ё': (21, 'right_index'), '^': (22, 'right_index'), 'д': (23, 'right_index'),
-            
-            # Правый средний
-            'я': (24, 'right_middle'), 'г': (25, 'right_middle'), 'ж': (26, 'right_middle'),
-            
-            # Правый безымянный
-            'ц': (27, 'right_ring'), 'з': (40, 'right_ring'), 'м': (51, 'right_ring'),
-            
-            # Правый мизинец
-            'ф': (52, 'right_pinky'), 'ъ': (43, 'right_pinky'), '/': (49, 'right_pinky'),
-            'в': (39, 'right_pinky'), 'с': (38, 'right_pinky'), 'т': (37, 'right_pinky'),
-            
-            # Большие пальцы
-            ' ': (57, 'right_thumb'), '₽': (41, 'right_thumb')
-        }
-
-        # Символы с Shift для раскладки Вызов 
-        self.shift_keys = {
-            'ё': (2, 'left_pinky'),
-            '[': (3, 'left_ring'),
-            '{': (4, 'left_middle'),
-            '}': (5, 'left_index'),
-            '(': (6, 'right_index'),
-            '=': (7, 'right_middle'),
-            '*': (8, 'right_ring'),
-            ')': (9, 'right_pinky'),
-            '+': (10, 'right_pinky'),
-            ']': (11, 'right_pinky'),
-            '!': (12, 'right_pinky'),
-            'щ': (13, 'right_pinky'),
-            '№': (13, 'right_pinky'),  
-            'ю': (19, 'left_index'),
-            'ц': (30, 'left_pinky'),   
-            'э': (32, 'left_middle'),  
-            'щ': (36, 'right_index'),
-            'ъ': (37, 'right_middle'),
-            '№': (39, 'right_pinky'),
-        }
-        
-        # Домашние позиции для раскладки Вызов
-        self.home_positions = {
-            'left_pinky': 30,   # ч
-            'left_ring': 31,    # и
-            'left_middle': 32,  # е
-            'left_index': 33,   # а
-            'right_index': 36,  # н
-            'right_middle': 37, # т
-            'right_ring': 38,   # с
-            'right_pinky': 39,  # в
-            'left_thumb': 42,   # shift
-            'right_thumb': 57   # пробел
-        }
-
-    def _init_zubachev_layout(self):
-    """Раскладка Зубачев - ИСПРАВЛЕННАЯ ВЕРСИЯ"""
-    self.keys = {
-        # Левый мизинец
-        'ф': (16, 'left_pinky'), 'г': (30, 'left_pinky'), 'ш': (44, 'left_pinky'),
-        
-        # Левый безымянный
-        'ы': (17, 'left_ring'), 'и': (31, 'left_ring'), 'ь': (45, 'left_ring'),
-        
-        # Левый средний
-        'а': (18, 'left_middle'), 'е': (32, 'left_middle'), 'ю': (46, 'left_middle'),
-        
-        # Левый указательный
-        'я': (19, 'left_index'), 'о': (33, 'left_index'), '.': (47, 'left_index'),
-        'ъ': (20, 'left_index'), 'й': (21, 'left_index'), 'м': (22, 'left_index'),
-        
-        # Правый указательный
-        'р': (23, 'right_index'), 'п': (24, 'right_index'), 'х': (25, 'right_index'),
-        'ц': (26, 'right_index'), 'щ': (27, 'right_index'), '\\': (43, 'right_index'),
-        
-        # Правый средний
-        'л': (35, 'right_middle'), 'т': (36, 'right_middle'), 'с': (37, 'right_middle'),
-        
-        # Правый безымянный
-        'н': (38, 'right_ring'), 'з': (39, 'right_ring'), 'ж': (40, 'right_ring'),
-        
-        # Правый мизинец
-        'э': (48, 'right_pinky'), 'б': (49, 'right_pinky'), 'д': (50, 'right_pinky'),
-        'в': (51, 'right_pinky'), 'к': (52, 'right_pinky'), 'ч': (53, 'right_pinky'),
-        'ё': (41, 'right_pinky'),  # ПЕРЕМЕСТИЛИ с большого пальца на мизинец!
-        
-        # Большие пальцы - ТОЛЬКО пробел!
-        ' ': (57, 'right_thumb')
-    }
-
-        # Символы с Shift для раскладки Зубачев
-        self.shift_keys = {
-            '!': (2, 'left_pinky'),
-            '"': (3, 'left_ring'),
-            '№': (4, 'left_middle'),
-            ';': (5, 'left_index'),
-            '%': (6, 'right_index'),
-            ':': (7, 'right_middle'),
-            '?': (8, 'right_ring'),
-            '*': (9, 'right_pinky'),
-            '(': (10, 'right_pinky'),
-            ')': (11, 'right_pinky'),
-            '_': (12, 'right_pinky'),
-            '-': (12, 'right_pinky'),
-            '=': (13, 'right_pinky'),
-            '+': (13, 'right_pinky'),
-            '/': (43, 'right_index'),
-            ',': (20, 'left_index'),
-            'ъ': (45, 'left_ring'),
-            'ь': (47, 'left_index'),
-        }
-        
-        # Домашние позиции для раскладки Зубачев
-        self.home_positions = {
-            'left_pinky': 30,   # г
-            'left_ring': 31,    # и
-            'left_middle': 32,  # е
-            'left_index': 33,   # о
-            'right_index': 23,  # р
-            'right_middle': 36, # т
-            'right_ring': 38,   # н
-            'right_pinky': 39,  # з
-            'left_thumb': 42,   # shift
-            'right_thumb': 57   # пробел
-        }
+    def __init__(self, layout='standard', capital_shift=True):
+        """layout - имя раскладки из реестра (файлы layouts/*.json) или CompiledLayout
+
+        capital_shift - каждая заглавная буква считается нажатием Shift.
+        capital_shift=False не возвращает прежние штрафы полностью: гистограммы
+        всегда строятся по тексту в форме NFC, и на тексте с разложенными
+        символами (NFD) нажатия по пальцам отличаются.
+        """
+        if not isinstance(layout, CompiledLayout):
+            layout = get_layout(layout)  # LayoutError для неизвестной раскладки
+
+        # Раскладка компилируется один раз и общая для всех анализаторов
+        self.compiled_layout = layout
+        self.layout = layout.name
+        self.keys = layout.keys
+        self.shift_keys = layout.shift_keys
+        self.home_positions = layout.home_positions
+        self.keyboard_map = KEYBOARD_MAP
+        self.char_table = layout.char_table
+        self.capital_shift = capital_shift
 
     def _calculate_penalty(self, key_code, finger):
         """Автоматически вычисляет штраф на основе расстояния от домашней позиции"""
-        if finger in ['left_thumb', 'right_thumb']:
-            return 0
-            
-        home_code = self.home_positions[finger]
-        
-        # Получаем координаты домашней и целевой клавиш
-        home_coords = self.keyboard_map.get(home_code)
-        target_coords = self.keyboard_map.get(key_code)
-        
-        if not home_coords or not target_coords:
-            return 0
-            
-        home_row, home_col = home_coords
-        target_row, target_col = target_coords
-        
-        # Вычисляем манхэттенское расстояние (сумма разниц по рядам и колонкам)
-        row_diff = abs(target_row - home_row)
-        col_diff = abs(target_col - home_col)
-        
-        # Штраф = расстояние от домашней позиции
-        penalty = row_diff + col_diff
-        
-        return penalty
-
-    def _load_text_file(self, filename):
-        """Загрузка текста из файла"""
-        try:
-            with open(filename, 'r', encoding='utf-8') as file:
-                text = file.read()
-                print(f"Успешно загружен {filename}: {len(text)} символов")
-                return text
-        except FileNotFoundError:
-            print(f"ОШИБКА: Файл {filename} не найден!")
-            return ""
-        except Exception as e:
-            print(f"ОШИБКА загрузки файла {filename}: {e}")
-            return ""
+        return key_penalty(key_code, finger, self.home_positions)
 
     def analyze_text(self, text, text_name, common_chars=None):
         """Анализ конкретного текста с возможностью фильтрации общих символов"""
         if not text:
             print(f"Текст {text_name} пустой, пропускаем анализ")
             return None
-            
-        # Фильтруем текст: либо все символы раскладки, либо только общие
+
+        return self._reported(self.analyze_histogram(char_histogram(text), text_name, common_chars),
+                              common_chars)
+
+    def analyze_histogram(self, histogram, text_name, common_chars=None):
+        """Анализ по частотам символов: итоги не зависят от порядка символов в тексте"""
+        with INSTRUMENTATION.stage('lower', self.layout, text_name) as record:
+            histogram, capitals = fold_case(histogram, self.capital_shift)
+            if INSTRUMENTATION.enabled:
+                record['characters'] = sum(histogram.values())
+
+        # Фильтруем символы: либо все символы раскладки, либо только общие
         if common_chars:
-            clean_text = ''.join(c for c in text.lower() if c in common_chars)
-            print(f"  (использовано общих символов: {len(clean_text)})")
+            allowed_chars = common_chars
         else:
-            all_chars = set(self.keys.keys()).union(set(self.shift_keys.keys()))
-            clean_text = ''.join(c for c in text.lower() if c in all_chars)
-        
-        penalties = {finger: 0 for finger in [
-            'left_pinky', 'left_ring', 'left_middle', 'left_index',
-            'right_index', 'right_middle', 'right_ring', 'right_pinky', 
-            'left_thumb', 'right_thumb'
-        ]}
-        
-        finger_counts = {finger: 0 for finger in penalties.keys()}
-        total_penalty = 0
+            allowed_chars = set(self.keys.keys()).union(set(self.shift_keys.keys()))
+
+        finger_penalty_list = [0] * len(FINGERS)
+        finger_count_list = [0] * len(FINGERS)
         shift_count = 0
-        character_count = len(clean_text)
-
-        for char in clean_text:
-            if char in self.keys:
-                key_code, finger = self.keys[char]
-                penalty = self._calculate_penalty(key_code, finger)
-                penalties[finger] += penalty
-                finger_counts[finger] += 1
-                total_penalty += penalty
-            elif char in self.shift_keys:
-                key_code, finger = self.shift_keys[char]
-                # Shift символ = штраф за клавишу + 1 за Shift
-                key_penalty = self._calculate_penalty(key_code, finger)
-                shift_penalty = 1
-                total_penalty += key_penalty + shift_penalty
-                penalties[finger] += key_penalty
-                penalties['left_thumb'] += shift_penalty
-                finger_counts[finger] += 1
-                finger_counts['left_thumb'] += 1
-                shift_count += 1
-        
-        average_penalty = total_penalty / character_count if character_count > 0 else 0
-        
-        # Статистика по рукам
-        left_hand_count = sum(finger_counts[f] for f in ['left_pinky', 'left_ring', 'left_middle', 'left_index', 'left_thumb'])
-        right_hand_count = sum(finger_counts[f] for f in ['right_pinky', 'right_ring', 'right_middle', 'right_index', 'right_thumb'])
-        total_hand_count = left_hand_count + right_hand_count
-        
-        left_hand_percentage = (left_hand_count / total_hand_count * 100) if total_hand_count > 0 else 0
-        right_hand_percentage = (right_hand_count / total_hand_count * 100) if total_hand_count > 0 else 0
-        
-        return {
-            'text_name': text_name,
-            'layout': self.layout,
-            'total_penalty': total_penalty,
-            'finger_penalties': penalties,
-            'finger_counts': finger_counts,
-            'characters_analyzed': character_count,
-            'shift_count': shift_count,
-            'average_penalty': average_penalty,
-            'left_hand_count': left_hand_count,
-            'right_hand_count': right_hand_count,
-            'left_hand_percentage': left_hand_percentage,
-            'right_hand_percentage': right_hand_percentage
-        }
-
-    def analyze_all_files(self, common_chars=None):
-        """Анализ всех трех файлов с возможностью фильтрации общих символов"""
-        files_to_analyze = [
-            ('voina_i_mir.txt', 'Война и мир'),
-            ('digramms.txt', 'Диграммы'),
-            ('1grams.txt', '1-граммы')
-        ]
-        
+        character_count = 0
+
+        table = self.char_table
+        table_size = len(table)
+        with INSTRUMENTATION.stage('score', self.layout, text_name) as record:
+            for char, count in histogram.items():
+                if char not in allowed_chars:
+                    continue
+                character_count += count
+                code = ord(char)
+                entry = table[code] if code < table_size else None
+                if entry is not None:
+                    finger, penalty, shift = entry
+                    finger_penalty_list[finger] += penalty * count
+                    finger_count_list[finger] += count
+                    shift_count += shift * count
+            shift_count += capital_shifts(capitals, table, allowed_chars)
+            record['characters'] = character_count
+
+        # Каждый Shift (символ или заглавная буква) = +1 штрафа и +1 нажатие левого большого пальца
+        finger_penalty_list[LEFT_THUMB] += shift_count
+        finger_count_list[LEFT_THUMB] += shift_count
+
+        return self.make_result(text_name, finger_penalty_list, finger_count_list,
+                                character_count, shift_count)
+
+    def make_result(self, text_name, finger_penalty_list, finger_count_list, character_count,
+                    shift_count):
+        """Результат из накопленных по пальцам (в порядке FINGERS) штрафов и нажатий
+
+        AnalysisResult читается как прежний словарь: result['total_penalty'] и т.д.
+        """
+        return AnalysisResult.from_lists(text_name, self.layout, list(finger_penalty_list),
+                                         list(finger_count_list), character_count, shift_count)
+
+    def _reported(self, result, common_chars):
+        """Печатает, сколько общих символов учтено (для консольного вывода), и возвращает результат"""
+        if result is not None and common_chars:
+            print(f"  (использовано общих символов: {result.characters_analyzed})")
+        return result
+
+    def analyze_file(self, filename, text_name, common_chars=None, cache=None):
+        """Анализ файла по кускам: в памяти никогда не бывает всего текста"""
+        histogram = load_histogram(filename, cache, text_name=text_name)
+        if not histogram:
+            return None
+        return self._reported(self.analyze_histogram(histogram, text_name, common_chars),
+                              common_chars)
+
+    def analyze_ngram_file(self, filename, text_name, common_chars=None):
+        """Анализ частотной таблицы 1-грамм (строки 'символ<TAB>частота')"""
+        table = load_ngram_table(filename)
+        if not table:
+            return None
+        unigrams, pairs = table
+        if not unigrams:
+            print(f"В таблице {filename} нет 1-грамм, пропускаем анализ")
+            return None
+        return self._reported(self.analyze_histogram(unigrams, text_name, common_chars),
+                              common_chars)
+
+    def analyze_all_files(self, common_chars=None, files=FILES_TO_ANALYZE, jobs=1, cache=None):
+        """Анализ всех файлов с возможностью фильтрации общих символов
+
+        jobs > 1 включает параллельное чтение файлов в пуле процессов,
+        cache (HistogramCache) - повторное использование прошлых гистограмм.
+        """
+        if jobs != 1:
+            return [
+                self._reported(self.analyze_histogram(histogram, text_name, common_chars),
+                               common_chars)
+                for text_name, histogram in load_corpora(files, jobs, cache)
+            ]
+
         results = []
         
-        for filename, text_name in files_to_analyze:
+        for filename, text_name in files:
             print(f"\n--- Загрузка {filename} ---")
-            text = self._load_text_file(filename)
-            if text:
-                result = self.analyze_text(text, text_name, common_chars)
-                if result:
-                    results.append(result)
+            result = self.analyze_file(filename, text_name, common_chars, cache)
+            if result:
+                results.append(result)
         
         return results
 
     def print_results(self, results):
         """Вывод результатов для всех текстов"""
         for result in results:
-            print(f"\n{'='*50}")
-            print(f"=== АНАЛИЗ ШТРАФОВ ДЛЯ: {result['text_name']} ===")
-            print(f"=== РАСКЛАДКА: {result['layout']} ===")
-            print(f"{'='*50}")
-            print(f"Всего проанализировано символов: {result['characters_analyzed']}")
-            print(f"ОБЩИЙ ШТРАФ: {result['total_penalty']}")
-            print(f"СРЕДНИЙ ШТРАФ НА СИМВОЛ: {result['average_penalty']:.2f}")
-            print(f"Количество Shift-символов: {result['shift_count']}")
-
-            print(f"\nРаспределение по рукам:")
-            print(f"Левая рука: {result['left_hand_count']} нажатий ({result['left_hand_percentage']:.1f}%)")
-            print(f"Правая рука: {result['right_hand_count']} нажатий ({result['right_hand_percentage']:.1f}%)")
-
-            print(f"\nНагрузка по пальцам:")
-            for finger in ['left_pinky', 'left_ring', 'left_middle', 'left_index', 
-                          'right_index', 'right_middle', 'right_ring', 'right_pinky', 
-                          'left_thumb', 'right_thumb']:
-                count = result['finger_counts'][finger]
-                if count > 0:  # Показываем только пальцы с ненулевой нагрузкой
-                    percentage = (count / result['characters_analyzed'] * 100)
-                    print(f"  {finger}: {count} нажатий ({percentage:.1f}%)")
+            with INSTRUMENTATION.stage('print', self.layout, result.text_name):
+                self._print_result(result)
+
+    def _print_result(self, result):
+        """Вывод результата одного текста"""
+        print(f"\n{'='*50}")
+        print(f"=== АНАЛИЗ ШТРАФОВ ДЛЯ: {result.text_name} ===")
+        print(f"=== РАСКЛАДКА: {result.layout} ===")
+        print(f"{'='*50}")
+        print(f"Всего проанализировано символов: {result.characters_analyzed}")
+        print(f"ОБЩИЙ ШТРАФ: {result.total_penalty}")
+        print(f"СРЕДНИЙ ШТРАФ НА СИМВОЛ: {result.average_penalty:.2f}")
+        print(f"Количество Shift-символов: {result.shift_count}")
+
+        print(f"\nРаспределение по рукам:")
+        print(f"Левая рука: {result.left_hand_count} нажатий ({result.left_hand_percentage:.1f}%)")
+        print(f"Правая рука: {result.right_hand_count} нажатий ({result.right_hand_percentage:.1f}%)")
+
+        print(f"\nНагрузка по пальцам:")
+        for finger in ['left_pinky', 'left_ring', 'left_middle', 'left_index', 
+                      'right_index', 'right_middle', 'right_ring', 'right_pinky', 
+                      'left_thumb', 'right_thumb']:
+            count = result.finger_counts[finger]
+            if count > 0:  # Показываем только пальцы с ненулевой нагрузкой
+                percentage = (count / result.characters_analyzed * 100)
+                print(f"  {finger}: {count} нажатий ({percentage:.1f}%)")
 
 
 def get_common_chars():
@@ -411,50 +212,225 @@ def get_common_chars():
     return basic_russian.union(common_shift)
 
 
-# Запуск для всех трех раскладок с ОБЩИМИ СИМВОЛАМИ
-print("="*70)
-print("СРАВНЕНИЕ ТРЕХ РАСКЛАДОК НА ОБЩИХ СИМВОЛАХ")
-print("="*70)
+def load_histogram(filename, cache=None, progress=None, scan='text', text_name=None):
+    """Потоковое чтение файла в гистограмму символов (или из кэша HistogramCache)
 
-# Получаем общие символы
-common_chars = get_common_chars()
-print(f"Используется общих символов: {len(common_chars)}")
-print(f"Общие символы: {''.join(sorted(common_chars))}")
+    progress(прочитано байт, размер файла) вызывается по ходу чтения;
+    AnalysisCancelled из него прерывает загрузку и передаётся наружу.
+    scan='mmap' считает символы прямо по байтам отображённого в память файла.
+    text_name - название текста в замерах, как у этапов анализа (по умолчанию имя файла).
+    """
+    with INSTRUMENTATION.stage('load', file=text_name or filename) as record:
+        try:
+            if cache is not None:
+                histogram = cache.char_histogram(filename, progress, scan)
+            else:
+                histogram = SCAN_MODES[scan](filename, progress=progress)
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            histogram = e
+        else:
+            if INSTRUMENTATION.enabled:
+                record['bytes'] = os.path.getsize(filename)
+                record['characters'] = sum(histogram.values())
+    return _checked_histogram(filename, histogram)
 
-# Анализ для каждой раскладки
-layouts = [
-    ('standard', 'СТАНДАРТНАЯ'),
-    ('challenge', 'ВЫЗОВ'), 
-    ('zubachev', 'ЗУБАЧЕВ')
-]
 
-all_results = {}
+def load_pair_histogram(filename, cache=None):
+    """Потоковое чтение файла в гистограмму пар символов (или из кэша); None при ошибке"""
+    try:
+        if cache is not None:
+            return cache.pair_histogram(filename)
+        return file_pair_histogram(filename)
+    except FileNotFoundError:
+        print(f"ОШИБКА: Файл {filename} не найден!")
+    except Exception as e:
+        print(f"ОШИБКА загрузки файла {filename}: {e}")
+    return None
 
-for layout_code, layout_name in layouts:
-    print(f"\n\n{'='*70}")
-    print(f"АНАЛИЗ РАСКЛАДКИ: {layout_name}")
-    print("="*70)
-    
-    analyzer = KeyboardAnalyzer(layout=layout_code)
-    results = analyzer.analyze_all_files(common_chars)
-    analyzer.print_results(results)
-    all_results[layout_code] = results
-
-# Сводная таблица для сравнения всех раскладок
-print(f"\n{'='*90}")
-print("СВОДНАЯ ТАБЛИЦА ДЛЯ СРАВНЕНИЯ ТРЕХ РАСКЛАДОК (ОБЩИЕ СИМВОЛЫ)")
-print(f"{'='*90}")
-print(f"{'Текст':<15} {'Раскладка':<12} {'Символов':<10} {'Общий штраф':<12} {'Ср. штраф':<10} {'Левая рука':<12} {'Правая рука':<12}")
-print(f"{'-'*90}")
-
-for i in range(3):  # для трех текстов
+
+def load_ngram_table(filename):
+    """Чтение частотной таблицы n-грамм: (1-граммы, 2-граммы) или None при ошибке"""
+    try:
+        unigrams, pairs, skipped = read_ngram_table(filename)
+    except FileNotFoundError:
+        print(f"ОШИБКА: Файл {filename} не найден!")
+        return None
+    except Exception as e:
+        print(f"ОШИБКА загрузки файла {filename}: {e}")
+        return None
+    if not unigrams and not pairs:
+        print(f"ОШИБКА: в файле {filename} нет строк вида 'n-грамма<TAB>частота'")
+        return None
+    print(f"Успешно загружена таблица {filename}: {len(unigrams)} 1-грамм, "
+          f"{len(pairs)} 2-грамм, пропущено строк: {skipped}")
+    return unigrams, pairs
+
+
+def _checked_histogram(filename, histogram):
+    """Сообщает об итоге загрузки файла; ошибка загрузки превращается в None"""
+    if isinstance(histogram, FileNotFoundError):
+        print(f"ОШИБКА: Файл {filename} не найден!")
+        return None
+    if isinstance(histogram, Exception):
+        print(f"ОШИБКА загрузки файла {filename}: {histogram}")
+        return None
+    print(f"Успешно загружен {filename}: {sum(histogram.values())} символов")
+    return histogram
+
+
+def load_corpora(files=FILES_TO_ANALYZE, jobs=1, cache=None, scan='text'):
+    """Читает каждый файл один раз: список (название текста, гистограмма)
+
+    При jobs > 1 файлы и куски больших файлов читаются в пуле из jobs
+    процессов (None - по числу ядер), результат тот же, что и при jobs=1.
+    С cache (HistogramCache) неизменённые файлы не читаются вовсе.
+    scan='mmap' - сканирование байт (см. load_histogram), файлы читаются по очереди.
+    """
+    return list(stream_corpora(files, jobs, cache, scan))
+
+
+def stream_corpora(files=FILES_TO_ANALYZE, jobs=1, cache=None, scan='text'):
+    """Генератор (название текста, гистограмма) в порядке files, как load_corpora
+
+    При jobs > 1 все файлы сразу отправляются в один пул процессов,
+    а каждый корпус отдаётся, как только прочитан, - не дожидаясь остальных.
+    """
+    loaded = [None] * len(files)
+    if cache is not None:
+        loaded = [_cached_histogram(cache, filename, text_name) for filename, text_name in files]
+
+    missing = [i for i, histogram in enumerate(loaded) if histogram is None]
+    parallel = None
+    if jobs != 1 and missing and scan == 'text':
+        parallel = iter_parallel_file_histograms([files[i][0] for i in missing], jobs)
+
+    try:
+        for (filename, text_name), histogram in zip(files, loaded):
+            print(f"\n--- Загрузка {filename} ---")
+            if histogram is None and parallel is not None:
+                with INSTRUMENTATION.stage('load', file=text_name) as record:
+                    histogram = next(parallel)
+                    if INSTRUMENTATION.enabled and not isinstance(histogram, Exception):
+                        record['bytes'] = os.path.getsize(filename)
+                        record['characters'] = sum(histogram.values())
+                if cache is not None and not isinstance(histogram, Exception):
+                    cache.store(filename, histogram)
+            if histogram is None:
+                histogram = load_histogram(filename, cache, scan=scan, text_name=text_name)
+            else:
+                histogram = _checked_histogram(filename, histogram)
+            if histogram:
+                yield text_name, histogram
+    finally:
+        if parallel is not None:
+            parallel.close()
+
+
+def _cached_histogram(cache, filename, text_name=None):
+    """Гистограмма из кэша или None (промах, файл не найден)"""
+    with INSTRUMENTATION.stage('cache', file=text_name or filename) as record:
+        try:
+            histogram = cache.load(filename)
+        except OSError:
+            return None
+        if histogram is not None and INSTRUMENTATION.enabled:
+            record['bytes'] = os.path.getsize(filename)
+            record['characters'] = sum(histogram.values())
+        return histogram
+
+
+def load_total_histogram(files=FILES_TO_ANALYZE, cache=None, progress=None):
+    """Суммарная гистограмма всех файлов; файлы с ошибкой загрузки пропускаются
+
+    progress(доля от 0 до 1) сообщает о ходу чтения всех файлов вместе.
+    """
+    sizes = []
+    for filename, _ in files:
+        try:
+            sizes.append(os.path.getsize(filename))
+        except OSError:
+            sizes.append(0)
+    total_size = sum(sizes) or 1
+
+    total = Counter()
+    done = 0
+    for (filename, text_name), size in zip(files, sizes):
+        file_progress = None
+        if progress is not None:
+            file_progress = lambda read, _size, done=done: progress(min((done + read) / total_size, 1))
+        histogram = load_histogram(filename, cache, file_progress, text_name=text_name)
+        if histogram:
+            total.update(histogram)
+        done += size
+        if progress is not None:
+            progress(done / total_size)
+    return total
+
+
+def compare_layouts(layouts=LAYOUTS, files=FILES_TO_ANALYZE, common_chars=None, jobs=1,
+                    cache=None):
+    """Сравнение раскладок: корпус читается один раз, каждая раскладка считается по гистограмме
+
+    Возвращает словарь: код раскладки -> ResultTable с результатами по текстам.
+    """
+    corpora = load_corpora(files, jobs, cache)
+    all_results = {}
     for layout_code, layout_name in layouts:
-        results = all_results[layout_code]
-        if i < len(results):
-            result = results[i]
-            layout_display_name = 'Стандарт' if layout_code == 'standard' else 'Вызов' if layout_code == 'challenge' else 'Зубачев'
-            
-            print(f"{result['text_name']:<15} {layout_display_name:<12} {result['characters_analyzed']:<10} {result['total_penalty']:<12} {result['average_penalty']:<10.2f} {result['left_hand_percentage']:<10.1f}% {result['right_hand_percentage']:<10.1f}%")
-    
-    if i < 2:  # не печатать разделитель после последнего текста
-        print(f"{'-'*90}")
\ No newline at end of file
+        analyzer = KeyboardAnalyzer(layout=layout_code)
+        all_results[layout_code] = ResultTable(
+            analyzer._reported(analyzer.analyze_histogram(histogram, text_name, common_chars),
+                               common_chars)
+            for text_name, histogram in corpora
+        )
+    return all_results
+
+
+def print_summary(all_results, layouts=LAYOUTS):
+    """Сводная таблица для сравнения раскладок"""
+    print(f"\n{'='*90}")
+    print("СВОДНАЯ ТАБЛИЦА ДЛЯ СРАВНЕНИЯ ТРЕХ РАСКЛАДОК (ОБЩИЕ СИМВОЛЫ)")
+    print(f"{'='*90}")
+    print(f"{'Текст':<15} {'Раскладка':<12} {'Символов':<10} {'Общий штраф':<12} {'Ср. штраф':<10} {'Левая рука':<12} {'Правая рука':<12}")
+    print(f"{'-'*90}")
+
+    text_count = max((len(results) for results in all_results.values()), default=0)
+    for i in range(text_count):
+        for layout_code, layout_name in layouts:
+            results = all_results[layout_code]
+            if i < len(results):
+                result = results[i]
+                layout_display_name = get_layout(layout_code).short_name
+
+                print(f"{result.text_name:<15} {layout_display_name:<12} {result.characters_analyzed:<10} {result.total_penalty:<12} {result.average_penalty:<10.2f} {result.left_hand_percentage:<10.1f}% {result.right_hand_percentage:<10.1f}%")
+
+        if i < text_count - 1:  # не печатать разделитель после последнего текста
+            print(f"{'-'*90}")
+
+
+if __name__ == '__main__':
+    # Запуск для всех трех раскладок с ОБЩИМИ СИМВОЛАМИ
+    print("="*70)
+    print("СРАВНЕНИЕ ТРЕХ РАСКЛАДОК НА ОБЩИХ СИМВОЛАХ")
+    print("="*70)
+
+    # Получаем общие символы
+    common_chars = get_common_chars()
+    print(f"Используется общих символов: {len(common_chars)}")
+    print(f"Общие символы: {''.join(sorted(common_chars))}")
+
+    # Каждый файл читается один раз, затем считаются все раскладки
+    all_results = compare_layouts(LAYOUTS, FILES_TO_ANALYZE, common_chars,
+                                  cache=HistogramCache())
+    if not any(all_results.values()):
+        print("ОШИБКА: не загружен ни один корпус")
+        sys.exit(1)
+
+    for layout_code, layout_name in LAYOUTS:
+        print(f"\n\n{'='*70}")
+        print(f"АНАЛИЗ РАСКЛАДКИ: {layout_name}")
+        print("="*70)
+        KeyboardAnalyzer(layout=layout_code).print_results(all_results[layout_code])
+
+    print_summary(all_results, LAYOUTS)
@@ -0,0 +1,186 @@
+"""
+Модуль поиска раскладки с минимальным штрафом
+Имитация отжига по перестановкам символов между клавишами: штраф обмена
+двух символов считается за O(1) по гистограмме частот, а не пересчётом текста
+"""
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from corpus import lower_pair_histogram
+from layout_registry import CompiledLayout
+from main import KeyboardAnalyzer
+from prefilter import fold_case
+
+
+class LayoutSearch:
+    def __init__(self, histogram, layout='standard', common_chars=None, pinned=(),
+                 key_codes=None, pairs=None, transition_weight=0):
+        """Подготовка задачи поиска
+
+        histogram - частоты символов корпуса, pairs - частоты пар (для штрафа
+        переходов с весом transition_weight). Переставляются только символы
+        обычных клавиш раскладки layout (имя или CompiledLayout), входящие в common_chars, кроме
+        pinned; key_codes ограничивает набор клавиш, между которыми они ходят.
+        Shift-символы остаются на своих местах.
+        """
+        self.analyzer = KeyboardAnalyzer(layout=layout)
+        self.transition_weight = transition_weight
+        histogram, _ = fold_case(histogram, capital_shift=False)
+        alphabet = common_chars if common_chars else self.analyzer.keys
+
+        self.chars = [
+            char for char, (key_code, finger) in self.analyzer.keys.items()
+            if char in alphabet and char not in pinned
+            and (key_codes is None or key_code in key_codes)
+        ]
+        # Клавиши, которые сейчас занимают подвижные символы: (код, палец)
+        self.slots = [self.analyzer.keys[char] for char in self.chars]
+        self.slot_penalties = [self.analyzer._calculate_penalty(*slot) for slot in self.slots]
+        self.frequencies = [histogram.get(char, 0) for char in self.chars]
+
+        # Переходы: для каждого подвижного символа список соседей (индекс, частота)
+        self.neighbours = [[] for _ in self.chars]
+        self.travel = []
+        if pairs and transition_weight:
+            self.travel = [[self.transition_cost(first, second) for second in range(len(self.slots))]
+                           for first in range(len(self.slots))]
+            index = {char: i for i, char in enumerate(self.chars)}
+            for (first, second), count in lower_pair_histogram(pairs).items():
+                i = index.get(first)
+                j = index.get(second)
+                if i is not None and j is not None and i != j:
+                    self.neighbours[i].append((j, count))
+                    self.neighbours[j].append((i, count))
+
+    def transition_cost(self, first_slot, second_slot):
+        """Штраф перехода: путь пальца, если обе клавиши нажимает один палец"""
+        first_code, first_finger = self.slots[first_slot]
+        second_code, second_finger = self.slots[second_slot]
+        if first_finger != second_finger or first_code == second_code:
+            return 0
+        first_coords = self.analyzer.keyboard_map.get(first_code)
+        second_coords = self.analyzer.keyboard_map.get(second_code)
+        if not first_coords or not second_coords:
+            return 0
+        return abs(first_coords[0] - second_coords[0]) + abs(first_coords[1] - second_coords[1])
+
+    def cost(self, assignment):
+        """Полный штраф расстановки: assignment[i] - индекс клавиши символа i"""
+        total = sum(frequency * self.slot_penalties[slot]
+                    for frequency, slot in zip(self.frequencies, assignment))
+        if self.transition_weight:
+            travel = 0
+            for i, neighbours in enumerate(self.neighbours):
+                for j, count in neighbours:
+                    travel += count * self.travel[assignment[i]][assignment[j]]
+            total += self.transition_weight * travel / 2  # каждая пара учтена дважды
+        return total
+
+    def swap_delta(self, assignment, i, j):
+        """Изменение штрафа при обмене клавишами символов i и j"""
+        slot_i = assignment[i]
+        slot_j = assignment[j]
+        penalty_diff = self.slot_penalties[slot_j] - self.slot_penalties[slot_i]
+        delta = (self.frequencies[i] - self.frequencies[j]) * penalty_diff
+        if self.transition_weight:
+            travel = 0
+            for moved, old_row, new_row in ((i, self.travel[slot_i], self.travel[slot_j]),
+                                            (j, self.travel[slot_j], self.travel[slot_i])):
+                for other, count in self.neighbours[moved]:
+                    if other == i or other == j:
+                        continue
+                    other_slot = assignment[other]
+                    travel += count * (new_row[other_slot] - old_row[other_slot])
+            delta += self.transition_weight * travel
+        return delta
+
+    def anneal(self, iterations=200000, seed=0):
+        """Один запуск имитации отжига; возвращает (штраф, расстановка)"""
+        rng = random.Random(seed)
+        size = len(self.chars)
+        assignment = list(range(size))
+        # Без итераций или без пары подвижных символов искать нечего: исходная расстановка
+        if size < 2 or iterations <= 0:
+            return self.cost(assignment), assignment
+        rng.shuffle(assignment)
+
+        # Начальная температура - средний модуль изменения штрафа при случайном обмене
+        samples = [abs(self.swap_delta(assignment, *rng.sample(range(size), 2))) for _ in range(100)]
+        temperature = max(sum(samples) / len(samples), 1e-9)
+        cooling = 1e-4 ** (1 / iterations)  # к концу температура падает в 10000 раз
+
+        current = self.cost(assignment)
+        best = current
+        best_assignment = assignment[:]
+        for _ in range(iterations):
+            i = rng.randrange(size)
+            j = rng.randrange(size)
+            if i == j:
+                continue
+            delta = self.swap_delta(assignment, i, j)
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                assignment[i], assignment[j] = assignment[j], assignment[i]
+                current += delta
+                if current < best:
+                    best = current
+                    best_assignment = assignment[:]
+            temperature *= cooling
+        return best, best_assignment
+
+    def keys_for(self, assignment):
+        """Словарь keys раскладки для расстановки"""
+        keys = dict(self.analyzer.keys)
+        for char, slot in zip(self.chars, assignment):
+            keys[char] = self.slots[slot]
+        return keys
+
+
+def _run_restart(search, iterations, seed):
+    """Запуск отжига в процессе-воркере"""
+    return search.anneal(iterations, seed)
+
+
+def optimize_layout(histogram, layout='standard', common_chars=None, pinned=(), key_codes=None,
+                    pairs=None, transition_weight=0, iterations=200000, restarts=4, jobs=None,
+                    seed=0):
+    """Поиск раскладки с минимальным штрафом несколькими параллельными запусками отжига
+
+    Возвращает словарь с лучшей раскладкой keys, её штрафом в модели поиска
+    cost и total_penalty по analyze_histogram. cost учитывает только подвижные
+    символы (и переходы между ними при transition_weight), а total_penalty -
+    весь текст: неподвижные символы, Shift-символы и Shift заглавных букв.
+    iterations <= 0 оставляет исходную раскладку.
+    """
+    if restarts < 1:
+        raise ValueError(f"restarts должно быть не меньше 1, получено {restarts}")
+    search = LayoutSearch(histogram, layout, common_chars, pinned, key_codes,
+                          pairs, transition_weight)
+    seeds = [seed + restart for restart in range(restarts)]
+    if jobs == 1:
+        runs = [search.anneal(iterations, run_seed) for run_seed in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            runs = list(pool.map(_run_restart, [search] * restarts, [iterations] * restarts, seeds))
+
+    # Лучший запуск; при равном штрафе - с меньшим seed, чтобы результат был воспроизводим
+    best_cost, best_seed, best_assignment = min(
+        (cost, run_seed, assignment) for (cost, assignment), run_seed in zip(runs, seeds))
+
+    definition = search.analyzer.compiled_layout.definition()
+    definition['keys'] = search.keys_for(best_assignment)
+    optimized_name = f"{search.analyzer.layout}-optimized"
+    definition['title'] = optimized_name.upper()
+    definition['short_name'] = optimized_name
+    optimized_layout = CompiledLayout(optimized_name, definition)
+
+    result = KeyboardAnalyzer(optimized_layout).analyze_histogram(histogram, 'optimized', common_chars)
+    return {
+        'layout': optimized_name,
+        'compiled_layout': optimized_layout,  # можно сохранить через save_layout_file
+        'keys': optimized_layout.keys,
+        'cost': best_cost,
+        'seed': best_seed,
+        'total_penalty': result['total_penalty'],
+        'result': result
+    }
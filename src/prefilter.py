@@ -0,0 +1,128 @@
+"""
+Модуль предварительной фильтрации текста
+Приводит текст к форме NFC (составные 'ё' и 'й' из буквы и диакритического
+знака становятся одним символом) и выбрасывает символы вне алфавита за один
+проход str.translate. Регистр сохраняется: гистограмму в нижний регистр
+с нажатием Shift для каждой заглавной буквы переводит fold_case
+"""
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+
+def nfc(text):
+    """Текст в форме NFC; уже нормализованный текст не копируется"""
+    if unicodedata.is_normalized('NFC', text):
+        return text
+    return unicodedata.normalize('NFC', text)
+
+
+@lru_cache(maxsize=None)
+def _composing_chars():
+    """Символы без диакритики, которые NFC соединяет с предыдущим символом
+
+    Вторые символы канонических разложений (например, знаки гласных
+    индийских письменностей) и гласные и конечные согласные чамо хангыля
+    (их слоги складываются по формуле, а не по таблице разложений).
+    Канонические разложения есть только у символов первых трёх плоскостей.
+    """
+    chars = set(map(chr, range(0x1161, 0x1176)))  # гласные чамо
+    chars.update(map(chr, range(0x11A8, 0x11C3)))  # конечные согласные чамо
+    for code in range(0x30000):
+        decomposition = unicodedata.decomposition(chr(code)).split()
+        if len(decomposition) == 2 and not decomposition[0].startswith('<'):
+            second = chr(int(decomposition[1], 16))
+            if not unicodedata.combining(second):
+                chars.add(second)
+    return frozenset(chars)
+
+
+def nfc_inert(char):
+    """Символ не меняется при NFC и не соединяется с предыдущим
+
+    Перед таким символом текст можно разрезать: нормализация кусков
+    по отдельности даёт то же, что и нормализация всего текста.
+    """
+    if char.isascii():
+        return True
+    return (not unicodedata.combining(char) and unicodedata.is_normalized('NFC', char)
+            and char not in _composing_chars())
+
+
+def nfc_chunks(chunks):
+    """Нормализует поток кусков текста
+
+    Хвост куска, начиная с последнего символа, перед которым можно резать
+    (nfc_inert), переносится в следующий кусок: к нему могут относиться
+    диакритические знаки или чамо из начала следующего.
+    """
+    tail = ''
+    for chunk in chunks:
+        chunk = tail + chunk
+        cut = len(chunk) - 1
+        while cut > 0 and not nfc_inert(chunk[cut]):
+            cut -= 1
+        if cut <= 0:
+            tail = chunk
+            continue
+        tail = chunk[cut:]
+        yield nfc(chunk[:cut])
+    if tail:
+        yield nfc(tail)
+
+
+def is_capital(char):
+    """Заглавная буква: меняется при переводе в нижний регистр"""
+    return char != char.lower()
+
+
+def fold_case(histogram, capital_shift=True):
+    """Гистограмма в нижнем регистре и частоты заглавных букв
+
+    Возвращает (строчные, заглавные): во второй гистограмме заглавная
+    буква записана строчной, каждая её частота - одно нажатие Shift.
+    При capital_shift=False заглавные не считаются.
+    """
+    lowered = Counter()
+    capitals = Counter()
+    for char, count in histogram.items():
+        lower = char.lower()
+        # lower() может вернуть несколько символов (например, 'İ'), как и text.lower()
+        for lower_char in lower:
+            lowered[lower_char] += count
+        if capital_shift and lower != char:
+            capitals[lower[0]] += count
+    return lowered, capitals
+
+
+class _TranslationTable(dict):
+    """Таблица для str.translate, которая заполняется при первой встрече символа
+
+    Различных символов в тексте немного, поэтому после первых строк
+    все поиски идут по обычному словарю без вызовов Python-кода.
+    """
+
+    def __init__(self, alphabet):
+        super().__init__()
+        self.alphabet = alphabet
+
+    def __missing__(self, code):
+        char = chr(code)
+        # Символ остаётся (в своём регистре), если его строчная форма есть в алфавите
+        value = char if any(lower_char in self.alphabet for lower_char in char.lower()) else None
+        self[code] = value
+        return value
+
+
+class Prefilter:
+    def __init__(self, alphabet):
+        """Фильтр текста для алфавита alphabet (строчные символы)
+
+        Регистр сохраняется, заглавные буквы затем считает fold_case.
+        """
+        self.alphabet = frozenset(alphabet)
+        self.table = _TranslationTable(self.alphabet)
+
+    def translate(self, text):
+        """Отфильтрованный текст: NFC, только символы алфавита (в любом регистре)"""
+        return nfc(text).translate(self.table)
@@ -0,0 +1,216 @@
+"""
+Модуль компактных результатов анализа
+Результат хранит штрафы и нажатия по пальцам в одном массиве int64
+(пальцы - индексы в FINGERS), а словарь прежнего вида собирается только
+по запросу. Таблица результатов хранится по столбцам и сохраняется
+в формат .npy (заголовок пишется вручную, numpy не нужен)
+"""
+import ast
+import struct
+from array import array
+from collections.abc import Mapping
+
+from layout_registry import FINGERS
+
+FINGER_COUNT = len(FINGERS)
+# Положение чисел в массиве результата
+PENALTIES = slice(0, FINGER_COUNT)
+COUNTS = slice(FINGER_COUNT, 2 * FINGER_COUNT)
+CHARACTERS = 2 * FINGER_COUNT
+SHIFTS = 2 * FINGER_COUNT + 1
+FIELD_COUNT = 2 * FINGER_COUNT + 2
+
+LEFT_FINGERS = [i for i, finger in enumerate(FINGERS) if finger.startswith('left_')]
+RIGHT_FINGERS = [i for i, finger in enumerate(FINGERS) if finger.startswith('right_')]
+
+# Ключи словаря результата в прежнем порядке
+RESULT_KEYS = ('text_name', 'layout', 'total_penalty', 'finger_penalties', 'finger_counts',
+               'characters_analyzed', 'shift_count', 'average_penalty', 'left_hand_count',
+               'right_hand_count', 'left_hand_percentage', 'right_hand_percentage')
+
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+
+class AnalysisResult(Mapping):
+    """Результат анализа текста на раскладке
+
+    Читается как прежний словарь (result['total_penalty'], dict(result)),
+    но хранит только название текста, имя раскладки и массив чисел.
+    """
+    __slots__ = ('text_name', 'layout', 'totals')
+
+    def __init__(self, text_name, layout, totals):
+        self.text_name = text_name
+        self.layout = layout
+        self.totals = totals if isinstance(totals, array) else array('q', totals)
+
+    @classmethod
+    def from_lists(cls, text_name, layout, finger_penalty_list, finger_count_list,
+                   character_count, shift_count):
+        return cls(text_name, layout, array('q', finger_penalty_list + finger_count_list
+                                            + [character_count, shift_count]))
+
+    @property
+    def finger_penalty_list(self):
+        return self.totals[PENALTIES]
+
+    @property
+    def finger_count_list(self):
+        return self.totals[COUNTS]
+
+    @property
+    def total_penalty(self):
+        return sum(self.totals[PENALTIES])
+
+    @property
+    def finger_penalties(self):
+        return dict(zip(FINGERS, self.totals[PENALTIES]))
+
+    @property
+    def finger_counts(self):
+        return dict(zip(FINGERS, self.totals[COUNTS]))
+
+    @property
+    def characters_analyzed(self):
+        return self.totals[CHARACTERS]
+
+    @property
+    def shift_count(self):
+        return self.totals[SHIFTS]
+
+    @property
+    def average_penalty(self):
+        characters = self.totals[CHARACTERS]
+        return self.total_penalty / characters if characters > 0 else 0
+
+    @property
+    def left_hand_count(self):
+        return sum(self.totals[FINGER_COUNT + i] for i in LEFT_FINGERS)
+
+    @property
+    def right_hand_count(self):
+        return sum(self.totals[FINGER_COUNT + i] for i in RIGHT_FINGERS)
+
+    @property
+    def left_hand_percentage(self):
+        total = self.left_hand_count + self.right_hand_count
+        return (self.left_hand_count / total * 100) if total > 0 else 0
+
+    @property
+    def right_hand_percentage(self):
+        total = self.left_hand_count + self.right_hand_count
+        return (self.right_hand_count / total * 100) if total > 0 else 0
+
+    def __getitem__(self, key):
+        if key not in RESULT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(RESULT_KEYS)
+
+    def __len__(self):
+        return len(RESULT_KEYS)
+
+    def __repr__(self):
+        return f"AnalysisResult({self.text_name!r}, {self.layout!r}, {self.totals.tolist()})"
+
+    def __reduce__(self):
+        return (AnalysisResult, (self.text_name, self.layout, self.totals))
+
+    def to_dict(self):
+        """Словарь прежнего вида (для JSON)"""
+        return dict(self)
+
+    def merge(self, other, text_name=None):
+        """Сумма двух результатов одной раскладки (например, по двум частям корпуса)"""
+        if other.layout != self.layout:
+            raise ValueError(f"Нельзя сложить результаты раскладок {self.layout} и {other.layout}")
+        totals = array('q', map(sum, zip(self.totals, other.totals)))
+        return AnalysisResult(text_name or self.text_name, self.layout, totals)
+
+
+class ResultTable:
+    """Таблица результатов по столбцам: названия текстов, раскладки и общий массив чисел"""
+
+    def __init__(self, results=()):
+        self.text_names = []
+        self.layouts = []
+        self.totals = array('q')
+        self.extend(results)
+
+    def append(self, result):
+        self.text_names.append(result.text_name)
+        self.layouts.append(result.layout)
+        self.totals.extend(result.totals)
+
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+
+    def __len__(self):
+        return len(self.text_names)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start = index * FIELD_COUNT
+        return AnalysisResult(self.text_names[index], self.layouts[index],
+                              self.totals[start:start + FIELD_COUNT])
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def _dtype(self):
+        """Описание записи .npy и формат struct для одной строки"""
+        text_width = max(map(len, self.text_names), default=1) or 1
+        layout_width = max(map(len, self.layouts), default=1) or 1
+        descr = [('text_name', f'<U{text_width}'), ('layout', f'<U{layout_width}'),
+                 ('finger_penalties', '<i8', (FINGER_COUNT,)),
+                 ('finger_counts', '<i8', (FINGER_COUNT,)),
+                 ('characters_analyzed', '<i8'), ('shift_count', '<i8')]
+        return descr, struct.Struct(f'<{4 * text_width}s{4 * layout_width}s{FIELD_COUNT}q')
+
+    def save_npy(self, path):
+        """Сохраняет таблицу в .npy со структурированными записями (читается numpy.load)"""
+        descr, row = self._dtype()
+        header = repr({'descr': descr, 'fortran_order': False, 'shape': (len(self),)})
+        # Длина заголовка вместе с сигнатурой кратна 64, в конце - перевод строки
+        padding = 64 - (len(NPY_MAGIC) + 2 + len(header) + 1) % 64
+        header = (header + ' ' * (padding % 64) + '\n').encode('latin1')
+
+        with open(path, 'wb') as file:
+            file.write(NPY_MAGIC + struct.pack('<H', len(header)) + header)
+            for i, (text_name, layout) in enumerate(zip(self.text_names, self.layouts)):
+                start = i * FIELD_COUNT
+                file.write(row.pack(text_name.encode('utf-32-le'), layout.encode('utf-32-le'),
+                                    *self.totals[start:start + FIELD_COUNT]))
+
+    @classmethod
+    def load_npy(cls, path):
+        """Читает таблицу, сохранённую save_npy"""
+        with open(path, 'rb') as file:
+            data = file.read()
+        if data[:len(NPY_MAGIC)] != NPY_MAGIC:
+            raise ValueError(f"{path}: не файл .npy версии 1.0")
+        header_size, = struct.unpack_from('<H', data, len(NPY_MAGIC))
+        offset = len(NPY_MAGIC) + 2
+        header = ast.literal_eval(data[offset:offset + header_size].decode('latin1'))
+        offset += header_size
+
+        descr = header['descr']
+        if [field[0] for field in descr] != ['text_name', 'layout', 'finger_penalties',
+                                             'finger_counts', 'characters_analyzed', 'shift_count']:
+            raise ValueError(f"{path}: неизвестный формат записей")
+        text_width = int(descr[0][1][2:])
+        layout_width = int(descr[1][1][2:])
+        row = struct.Struct(f'<{4 * text_width}s{4 * layout_width}s{FIELD_COUNT}q')
+
+        table = cls()
+        for fields in row.iter_unpack(data[offset:offset + row.size * header['shape'][0]]):
+            table.text_names.append(fields[0].decode('utf-32-le').rstrip('\x00'))
+            table.layouts.append(fields[1].decode('utf-32-le').rstrip('\x00'))
+            table.totals.extend(fields[2:])
+        return table
@@ -0,0 +1,411 @@
+"""
+Модуль локального сервиса анализа
+Один процесс держит в памяти скомпилированные раскладки и гистограммы
+корпусов и отвечает на запросы оценки по HTTP (TCP или Unix-сокет).
+Запросы обслуживает asyncio, холодное чтение корпусов идёт в пуле
+процессов, так что много клиентов на одной машине делят один прогретый
+анализатор. Запуск из каталога src:
+    python service.py --port 8765
+    python service.py --socket /tmp/keyboard_typing.sock --preload
+Запросы (JSON):
+    GET  /health, /layouts, /corpora
+    POST /corpora {"id": "mybook", "path": "mybook.txt"}
+    POST /score   {"layout": "zubachev" или описание раскладки, "corpus": "voina_i_mir",
+                   "common_chars": true, "capital_shift": true, "model": "timing"}
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+from cache import HistogramCache
+from corpus import SCAN_MODES, file_pair_histogram
+from cost_models import MODELS
+from layout_registry import REGISTRY, CompiledLayout, LayoutError, get_layout
+from main import FILES_TO_ANALYZE, KeyboardAnalyzer, get_common_chars
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+COMPILED_CACHE_SIZE = 256  # скомпилированных раскладок и моделей в памяти
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADER_LINES = 100
+
+
+class ServiceError(Exception):
+    """Ошибка запроса с HTTP-статусом ответа"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _scan_file(filename, kind, scan, use_cache):
+    """Холодное чтение файла в процессе пула: гистограмма символов ('chars') или пар ('pairs')"""
+    cache = HistogramCache() if use_cache else None
+    if kind == 'pairs':
+        return cache.pair_histogram(filename) if cache else file_pair_histogram(filename)
+    if cache:
+        return cache.char_histogram(filename, scan=scan)
+    return SCAN_MODES[scan](filename)
+
+
+class AnalysisService:
+    def __init__(self, files=FILES_TO_ANALYZE, jobs=None, scan='text', use_cache=True):
+        """Сервис с корпусами files (список (файл, название текста))
+
+        Id корпуса - имя файла без расширения. jobs - процессов для холодного
+        чтения (None - по числу ядер), scan и use_cache - как в load_histogram.
+        """
+        self.files = {}  # id корпуса -> (путь, название текста)
+        for filename, text_name in files:
+            corpus_id = os.path.splitext(os.path.basename(filename))[0]
+            self.files[corpus_id] = (os.path.abspath(filename), text_name)
+        self.jobs = jobs
+        self.scan = scan
+        self.use_cache = use_cache
+        self.pool = None
+        self.histograms = {}  # (id корпуса, 'chars' или 'pairs') -> гистограмма
+        self.loading = {}     # (id корпуса, вид) -> задача чтения, общая для всех ждущих запросов
+        self.compiled = OrderedDict()  # ключ -> KeyboardAnalyzer или CompiledCostModel
+        self.common_chars = get_common_chars()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    # --- корпуса ---
+
+    def add_corpus(self, corpus_id, path, text_name=None):
+        """Регистрирует корпус; при смене пути прежние гистограммы забываются"""
+        path = os.path.abspath(path)
+        if self.files.get(corpus_id, (None,))[0] != path:
+            for kind in ('chars', 'pairs'):
+                self.histograms.pop((corpus_id, kind), None)
+        self.files[corpus_id] = (path, text_name or os.path.basename(path))
+
+    async def histogram(self, corpus_id, kind='chars'):
+        """Гистограмма корпуса: из памяти или чтением в пуле (один раз на все запросы)"""
+        key = (corpus_id, kind)
+        histogram = self.histograms.get(key)
+        if histogram is not None:
+            return histogram
+        if corpus_id not in self.files:
+            raise ServiceError(404, f"Неизвестный корпус: {corpus_id}")
+        task = self.loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key))
+            self.loading[key] = task
+        # shield: отключившийся клиент не отменяет чтение для остальных
+        return await asyncio.shield(task)
+
+    async def _load(self, key):
+        corpus_id, kind = key
+        filename = self.files[corpus_id][0]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.jobs)
+        loop = asyncio.get_running_loop()
+        try:
+            histogram = await loop.run_in_executor(self.pool, _scan_file, filename, kind,
+                                                   self.scan, self.use_cache)
+        except FileNotFoundError:
+            raise ServiceError(404, f"Файл {filename} не найден!") from None
+        except Exception as e:
+            raise ServiceError(500, f"Ошибка загрузки файла {filename}: {e}") from None
+        finally:
+            self.loading.pop(key, None)
+        # Путь корпуса мог смениться, пока файл читался
+        if self.files.get(corpus_id, (None,))[0] == filename:
+            self.histograms[key] = histogram
+        print(f"Успешно загружен {filename} ({kind}): {sum(histogram.values())}", file=sys.stderr)
+        return histogram
+
+    # --- раскладки ---
+
+    def _cached(self, key, build):
+        """Скомпилированный объект из LRU-кэша или build()"""
+        compiled = self.compiled.get(key)
+        if compiled is None:
+            compiled = build()
+            self.compiled[key] = compiled
+            if len(self.compiled) > COMPILED_CACHE_SIZE:
+                self.compiled.popitem(last=False)
+        else:
+            self.compiled.move_to_end(key)
+        return compiled
+
+    def compiled_layout(self, layout):
+        """(ключ, CompiledLayout) по имени из реестра или описанию раскладки"""
+        if isinstance(layout, str):
+            key = layout
+        elif isinstance(layout, dict):
+            key = json.dumps(layout, sort_keys=True, ensure_ascii=False)
+        else:
+            raise ServiceError(400, "layout: имя раскладки или её описание")
+
+        def build():
+            if isinstance(layout, str):
+                return get_layout(layout)
+            return CompiledLayout(layout.get('short_name', 'custom'), layout)
+
+        try:
+            return key, self._cached(('layout', key), build)
+        except LayoutError as e:
+            raise ServiceError(400, str(e)) from None
+
+    # --- запросы ---
+
+    async def score(self, request):
+        """Оценка раскладки на корпусе: результат analyze_histogram или модели стоимости"""
+        corpus_id = request.get('corpus')
+        if not isinstance(corpus_id, str):
+            raise ServiceError(400, "corpus: id корпуса")
+        key, layout = self.compiled_layout(request.get('layout'))
+        capital_shift = bool(request.get('capital_shift', True))
+        common_chars = self.common_chars if request.get('common_chars', True) else None
+        model = request.get('model')
+        if model is not None and model not in MODELS:
+            raise ServiceError(400, f"Неизвестная модель стоимости: {model}")
+
+        histogram = await self.histogram(corpus_id)
+        text_name = self.files[corpus_id][1]
+        if model is None:
+            analyzer = self._cached(('analyzer', key, capital_shift),
+                                    lambda: KeyboardAnalyzer(layout, capital_shift))
+            return analyzer.analyze_histogram(histogram, text_name, common_chars).to_dict()
+
+        pairs = await self.histogram(corpus_id, 'pairs')
+        cost_model = self._cached(('model', key, model, capital_shift),
+                                  lambda: MODELS[model].compile(layout, capital_shift))
+        return cost_model.estimate(histogram, text_name, pairs, common_chars)
+
+    async def add_corpus_request(self, request):
+        corpus_id = request.get('id')
+        path = request.get('path')
+        if not isinstance(corpus_id, str) or not isinstance(path, str):
+            raise ServiceError(400, "нужны поля id и path")
+        self.add_corpus(corpus_id, path, request.get('text_name'))
+        if request.get('preload'):
+            await self.histogram(corpus_id)
+        return self.corpus_info(corpus_id)
+
+    def corpus_info(self, corpus_id):
+        path, text_name = self.files[corpus_id]
+        histogram = self.histograms.get((corpus_id, 'chars'))
+        return {
+            'id': corpus_id,
+            'path': path,
+            'text_name': text_name,
+            'loaded': histogram is not None,
+            'characters': sum(histogram.values()) if histogram is not None else None
+        }
+
+    async def preload(self):
+        """Читает все зарегистрированные корпуса; ошибки только печатаются"""
+        results = await asyncio.gather(*(self.histogram(corpus_id) for corpus_id in self.files),
+                                       return_exceptions=True)
+        for result in results:
+            if isinstance(result, ServiceError):
+                print(f"ОШИБКА: {result.message}", file=sys.stderr)
+
+    async def dispatch(self, method, path, body):
+        """(статус, ответ) для запроса"""
+        routes = {
+            ('GET', '/health'): lambda request: {'status': 'ok',
+                                                 'loaded': len(self.histograms)},
+            ('GET', '/layouts'): lambda request: {'layouts': REGISTRY.names()},
+            ('GET', '/corpora'): lambda request: {
+                'corpora': [self.corpus_info(corpus_id) for corpus_id in self.files]},
+            ('POST', '/corpora'): self.add_corpus_request,
+            ('POST', '/score'): self.score
+        }
+        handler = routes.get((method, path))
+        try:
+            if handler is None:
+                if any(route_path == path for _, route_path in routes):
+                    raise ServiceError(405, f"Метод {method} не поддерживается для {path}")
+                raise ServiceError(404, f"Неизвестный адрес: {path}")
+            request = {}
+            if body:
+                try:
+                    request = json.loads(body)
+                except ValueError:
+                    raise ServiceError(400, "тело запроса - не JSON") from None
+                if not isinstance(request, dict):
+                    raise ServiceError(400, "тело запроса - не объект JSON")
+            response = handler(request)
+            if asyncio.iscoroutine(response):
+                response = await response
+            return 200, response
+        except ServiceError as e:
+            return e.status, {'error': e.message}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def handle_connection(self, reader, writer):
+        """Соединение HTTP/1.1: запросы по очереди, пока клиент держит keep-alive"""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ServiceError as e:
+                    writer.write(_response(e.status, {'error': e.message}, False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # клиент закрыл соединение
+        finally:
+            writer.close()
+
+
+async def _read_request(reader):
+    """(метод, путь, заголовки, тело) или None, если клиент закрыл соединение"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode('latin1').split()
+    except ValueError:
+        raise ServiceError(400, "неверная строка запроса") from None
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise ServiceError(431, "слишком много заголовков")
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise ServiceError(400, "неверный Content-Length") from None
+    if length > MAX_BODY_BYTES:
+        raise ServiceError(413, "слишком большое тело запроса")
+    body = await reader.readexactly(length) if length > 0 else b''
+    return method, target.split('?')[0], headers, body
+
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin1') + body
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, preload=False):
+    """Запускает сервер и обслуживает запросы до остановки"""
+    if socket_path:
+        server = await asyncio.start_unix_server(service.handle_connection, socket_path)
+        address = socket_path
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        address = f"http://{host}:{server.sockets[0].getsockname()[1]}"
+    print(f"Сервис анализа слушает {address}", file=sys.stderr)
+    if preload:
+        await service.preload()
+    async with server:
+        await server.serve_forever()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP-соединение через Unix-сокет"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceClient:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, timeout=None):
+        """Клиент сервиса для скриптов: одно соединение keep-alive на все запросы"""
+        if socket_path:
+            self.connection = _UnixHTTPConnection(socket_path, timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, payload=None):
+        """Ответ сервиса; ServiceError при статусе ошибки"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.connection.request(method, path, body, headers)
+        response = self.connection.getresponse()
+        data = json.loads(response.read() or b'{}')
+        if response.status >= 400:
+            raise ServiceError(response.status, data.get('error', response.reason))
+        return data
+
+    def score(self, layout, corpus, common_chars=True, capital_shift=True, model=None):
+        request = {'layout': layout, 'corpus': corpus, 'common_chars': common_chars,
+                   'capital_shift': capital_shift}
+        if model is not None:
+            request['model'] = model
+        return self.request('POST', '/score', request)
+
+    def add_corpus(self, corpus_id, path, text_name=None, preload=False):
+        return self.request('POST', '/corpora', {'id': corpus_id, 'path': path,
+                                                 'text_name': text_name, 'preload': preload})
+
+    def corpora(self):
+        return self.request('GET', '/corpora')['corpora']
+
+    def layouts(self):
+        return self.request('GET', '/layouts')['layouts']
+
+    def close(self):
+        self.connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный сервис анализа раскладок")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', help="слушать Unix-сокет вместо TCP")
+    parser.add_argument('--files', nargs='+', help="файлы корпусов (по умолчанию FILES_TO_ANALYZE)")
+    parser.add_argument('--jobs', type=int, default=0,
+                        help="процессов для чтения корпусов (0 - по числу ядер)")
+    parser.add_argument('--scan', choices=list(SCAN_MODES), default='text')
+    parser.add_argument('--no-cache', action='store_true', help="не использовать кэш гистограмм")
+    parser.add_argument('--preload', action='store_true', help="прочитать все корпуса при запуске")
+    args = parser.parse_args(argv)
+
+    files = [(filename, os.path.basename(filename)) for filename in args.files] \
+        if args.files else FILES_TO_ANALYZE
+    service = AnalysisService(files, args.jobs or None, args.scan, not args.no_cache)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket, args.preload))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Модуль статистики нагрузки по ходу текста
+Считает штраф и распределение нагрузки по пальцам в скользящих окнах
+(например, по 10 000 символов) и по главам или абзацам. Дисперсия,
+процентили и самое тяжёлое окно считаются за один проход, поэтому
+память не растёт с размером корпуса
+"""
+import math
+import re
+from collections import Counter
+
+from corpus import read_chunks
+from main import FINGERS, KeyboardAnalyzer
+from prefilter import Prefilter, nfc, nfc_chunks
+
+# Заголовки, с которых начинается новая глава (строка целиком)
+CHAPTER_PATTERN = r'\s*(?:(?:ТОМ|ЧАСТЬ|ГЛАВА|Том|Часть|Глава)\b.*|[IVXLC]+\.?)\s*'
+
+
+class RunningStats:
+    """Среднее, дисперсия, минимум и максимум за один проход (алгоритм Уэлфорда)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # сумма квадратов отклонений от среднего
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        """Объединяет статистику двух частей корпуса (формула Чана)"""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """Оценка процентиля за один проход с пятью маркерами (алгоритм P² Джейна и Хламтача)"""
+
+    def __init__(self, percentile):
+        self.p = percentile / 100
+        self.heights = []  # высоты маркеров
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * self.p, 4 * self.p, 2 + 2 * self.p, 4]
+        self.increments = [0, self.p / 2, self.p, (1 + self.p) / 2, 1]
+
+    def add(self, value):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        for i in range(cell + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Сдвигаем средние маркеры к желаемым позициям
+        positions = self.positions
+        for i in range(1, 4):
+            offset = self.desired[i] - positions[i]
+            if ((offset >= 1 and positions[i + 1] - positions[i] > 1)
+                    or (offset <= -1 and positions[i - 1] - positions[i] < -1)):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (
+                        positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i, step):
+        heights = self.heights
+        positions = self.positions
+        return heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+            (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i])
+            / (positions[i + 1] - positions[i])
+            + (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1])
+            / (positions[i] - positions[i - 1]))
+
+    @property
+    def value(self):
+        if not self.heights:
+            return 0.0
+        if len(self.heights) < 5:
+            # Пока наблюдений меньше пяти - точный процентиль
+            index = round(self.p * (len(self.heights) - 1))
+            return self.heights[index]
+        return self.heights[2]
+
+
+class WindowStats:
+    def __init__(self, layout='standard', window=10000, common_chars=None,
+                 percentiles=(50, 90, 99), on_window=None, capital_shift=True):
+        """Статистика по окнам из window проанализированных символов
+
+        on_window(результат окна) вызывается для каждого полного окна,
+        сами окна не хранятся. Неполное последнее окно в статистику не входит.
+        """
+        self.analyzer = KeyboardAnalyzer(layout, capital_shift)
+        self.window = window
+        self.on_window = on_window
+        self.common_chars = common_chars
+        allowed_chars = common_chars if common_chars else (
+            set(self.analyzer.keys).union(self.analyzer.shift_keys))
+        # Всё, что не входит в алфавит, вырезается за один проход; регистр остаётся для Shift
+        self.prefilter = Prefilter(allowed_chars)
+
+        self.penalty_stats = RunningStats()
+        self.percentiles = {percentile: P2Quantile(percentile) for percentile in percentiles}
+        self.finger_stats = [RunningStats() for _ in FINGERS]
+        self.peak_window = None
+        self.window_count = 0
+        self._current = Counter()
+        self._remaining = window
+
+    def feed(self, text):
+        """Добавляет очередной кусок текста"""
+        clean_text = self.prefilter.translate(text)
+        while clean_text:
+            piece = clean_text[:self._remaining]
+            self._current.update(piece)
+            self._remaining -= len(piece)
+            clean_text = clean_text[len(piece):]
+            if self._remaining == 0:
+                self._close_window()
+
+    def _close_window(self):
+        """Считает штраф полного окна и добавляет его в статистику"""
+        window_result = self.analyzer.analyze_histogram(
+            self._current, f"Окно {self.window_count + 1}", self.common_chars)
+        finger_count_list = window_result.finger_count_list
+        result = window_result.to_dict()
+        result['window_index'] = self.window_count
+        result['window_start'] = self.window_count * self.window
+
+        average = result['average_penalty']
+        self.penalty_stats.add(average)
+        for estimator in self.percentiles.values():
+            estimator.add(average)
+        presses = sum(finger_count_list) or 1
+        for stats, count in zip(self.finger_stats, finger_count_list):
+            stats.add(count / presses * 100)
+        if self.peak_window is None or average > self.peak_window['average_penalty']:
+            self.peak_window = result
+
+        self.window_count += 1
+        self._current = Counter()
+        self._remaining = self.window
+        if self.on_window is not None:
+            self.on_window(result)
+
+    def summary(self):
+        """Сводка по всем полным окнам"""
+        return {
+            'layout': self.analyzer.layout,
+            'window': self.window,
+            'window_count': self.window_count,
+            'mean_penalty': self.penalty_stats.mean,
+            'stddev_penalty': self.penalty_stats.stddev,
+            'min_penalty': self.penalty_stats.min if self.window_count else 0,
+            'max_penalty': self.penalty_stats.max if self.window_count else 0,
+            'percentiles': {percentile: estimator.value
+                            for percentile, estimator in self.percentiles.items()},
+            'finger_share_mean': {finger: stats.mean
+                                  for finger, stats in zip(FINGERS, self.finger_stats)},
+            'finger_share_stddev': {finger: stats.stddev
+                                    for finger, stats in zip(FINGERS, self.finger_stats)},
+            'peak_window': self.peak_window
+        }
+
+
+def analyze_windows(filename, layout='standard', window=10000, common_chars=None,
+                    percentiles=(50, 90, 99), on_window=None, capital_shift=True):
+    """Потоковая статистика по окнам для файла"""
+    stats = WindowStats(layout, window, common_chars, percentiles, on_window, capital_shift)
+    for chunk in nfc_chunks(read_chunks(filename)):
+        stats.feed(chunk)
+    return stats.summary()
+
+
+def analyze_segments(filename, layout='standard', by='chapter', common_chars=None,
+                     chapter_pattern=CHAPTER_PATTERN, capital_shift=True):
+    """Результаты по главам (by='chapter') или абзацам (by='paragraph')
+
+    Генератор: файл читается построчно, в памяти только текущий сегмент
+    в виде гистограммы. Название сегмента - заголовок главы или номер абзаца.
+    """
+    analyzer = KeyboardAnalyzer(layout, capital_shift)
+    heading = re.compile(chapter_pattern)
+    histogram = Counter()
+    title = 'Начало' if by == 'chapter' else 'Абзац 1'
+    number = 0
+    has_text = False        # в текущем абзаце есть непустая строка
+    paragraph_ended = False  # после текста абзаца была пустая строка
+
+    def segment_result():
+        result = analyzer.analyze_histogram(histogram, title, common_chars).to_dict()
+        result['segment_index'] = number
+        return result
+
+    # Каждая строка файла попадает ровно в один сегмент: заголовок - в главу,
+    # которую он открывает, пустые строки - в абзац, который они закрывают
+    with open(filename, encoding='utf-8') as file:
+        for line in file:
+            if by == 'chapter':
+                starts_segment = heading.fullmatch(line.rstrip('\n')) is not None
+            elif line.strip():
+                starts_segment = paragraph_ended
+                paragraph_ended = False
+            else:
+                starts_segment = False
+                paragraph_ended = paragraph_ended or has_text
+            if starts_segment:
+                if histogram:
+                    yield segment_result()
+                    number += 1
+                histogram = Counter()
+                has_text = False
+                title = line.strip() if by == 'chapter' else f"Абзац {number + 1}"
+            histogram.update(nfc(line))
+            has_text = has_text or bool(line.strip())
+    if histogram:
+        yield segment_result()
+
+
+def print_window_summary(summary):
+    """Вывод статистики по окнам"""
+    print(f"\n{'='*50}")
+    print(f"=== СТАТИСТИКА ПО ОКНАМ: {summary['layout']} ===")
+    print(f"{'='*50}")
+    print(f"Окон по {summary['window']} символов: {summary['window_count']}")
+    print(f"Средний штраф на символ: {summary['mean_penalty']:.3f} "
+          f"(σ = {summary['stddev_penalty']:.3f})")
+    print(f"Минимум / максимум по окнам: {summary['min_penalty']:.3f} / {summary['max_penalty']:.3f}")
+    for percentile, value in summary['percentiles'].items():
+        print(f"  {percentile}-й процентиль: {value:.3f}")
+    peak = summary['peak_window']
+    if peak:
+        print(f"Самое тяжёлое окно: №{peak['window_index'] + 1} "
+              f"(с символа {peak['window_start']}), штраф {peak['average_penalty']:.3f}")
+
+    print(f"\nДоля нажатий по пальцам (среднее ± σ):")
+    for finger in FINGERS:
+        mean = summary['finger_share_mean'][finger]
+        if mean > 0:
+            print(f"  {finger}: {mean:.1f}% ± {summary['finger_share_stddev'][finger]:.1f}%")
@@ -0,0 +1,164 @@
+"""
+Модуль анализа переходов между клавишами (биграмм)
+Считает пары соседних нажатий: один и тот же палец, чередование рук,
+прыжки через ряд и путь, который проходит палец от клавиши к клавише
+"""
+from corpus import file_pair_histogram
+from main import FINGERS, load_ngram_table
+
+THUMBS = ('left_thumb', 'right_thumb')
+
+
+class TransitionAnalyzer:
+    def __init__(self, analyzer):
+        """Строит таблицы переходов для раскладки KeyboardAnalyzer"""
+        self.layout = analyzer.layout
+
+        # Клавиша символа: обычная клавиша имеет приоритет над shift, как в analyze_text
+        positions = dict(analyzer.shift_keys)
+        positions.update(analyzer.keys)
+
+        self.slot_chars = sorted(positions)
+        self.slots = {char: i for i, char in enumerate(self.slot_chars)}
+        self.size = len(self.slot_chars)
+
+        # Свойства каждой пары клавиш считаются один раз: индекс пары = i * size + j
+        pair_total = self.size * self.size
+        self.same_finger = [-1] * pair_total  # индекс пальца или -1
+        self.alternation = [-1] * pair_total  # 1 - смена руки, 0 - та же рука, -1 - большой палец
+        self.row_jump = [0] * pair_total      # 1, если рука перескакивает через ряд
+        self.distance = [0] * pair_total      # манхэттенское расстояние между клавишами
+
+        for i, first in enumerate(self.slot_chars):
+            first_code, first_finger = positions[first]
+            first_coords = analyzer.keyboard_map.get(first_code)
+            for j, second in enumerate(self.slot_chars):
+                second_code, second_finger = positions[second]
+                second_coords = analyzer.keyboard_map.get(second_code)
+                index = i * self.size + j
+
+                if first_coords and second_coords:
+                    row_diff = abs(first_coords[0] - second_coords[0])
+                    col_diff = abs(first_coords[1] - second_coords[1])
+                    self.distance[index] = row_diff + col_diff
+                else:
+                    row_diff = 0
+
+                if first_finger in THUMBS or second_finger in THUMBS:
+                    continue
+
+                same_hand = first_finger.split('_')[0] == second_finger.split('_')[0]
+                self.alternation[index] = 0 if same_hand else 1
+                if same_hand and row_diff >= 2:
+                    self.row_jump[index] = 1
+                if first_finger == second_finger and first_code != second_code:
+                    self.same_finger[index] = FINGERS.index(first_finger)
+
+    def count_matrix(self, pairs, common_chars=None):
+        """Плотная матрица size x size с числом переходов между клавишами раскладки
+
+        pairs - частоты пар соседних символов (corpus.pair_histogram).
+        Пара, разорванная символом вне алфавита, переходом не считается.
+        """
+        allowed_chars = common_chars if common_chars else self.slots
+        slots = self.slots
+        size = self.size
+        matrix = [0] * (size * size)
+        for (first, second), count in pairs.items():
+            first = first.lower()
+            second = second.lower()
+            if first not in allowed_chars or second not in allowed_chars:
+                continue
+            i = slots.get(first)
+            j = slots.get(second)
+            if i is not None and j is not None:
+                matrix[i * size + j] += count
+        return matrix
+
+    def analyze_pairs(self, pairs, text_name, common_chars=None):
+        """Метрики переходов по частотам пар символов"""
+        matrix = self.count_matrix(pairs, common_chars)
+
+        finger_travel = [0] * len(FINGERS)
+        pair_count = 0
+        same_finger_count = 0
+        hand_pair_count = 0
+        alternation_count = 0
+        row_jump_count = 0
+
+        for index, count in enumerate(matrix):
+            if not count:
+                continue
+            pair_count += count
+            finger = self.same_finger[index]
+            if finger >= 0:
+                same_finger_count += count
+                finger_travel[finger] += self.distance[index] * count
+            alternation = self.alternation[index]
+            if alternation >= 0:
+                hand_pair_count += count
+                alternation_count += alternation * count
+                row_jump_count += self.row_jump[index] * count
+
+        def percentage(count, total):
+            return (count / total * 100) if total > 0 else 0
+
+        return {
+            'text_name': text_name,
+            'layout': self.layout,
+            'pair_count': pair_count,
+            'same_finger_count': same_finger_count,
+            'same_finger_percentage': percentage(same_finger_count, pair_count),
+            'hand_alternation_count': alternation_count,
+            'hand_alternation_percentage': percentage(alternation_count, hand_pair_count),
+            'row_jump_count': row_jump_count,
+            'row_jump_percentage': percentage(row_jump_count, hand_pair_count),
+            'finger_travel': dict(zip(FINGERS, finger_travel)),
+            'total_travel': sum(finger_travel)
+        }
+
+    def analyze_file(self, filename, text_name, common_chars=None, cache=None):
+        """Потоковый анализ переходов в файле (пары можно брать из HistogramCache)"""
+        try:
+            if cache is not None:
+                pairs = cache.pair_histogram(filename)
+            else:
+                pairs = file_pair_histogram(filename)
+        except FileNotFoundError:
+            print(f"ОШИБКА: Файл {filename} не найден!")
+            return None
+        except Exception as e:
+            print(f"ОШИБКА загрузки файла {filename}: {e}")
+            return None
+        return self.analyze_pairs(pairs, text_name, common_chars)
+
+    def analyze_ngram_file(self, filename, text_name, common_chars=None):
+        """Анализ переходов по частотной таблице 2-грамм (строки 'пара<TAB>частота')"""
+        table = load_ngram_table(filename)
+        if not table:
+            return None
+        unigrams, pairs = table
+        if not pairs:
+            print(f"В таблице {filename} нет 2-грамм, пропускаем анализ")
+            return None
+        return self.analyze_pairs(pairs, text_name, common_chars)
+
+
+def print_transition_results(results):
+    """Вывод метрик переходов для всех текстов"""
+    for result in results:
+        print(f"\n{'='*50}")
+        print(f"=== ПЕРЕХОДЫ ДЛЯ: {result['text_name']} ===")
+        print(f"=== РАСКЛАДКА: {result['layout']} ===")
+        print(f"{'='*50}")
+        print(f"Всего пар нажатий: {result['pair_count']}")
+        print(f"Один палец подряд: {result['same_finger_count']} ({result['same_finger_percentage']:.2f}%)")
+        print(f"Чередование рук: {result['hand_alternation_count']} ({result['hand_alternation_percentage']:.1f}%)")
+        print(f"Прыжки через ряд: {result['row_jump_count']} ({result['row_jump_percentage']:.2f}%)")
+        print(f"ОБЩИЙ ПУТЬ ПАЛЬЦЕВ: {result['total_travel']}")
+
+        print(f"\nПуть по пальцам:")
+        for finger in FINGERS:
+            travel = result['finger_travel'][finger]
+            if travel > 0:
+                print(f"  {finger}: {travel}")
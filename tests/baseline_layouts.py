@@ -0,0 +1,262 @@
+"""
+Исходные раскладки до переноса в layouts/*.json: словари скопированы без изменений
+из методов _init_*_layout и KeyboardAnalyzer.keyboard_map первой версии main.py.
+Повторные ключи (в shift_keys раскладки Вызов) оставлены как были: действует
+последнее значение, как и в исходной программе. Тесты сверяют с ними и реестр,
+и подсчёт, поэтому правка файла раскладки не пройдёт незамеченной.
+CORPUS - общий для тестов случайный корпус из символов этих раскладок
+"""
+import random
+
+KEYBOARD_MAP = {
+    # Цифровой ряд
+    2: (0, 0), 3: (0, 1), 4: (0, 2), 5: (0, 3), 6: (0, 4),
+    7: (0, 5), 8: (0, 6), 9: (0, 7), 10: (0, 8), 11: (0, 9),
+    12: (0, 10), 13: (0, 11), 14: (0, 12),
+
+    # Верхний ряд
+    16: (1, 0), 17: (1, 1), 18: (1, 2), 19: (1, 3), 20: (1, 4),
+    21: (1, 5), 22: (1, 6), 23: (1, 7), 24: (1, 8), 25: (1, 9),
+    26: (1, 10), 27: (1, 11),
+
+    # Домашний ряд
+    30: (2, 0), 31: (2, 1), 32: (2, 2), 33: (2, 3), 34: (2, 4),
+    35: (2, 5), 36: (2, 6), 37: (2, 7), 38: (2, 8), 39: (2, 9),
+    40: (2, 10),
+
+    # Нижний ряд
+    41: (3, 2), 44: (3, 0), 45: (3, 1), 46: (3, 2), 47: (3, 3),
+    48: (3, 4), 49: (3, 5), 50: (3, 6), 51: (3, 7), 52: (3, 8),
+    53: (3, 9),
+
+    # Особые клавиши
+    42: (3, -1),  # Shift
+    43: (1, 12),  # \ (обратный слеш)
+    57: (4, 5)    # Пробел
+}
+
+STANDARD_KEYS = {
+    # Левый мизинец
+    'й': (16, 'left_pinky'), 'ф': (30, 'left_pinky'), 'я': (44, 'left_pinky'), 'ё': (41, 'left_pinky'),
+
+    # Левый безымянный
+    'ц': (17, 'left_ring'), 'ы': (31, 'left_ring'), 'ч': (45, 'left_ring'),
+
+    # Левый средний
+    'у': (18, 'left_middle'), 'в': (32, 'left_middle'), 'с': (46, 'left_middle'),
+
+    # Левый указательный
+    'к': (19, 'left_index'), 'а': (33, 'left_index'), 'м': (47, 'left_index'),
+    'п': (34, 'left_index'), 'е': (20, 'left_index'), 'и': (48, 'left_index'),
+
+    # Правый указательный
+    'р': (35, 'right_index'), 'о': (36, 'right_index'), 'ь': (50, 'right_index'),
+    'н': (21, 'right_index'), 'т': (49, 'right_index'), 'г': (22, 'right_index'),
+
+    # Правый средний
+    'ш': (23, 'right_middle'), 'л': (37, 'right_middle'), 'б': (51, 'right_middle'),
+
+    # Правый безымянный
+    'щ': (24, 'right_ring'), 'д': (38, 'right_ring'), 'ю': (52, 'right_ring'),
+
+    # Правый мизинец
+    'ж': (39, 'right_pinky'), 'з': (25, 'right_pinky'), 'х': (26, 'right_pinky'),
+    'э': (40, 'right_pinky'), 'ъ': (27, 'right_pinky'), '.': (53, 'right_pinky'),
+    '\\': (43, 'right_pinky'),
+
+    # Большие пальцы
+    ' ': (57, 'right_thumb')
+}
+
+STANDARD_SHIFT_KEYS = {
+    '!': (2, 'left_pinky'), '"': (3, 'left_ring'), '№': (4, 'left_middle'), ';': (5, 'left_index'),
+    '%': (6, 'right_index'), ':': (7, 'right_middle'), '?': (8, 'right_ring'),
+    '*': (9, 'right_pinky'), '(': (10, 'right_pinky'), ')': (11, 'right_pinky'),
+    '_': (12, 'right_pinky'), '+': (13, 'right_pinky'), '/': (43, 'right_pinky'),
+    ',': (53, 'right_pinky')
+}
+
+STANDARD_HOME_POSITIONS = {
+    'left_pinky': 30,   # ф
+    'left_ring': 31,    # ы
+    'left_middle': 32,  # в
+    'left_index': 33,   # а
+    'right_index': 36,  # о
+    'right_middle': 37, # л
+    'right_ring': 38,   # д
+    'right_pinky': 39,  # ж
+    'left_thumb': 42,   # shift
+    'right_thumb': 57   # пробел
+}
+
+CHALLENGE_KEYS = {
+    # Левый мизинец
+    'б': (16, 'left_pinky'), 'ч': (30, 'left_pinky'), 'ш': (44, 'left_pinky'),
+
+    # Левый безымянный
+    'ы': (17, 'left_ring'), 'и': (31, 'left_ring'), 'х': (45, 'left_ring'),
+
+    # Левый средний
+    'о': (18, 'left_middle'), 'е': (32, 'left_middle'), 'й': (46, 'left_middle'),
+
+    # Левый указательный
+    'у': (19, 'left_index'), 'а': (33, 'left_index'), 'к': (47, 'left_index'),
+    ',': (34, 'left_index'), 'ь': (20, 'left_index'), '-': (48, 'left_index'),
+
+    # Правый указательный
+    '.': (35, 'right_index'), 'н': (36, 'right_index'), 'р': (50, 'right_index'),
+    'ё': (21, 'right_index'), '^': (22, 'right_index'), 'д': (23, 'right_index'),
+
+    # Правый средний
+    'я': (24, 'right_middle'), 'г': (25, 'right_middle'), 'ж': (26, 'right_middle'),
+
+    # Правый безымянный
+    'ц': (27, 'right_ring'), 'з': (40, 'right_ring'), 'м': (51, 'right_ring'),
+
+    # Правый мизинец
+    'ф': (52, 'right_pinky'), 'ъ': (43, 'right_pinky'), '/': (49, 'right_pinky'),
+    'в': (39, 'right_pinky'), 'с': (38, 'right_pinky'), 'т': (37, 'right_pinky'),
+
+    # Большие пальцы
+    ' ': (57, 'right_thumb'), '₽': (41, 'right_thumb')
+}
+
+CHALLENGE_SHIFT_KEYS = {
+    'ё': (2, 'left_pinky'),
+    '[': (3, 'left_ring'),
+    '{': (4, 'left_middle'),
+    '}': (5, 'left_index'),
+    '(': (6, 'right_index'),
+    '=': (7, 'right_middle'),
+    '*': (8, 'right_ring'),
+    ')': (9, 'right_pinky'),
+    '+': (10, 'right_pinky'),
+    ']': (11, 'right_pinky'),
+    '!': (12, 'right_pinky'),
+    'щ': (13, 'right_pinky'),
+    '№': (13, 'right_pinky'),
+    'ю': (19, 'left_index'),
+    'ц': (30, 'left_pinky'),
+    'э': (32, 'left_middle'),
+    'щ': (36, 'right_index'),
+    'ъ': (37, 'right_middle'),
+    '№': (39, 'right_pinky'),
+}
+
+CHALLENGE_HOME_POSITIONS = {
+    'left_pinky': 30,   # ч
+    'left_ring': 31,    # и
+    'left_middle': 32,  # е
+    'left_index': 33,   # а
+    'right_index': 36,  # н
+    'right_middle': 37, # т
+    'right_ring': 38,   # с
+    'right_pinky': 39,  # в
+    'left_thumb': 42,   # shift
+    'right_thumb': 57   # пробел
+}
+
+ZUBACHEV_KEYS = {
+    # Левый мизинец
+    'ф': (16, 'left_pinky'), 'г': (30, 'left_pinky'), 'ш': (44, 'left_pinky'),
+
+    # Левый безымянный
+    'ы': (17, 'left_ring'), 'и': (31, 'left_ring'), 'ь': (45, 'left_ring'),
+
+    # Левый средний
+    'а': (18, 'left_middle'), 'е': (32, 'left_middle'), 'ю': (46, 'left_middle'),
+
+    # Левый указательный
+    'я': (19, 'left_index'), 'о': (33, 'left_index'), '.': (47, 'left_index'),
+    'ъ': (20, 'left_index'), 'й': (21, 'left_index'), 'м': (22, 'left_index'),
+
+    # Правый указательный
+    'р': (23, 'right_index'), 'п': (24, 'right_index'), 'х': (25, 'right_index'),
+    'ц': (26, 'right_index'), 'щ': (27, 'right_index'), '\\': (43, 'right_index'),
+
+    # Правый средний
+    'л': (35, 'right_middle'), 'т': (36, 'right_middle'), 'с': (37, 'right_middle'),
+
+    # Правый безымянный
+    'н': (38, 'right_ring'), 'з': (39, 'right_ring'), 'ж': (40, 'right_ring'),
+
+    # Правый мизинец
+    'э': (48, 'right_pinky'), 'б': (49, 'right_pinky'), 'д': (50, 'right_pinky'),
+    'в': (51, 'right_pinky'), 'к': (52, 'right_pinky'), 'ч': (53, 'right_pinky'),
+    'ё': (41, 'right_pinky'),  # ПЕРЕМЕСТИЛИ с большого пальца на мизинец!
+
+    # Большие пальцы - ТОЛЬКО пробел!
+    ' ': (57, 'right_thumb')
+}
+
+ZUBACHEV_SHIFT_KEYS = {
+    '!': (2, 'left_pinky'),
+    '"': (3, 'left_ring'),
+    '№': (4, 'left_middle'),
+    ';': (5, 'left_index'),
+    '%': (6, 'right_index'),
+    ':': (7, 'right_middle'),
+    '?': (8, 'right_ring'),
+    '*': (9, 'right_pinky'),
+    '(': (10, 'right_pinky'),
+    ')': (11, 'right_pinky'),
+    '_': (12, 'right_pinky'),
+    '-': (12, 'right_pinky'),
+    '=': (13, 'right_pinky'),
+    '+': (13, 'right_pinky'),
+    '/': (43, 'right_index'),
+    ',': (20, 'left_index'),
+    'ъ': (45, 'left_ring'),
+    'ь': (47, 'left_index'),
+}
+
+ZUBACHEV_HOME_POSITIONS = {
+    'left_pinky': 30,   # г
+    'left_ring': 31,    # и
+    'left_middle': 32,  # е
+    'left_index': 33,   # о
+    'right_index': 23,  # р
+    'right_middle': 36, # т
+    'right_ring': 38,   # н
+    'right_pinky': 39,  # з
+    'left_thumb': 42,   # shift
+    'right_thumb': 57   # пробел
+}
+
+
+# Название раскладки -> (keys, shift_keys, home_positions)
+BASELINE_LAYOUTS = {
+    'standard': (STANDARD_KEYS, STANDARD_SHIFT_KEYS, STANDARD_HOME_POSITIONS),
+    'challenge': (CHALLENGE_KEYS, CHALLENGE_SHIFT_KEYS, CHALLENGE_HOME_POSITIONS),
+    'zubachev': (ZUBACHEV_KEYS, ZUBACHEV_SHIFT_KEYS, ZUBACHEV_HOME_POSITIONS)
+}
+
+
+def baseline_penalty(key_code, finger, home_positions):
+    """Исходный _calculate_penalty: манхэттенское расстояние от домашней позиции"""
+    if finger in ['left_thumb', 'right_thumb']:
+        return 0
+
+    home_coords = KEYBOARD_MAP.get(home_positions[finger])
+    target_coords = KEYBOARD_MAP.get(key_code)
+    if not home_coords or not target_coords:
+        return 0
+
+    home_row, home_col = home_coords
+    target_row, target_col = target_coords
+    return abs(target_row - home_row) + abs(target_col - home_col)
+
+
+def fixed_corpus(size=40000, seed=1812):
+    """Один и тот же корпус при каждом запуске: символы раскладок, заглавные и посторонние"""
+    alphabet = set()
+    for keys, shift_keys, _ in BASELINE_LAYOUTS.values():
+        alphabet.update(keys)
+        alphabet.update(shift_keys)
+    alphabet.update('АБВЁЖЙЯ QWZ\n\t€')
+    alphabet = sorted(alphabet)
+    rng = random.Random(seed)
+    return ''.join(rng.choice(alphabet) for _ in range(size))
+
+
+CORPUS = fixed_corpus()
@@ -0,0 +1,11 @@
+"""
+Общие настройки тестов: модули лежат плоско в src и импортируются как в скриптах
+(from main import ...). src добавляется в конец sys.path, чтобы src/statistics.py
+не подменил модуль statistics стандартной библиотеки
+"""
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
@@ -0,0 +1,60 @@
+"""Пакетная оценка раскладок: матрица стоимости против KeyboardAnalyzer.analyze_histogram"""
+import pytest
+
+from baseline_layouts import CORPUS
+from batch import LayoutBatch, score_layouts
+from corpus import char_histogram
+from layout_registry import CompiledLayout, get_layout
+from main import LAYOUTS, KeyboardAnalyzer, get_common_chars
+
+LAYOUT_NAMES = [layout for layout, _ in LAYOUTS]
+HISTOGRAM = char_histogram(CORPUS)
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+@pytest.mark.parametrize('common', [False, True])
+@pytest.mark.parametrize('capital_shift', [False, True])
+def test_layout_batch_matches_analyzer(use_numpy, common, capital_shift):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    common_chars = get_common_chars() if common else None
+    scores = LayoutBatch(LAYOUT_NAMES, common_chars, use_numpy, capital_shift).score(
+        HISTOGRAM, 'корпус')
+    for k, layout in enumerate(LAYOUT_NAMES):
+        analyzer = KeyboardAnalyzer(layout, capital_shift)
+        expected = analyzer.analyze_histogram(HISTOGRAM, 'корпус', common_chars)
+        assert dict(scores.result(k)) == dict(expected)
+
+
+def test_ranking_and_compiled_layouts():
+    # Раскладка без цифр и знаков: её символы считаются отдельно от других раскладок
+    definition = get_layout('standard').definition()
+    definition['shift_keys'] = {}
+    reduced = CompiledLayout('reduced', definition)
+    scores = score_layouts(LAYOUT_NAMES + [reduced], HISTOGRAM, 'корпус')
+    assert scores.names == LAYOUT_NAMES + ['reduced']
+    expected = KeyboardAnalyzer(reduced).analyze_histogram(HISTOGRAM, 'корпус')
+    assert dict(scores.result(3)) == dict(expected)
+
+    averages = [scores.average_penalty(k) for k in range(len(scores))]
+    assert scores.ranking() == sorted(range(len(scores)), key=averages.__getitem__)
+    assert scores.total_penalty(0) == scores.result(0).total_penalty
+
+
+def test_empty_histogram():
+    scores = score_layouts(LAYOUT_NAMES, {}, 'пусто')
+    assert [scores.average_penalty(k) for k in range(len(scores))] == [0, 0, 0]
+    assert scores.result(0).characters_analyzed == 0
+
+
+def test_to_numpy():
+    pytest.importorskip('numpy')
+    scores = LayoutBatch(LAYOUT_NAMES).score(HISTOGRAM, 'корпус')
+    records = scores.to_numpy()
+    assert records['layout'].tolist() == LAYOUT_NAMES
+    for record, k in zip(records, range(len(scores))):
+        result = scores.result(k)
+        assert int(record['total_penalty']) == result.total_penalty
+        assert float(record['average_penalty']) == pytest.approx(result.average_penalty)
+        assert record['finger_counts'].tolist() == list(result.finger_count_list)
+        assert int(record['shift_count']) == result.shift_count
@@ -0,0 +1,65 @@
+"""Замеры скорости: синтетический корпус, поля результата и сравнение с базовым JSON"""
+import pytest
+
+from benchmark import compare_with_baseline, generate_corpus, parse_size, run_case
+
+
+def case_result(peak=100.0, children=0.0, speed=1e6):
+    return {'seconds': 1.0, 'characters': speed, 'chars_per_second': speed,
+            'peak_rss_mb': peak, 'children_peak_rss_mb': children}
+
+
+def test_parse_size():
+    assert parse_size('1MB') == 1 << 20
+    assert parse_size('1.5kb') == 1536
+    assert parse_size('100') == 100
+
+
+def test_generate_corpus(tmp_path):
+    path = tmp_path / 'corpus.txt'
+    generate_corpus(str(path), 20000, seed=1)
+    text = path.read_text(encoding='utf-8')
+    assert len(text.encode('utf-8')) >= 20000
+    assert text[0].isupper()
+    generate_corpus(str(tmp_path / 'again.txt'), 20000, seed=1)
+    assert (tmp_path / 'again.txt').read_text(encoding='utf-8') == text
+
+
+@pytest.mark.parametrize('mode', ['stream', 'parallel'])
+def test_run_case_reports_self_and_children(tmp_path, mode):
+    path = tmp_path / 'corpus.txt'
+    generate_corpus(str(path), 5000)
+    result = run_case(mode, 'standard', str(path), repeats=1, jobs=2)
+    assert result['characters'] == len(path.read_text(encoding='utf-8'))
+    assert result['peak_rss_mb'] > 0
+    if mode == 'parallel':
+        assert result['children_peak_rss_mb'] > 0
+
+
+def test_memory_fields_compared_separately():
+    baseline = {'1MB/standard/parallel': case_result(peak=100, children=50)}
+    # Рост памяти воркеров не маскируется запасом по памяти самого процесса и наоборот
+    regressions = compare_with_baseline(
+        {'1MB/standard/parallel': case_result(peak=60, children=80)}, baseline, 0.2)
+    assert regressions == ["1MB/standard/parallel: память воркеров 80.0 МБ, базовая 50.0"]
+    regressions = compare_with_baseline(
+        {'1MB/standard/parallel': case_result(peak=130, children=10)}, baseline, 0.2)
+    assert regressions == ["1MB/standard/parallel: память 130.0 МБ, базовая 100.0"]
+    assert compare_with_baseline(
+        {'1MB/standard/parallel': case_result(peak=110, children=55)}, baseline, 0.2) == []
+
+
+def test_old_baseline_without_children_field():
+    reference = case_result()
+    del reference['children_peak_rss_mb']
+    assert compare_with_baseline({'case': case_result(children=500)}, {'case': reference},
+                                 0.2) == []
+
+
+def test_speed_regression_and_failed_case():
+    baseline = {'fast': case_result(speed=1000), 'broken': case_result()}
+    results = {'fast': case_result(speed=700), 'broken': {'error': 'CaseFailed: нет результата'},
+               'new': case_result()}
+    assert compare_with_baseline(results, baseline, 0.2) == [
+        "fast: скорость 700 симв/с, базовая 1000",
+        "broken: замер не выполнен: CaseFailed: нет результата"]
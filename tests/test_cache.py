@@ -0,0 +1,86 @@
+"""Кэш гистограмм: двоичные записи, проверка содержимого файла и вытеснение"""
+import os
+
+import pytest
+
+from cache import HistogramCache, decode_histogram, encode_histogram
+from corpus import char_histogram, file_histogram, file_pair_histogram, pair_histogram
+from main import load_corpora
+
+TEXT = 'Князь Андрей, «ёж» и €!\n' * 100 + 'край: \U0001f600'
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = tmp_path / 'corpus.txt'
+    path.write_text(TEXT, encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('kind, histogram', [
+    ('chars', char_histogram(TEXT)),
+    ('pairs', pair_histogram(TEXT)),
+    ('chars', char_histogram('')),
+])
+def test_histogram_encoding_round_trip(kind, histogram):
+    assert decode_histogram(kind, encode_histogram(kind, histogram)) == histogram
+
+
+def test_damaged_record_rejected():
+    data = encode_histogram('chars', char_histogram(TEXT))
+    with pytest.raises(ValueError):
+        decode_histogram('chars', data[:-1])
+    with pytest.raises(ValueError):
+        decode_histogram('pairs', data)
+
+
+def test_cache_round_trip(tmp_path, corpus_file):
+    cache = HistogramCache(str(tmp_path / 'cache'))
+    assert cache.load(corpus_file) is None
+    assert cache.char_histogram(corpus_file) == file_histogram(corpus_file)
+    assert cache.pair_histogram(corpus_file) == file_pair_histogram(corpus_file)
+
+    # Новый объект читает записи с диска, а не из памяти
+    cache = HistogramCache(str(tmp_path / 'cache'))
+    assert cache.load(corpus_file) == file_histogram(corpus_file)
+    assert cache.load(corpus_file, 'pairs') == file_pair_histogram(corpus_file)
+
+
+def test_cache_misses_changed_file(tmp_path, corpus_file):
+    cache = HistogramCache(str(tmp_path / 'cache'))
+    cache.char_histogram(corpus_file)
+    with open(corpus_file, 'a', encoding='utf-8') as file:
+        file.write('ещё строка')
+    assert cache.load(corpus_file) is None
+    assert cache.char_histogram(corpus_file) == file_histogram(corpus_file)
+
+
+def test_load_corpora_with_cache(tmp_path, corpus_file):
+    cache = HistogramCache(str(tmp_path / 'cache'))
+    files = [(corpus_file, 'корпус')]
+    first = load_corpora(files, cache=cache)
+    assert load_corpora(files, cache=HistogramCache(str(tmp_path / 'cache'))) == first
+    assert first == [('корпус', file_histogram(corpus_file))]
+
+
+def test_cache_eviction(tmp_path, corpus_file):
+    cache = HistogramCache(str(tmp_path / 'cache'), max_bytes=0)
+    cache.char_histogram(corpus_file)
+    assert not [name for name in os.listdir(tmp_path / 'cache') if name.endswith('.bin')]
+
+
+def test_same_content_shares_entry(tmp_path, corpus_file):
+    copy = tmp_path / 'copy.txt'
+    copy.write_text(TEXT, encoding='utf-8')
+    cache = HistogramCache(str(tmp_path / 'cache'))
+    cache.char_histogram(corpus_file)
+    assert cache.load(str(copy)) == file_histogram(corpus_file)
+
+
+def test_damaged_entry_recomputed(tmp_path, corpus_file):
+    cache = HistogramCache(str(tmp_path / 'cache'))
+    cache.char_histogram(corpus_file)
+    [entry] = [name for name in os.listdir(tmp_path / 'cache') if name.endswith('.bin')]
+    (tmp_path / 'cache' / entry).write_bytes(b'KTC3')
+    assert cache.load(corpus_file) is None
+    assert cache.char_histogram(corpus_file) == file_histogram(corpus_file)
@@ -0,0 +1,128 @@
+"""Командная строка keyboard_typing: форматы вывода, коды выхода, пути по умолчанию"""
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import keyboard_typing
+from corpus import char_histogram
+from main import FILES_TO_ANALYZE, PROJECT_DIR, KeyboardAnalyzer, get_common_chars
+from results import ResultTable
+
+SRC_DIR = os.path.dirname(os.path.abspath(keyboard_typing.__file__))
+TEXT = 'Съешь же ещё этих мягких французских булок, да выпей чаю!\n' * 20
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = tmp_path / 'булки.txt'
+    path.write_text(TEXT, encoding='utf-8')
+    return str(path)
+
+
+def run(capsys, *argv):
+    """Код выхода, stdout и stderr команды"""
+    code = keyboard_typing.main(list(argv))
+    out, err = capsys.readouterr()
+    return code, out, err
+
+
+def test_import_has_no_side_effects():
+    # gui не проверяется: ему нужны PyQt и matplotlib
+    completed = subprocess.run(
+        [sys.executable, '-c', 'import main, keyboard_typing, service, optimizer, benchmark'],
+        cwd=SRC_DIR, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout == completed.stderr == ''
+
+
+def test_default_files_resolved_against_project():
+    for filename, _ in FILES_TO_ANALYZE:
+        assert os.path.dirname(filename) == PROJECT_DIR
+    assert os.path.exists(os.path.join(PROJECT_DIR, '1grams.txt'))
+
+
+def test_analyze_json(capsys, corpus_file):
+    code, out, err = run(capsys, 'analyze', '--files', corpus_file, '--format', 'json',
+                         '--layout', 'standard,challenge', '--no-cache')
+    assert code == 0
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert [row['layout'] for row in rows] == ['standard', 'challenge']
+    for row in rows:
+        expected = KeyboardAnalyzer(row['layout']).analyze_histogram(
+            char_histogram(TEXT), 'булки.txt', get_common_chars())
+        assert row == json.loads(json.dumps(expected.to_dict(), ensure_ascii=False))
+    assert 'Успешно загружен' in err  # сообщения о загрузке не попадают в stdout
+
+
+def test_analyze_csv_and_npy(capsys, corpus_file, tmp_path):
+    npy = str(tmp_path / 'results.npy')
+    code, out, _ = run(capsys, 'analyze', '--files', corpus_file, '--format', 'csv',
+                       '--all-chars', '--no-cache', '--npy', npy)
+    assert code == 0
+    rows = list(csv.DictReader(io.StringIO(out)))
+    assert [row['layout'] for row in rows] == ['standard', 'challenge', 'zubachev']
+    table = ResultTable.load_npy(npy)
+    assert [str(result.total_penalty) for result in table] == [row['total_penalty'] for row in rows]
+    assert rows[0]['penalty_left_thumb'] == str(table[0].finger_penalties['left_thumb'])
+
+
+def test_analyze_table_streams_each_corpus(capsys, corpus_file, tmp_path):
+    second = tmp_path / 'второй.txt'
+    second.write_text('ёж', encoding='utf-8')
+    code, out, _ = run(capsys, 'analyze', '--files', corpus_file, str(second),
+                       '--layout', 'standard', '--jobs', '2', '--no-cache')
+    assert code == 0
+    assert out.index('булки.txt') < out.index('второй.txt')
+
+
+def test_analyze_ngram_table(capsys, tmp_path):
+    table = tmp_path / 'ngrams.txt'
+    table.write_text('<html>\nа\t5\nб\t2\nаб\t7\n', encoding='utf-8')
+    code, out, _ = run(capsys, 'analyze', '--files', str(table), '--ngrams', '--format', 'json',
+                       '--layout', 'standard')
+    assert code == 0
+    assert json.loads(out)['characters_analyzed'] == 7
+
+
+def test_no_corpus_loaded(capsys, tmp_path):
+    code, out, err = run(capsys, 'analyze', '--files', str(tmp_path / 'нет.txt'), '--no-cache')
+    assert code == 1
+    assert out == ''
+    assert 'не загружен ни один корпус' in err
+    code, _, _ = run(capsys, 'timing', '--files', str(tmp_path / 'нет.txt'), '--no-cache')
+    assert code == 1
+
+
+def test_unknown_layout(capsys, corpus_file):
+    code, _, err = run(capsys, 'analyze', '--files', corpus_file, '--layout', 'dvorak')
+    assert code == 2
+    assert 'Неизвестная раскладка: dvorak' in err
+
+
+@pytest.mark.parametrize('jobs', ['-1', 'два'])
+def test_invalid_jobs(capsys, jobs):
+    with pytest.raises(SystemExit) as error:
+        keyboard_typing.main(['analyze', '--jobs', jobs])
+    assert error.value.code == 2
+    assert '--jobs' in capsys.readouterr().err
+
+
+def test_layouts_lists_names_and_warnings(capsys):
+    code, out, err = run(capsys, 'layouts')
+    assert code == 0
+    assert [line.split()[0] for line in out.splitlines()] == ['challenge', 'standard', 'zubachev']
+    assert "ПРЕДУПРЕЖДЕНИЕ: Раскладка zubachev" in err
+
+
+def test_timing_json(capsys, corpus_file):
+    code, out, _ = run(capsys, 'timing', '--files', corpus_file, '--format', 'json',
+                       '--layout', 'standard', '--no-cache')
+    assert code == 0
+    result = json.loads(out)
+    assert result['model'] == 'timing'
+    assert result['total_time_ms'] > 0
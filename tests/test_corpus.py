@@ -0,0 +1,77 @@
+"""Чтение корпусов: сканирование байт (mmap) против потокового декодирования (text)"""
+import pytest
+
+from corpus import char_histogram, file_histogram, mmap_histogram
+
+VALID_TEXTS = [
+    'Война и мир. Князь Андрей!\nЁлка, «ёж» — 1812 год.\n',
+    'ascii only',
+    'граница кодов: \x7f\x80߿ࠀ퟿￿\U00010000\U0010ffff',
+    # NFD: 'й' и 'ё' из буквы и диакритического знака
+    'и\u0306 е\u0308 Е\u0308лка\n' * 50,
+    # Меняются при NFC без диакритических знаков: знак ома, чамо хангыля, бенгальская 'о'
+    'Ом: \u2126, \u212b\n',
+    '\u1100\u1161\u11a8 \uac00\u11a8 \u1100\u1161\n' * 3,
+    '\u0995\u09c7\u09be\n',
+]
+
+INVALID_BYTES = [
+    b'ab\xc0\xafcd',          # избыточная запись '/'
+    b'\xc1\xbf',              # избыточная запись в 2 байта
+    b'\xe0\x80\xaf',          # избыточная запись в 3 байта
+    b'\xf0\x80\x80\xaf',      # избыточная запись в 4 байта
+    b'x\xed\xa0\x80y',        # суррогат U+D800
+    b'\xf4\x90\x80\x80',      # код больше 0x10FFFF
+    b'ok\xff',                # недопустимый байт
+    b'\x80abc',               # байт продолжения без ведущего
+    b'abc\xe2\x82',           # оборванный символ в конце
+]
+
+
+def write_bytes(tmp_path, data):
+    path = tmp_path / 'corpus.txt'
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize('text', VALID_TEXTS)
+@pytest.mark.parametrize('window_bytes', [7, 1 << 20])
+def test_mmap_matches_text(tmp_path, text, window_bytes):
+    path = write_bytes(tmp_path, text.encode('utf-8'))
+    assert mmap_histogram(path, window_bytes) == file_histogram(path)
+
+
+@pytest.mark.parametrize('text', VALID_TEXTS)
+def test_chunked_reading_matches_whole_text(tmp_path, text):
+    path = write_bytes(tmp_path, text.encode('utf-8'))
+    # Куски по 1-4 символа режут текст в каждой точке, в том числе внутри слогов хангыля
+    for chunk_size in range(1, 5):
+        assert file_histogram(path, chunk_size) == char_histogram(text)
+
+
+def test_mmap_normalizes_like_text(tmp_path):
+    path = write_bytes(tmp_path, '\u2126\u212b'.encode('utf-8'))
+    assert mmap_histogram(path) == {'\u03a9': 1, '\u00c5': 1}
+
+
+def test_mmap_empty_file(tmp_path):
+    assert mmap_histogram(write_bytes(tmp_path, b'')) == {}
+
+
+@pytest.mark.parametrize('data', INVALID_BYTES)
+def test_invalid_utf8_rejected_by_both_modes(tmp_path, data):
+    path = write_bytes(tmp_path, data)
+    with pytest.raises(UnicodeDecodeError):
+        file_histogram(path)
+    with pytest.raises(UnicodeDecodeError):
+        mmap_histogram(path)
+
+
+@pytest.mark.parametrize('data', INVALID_BYTES)
+def test_numpy_scanner_rejects_invalid_utf8(data):
+    np = pytest.importorskip('numpy')
+    from corpus import _scan_window
+
+    totals = np.zeros(0x10000, dtype=np.int64)
+    with pytest.raises(ValueError):
+        _scan_window(np.frombuffer(data, dtype=np.uint8), totals, {})
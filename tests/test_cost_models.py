@@ -0,0 +1,103 @@
+"""Модели стоимости набора: модель 'distance' против analyze_histogram и задержки переходов"""
+import math
+
+import pytest
+
+from baseline_layouts import BASELINE_LAYOUTS, CORPUS
+from corpus import char_histogram, pair_histogram
+from cost_models import (MODELS, CostModel, Geometry, estimate_typing_time, get_model,
+                         register_model)
+from main import KeyboardAnalyzer, get_common_chars
+
+LAYOUT_NAMES = list(BASELINE_LAYOUTS)
+HISTOGRAM = char_histogram(CORPUS)
+PAIRS = pair_histogram(CORPUS)
+
+
+@pytest.mark.parametrize('layout', LAYOUT_NAMES)
+@pytest.mark.parametrize('common', [False, True])
+@pytest.mark.parametrize('capital_shift', [False, True])
+def test_distance_model_matches_penalty(layout, common, capital_shift):
+    common_chars = get_common_chars() if common else None
+    estimate = get_model('distance').compile(layout, capital_shift).estimate(
+        HISTOGRAM, 'корпус', PAIRS, common_chars)
+    expected = KeyboardAnalyzer(layout, capital_shift).analyze_histogram(
+        HISTOGRAM, 'корпус', common_chars)
+    assert estimate['characters_analyzed'] == expected.characters_analyzed
+    assert estimate['shift_count'] == expected.shift_count
+    assert estimate['key_time_ms'] + estimate['shift_time_ms'] == expected.total_penalty
+    assert estimate['finger_time_ms'] == expected.finger_penalties
+    assert estimate['transition_time_ms'] == 0  # у модели нет задержек переходов
+
+
+@pytest.mark.parametrize('layout', LAYOUT_NAMES)
+def test_transition_time_matches_pair_walk(layout):
+    model = get_model('timing')
+    keys, shift_keys, _ = BASELINE_LAYOUTS[layout]
+    positions = dict(shift_keys)
+    positions.update(keys)
+    text = CORPUS.lower()
+    expected = 0.0
+    pair_count = 0
+    for first, second in zip(text, text[1:]):
+        if first in positions and second in positions:
+            pair_count += 1
+            expected += model.transition_time(*positions[first], *positions[second])
+    estimate = model.compile(layout).estimate(HISTOGRAM, 'корпус', PAIRS)
+    assert estimate['pair_count'] == pair_count
+    assert estimate['transition_time_ms'] == pytest.approx(expected)
+    assert estimate['total_time_ms'] == pytest.approx(
+        estimate['key_time_ms'] + estimate['shift_time_ms'] + expected)
+
+
+def test_transition_time_rules():
+    model = CostModel('test', 'manhattan', finger_speed={'left_pinky': 2.0})
+    # Клавиши 16, 30 и 44 - левый столбец трёх рядов букв, 36 и 33 - домашний ряд
+    assert model.transition_time(30, 'left_pinky', 36, 'right_middle') == model.alternation_time
+    assert model.transition_time(30, 'left_pinky', 57, 'right_thumb') == 0
+    assert model.transition_time(30, 'left_pinky', 30, 'left_pinky') == (
+        model.same_hand_time + model.repeat_time)
+    assert model.transition_time(16, 'left_pinky', 44, 'left_pinky') == (
+        model.same_hand_time + model.row_jump_time + model.same_finger_time
+        + model.same_finger_travel_time * 2 * 2.0)
+    assert model.transition_time(30, 'left_pinky', 33, 'left_index') == model.same_hand_time
+
+
+def test_geometry():
+    # Клавиша 16 - ряд 1, столбец 0; 45 - ряд 3, столбец 1; 44 - ряд 3, столбец 0
+    assert Geometry('manhattan').distance(16, 45) == 3
+    assert Geometry('euclidean').distance(16, 45) == pytest.approx(math.hypot(1, 2))
+    staggered = Geometry('euclidean', {1: 0.5, 3: 1.25})
+    assert staggered.distance(16, 44) == pytest.approx(math.hypot(0.75, 2))
+    assert Geometry().distance(16, 999) == 0
+    with pytest.raises(ValueError):
+        Geometry('chebyshev')
+
+
+def test_custom_model():
+    class FlatModel(CostModel):
+        def key_time(self, key_code, finger, home_positions):
+            return 100.0
+
+    model = register_model(FlatModel('flat', shift_time=0.0, same_hand_time=0.0,
+                                     row_jump_time=0.0, same_finger_time=0.0,
+                                     same_finger_travel_time=0.0, repeat_time=0.0))
+    try:
+        [estimate] = estimate_typing_time(['standard'], HISTOGRAM, 'корпус', PAIRS, model='flat')
+        assert estimate['model'] == 'flat'
+        assert estimate['total_time_ms'] == 100.0 * estimate['characters_analyzed']
+        assert estimate['chars_per_minute'] == pytest.approx(600)
+    finally:
+        del MODELS['flat']
+    assert model.name == 'flat'
+
+
+def test_unknown_model():
+    with pytest.raises(ValueError, match="Неизвестная модель стоимости: nope"):
+        get_model('nope')
+
+
+def test_empty_corpus():
+    [estimate] = estimate_typing_time(['zubachev'], {}, 'пусто')
+    assert estimate['total_time_ms'] == 0
+    assert estimate['average_time_ms'] == estimate['chars_per_minute'] == 0
@@ -0,0 +1,150 @@
+"""Замеры этапов: итоги по этапам, форматы отчёта и пик памяти вложенных этапов"""
+import io
+import json
+import tracemalloc
+
+import pytest
+
+import keyboard_typing
+from instrumentation import INSTRUMENTATION, NULL_STAGE, Instrumentation
+
+MB = 1 << 20
+
+
+@pytest.fixture
+def tracing():
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def global_instrumentation():
+    """Общий журнал после запуска команды возвращается в исходное состояние"""
+    INSTRUMENTATION.records.clear()
+    yield INSTRUMENTATION
+    INSTRUMENTATION.records.clear()
+    INSTRUMENTATION.enabled = False
+
+
+def test_disabled_stage_records_nothing():
+    instrumentation = Instrumentation()
+    with instrumentation.stage('load', file='корпус') as record:
+        record['bytes'] = 10
+    assert instrumentation.stage('load') is NULL_STAGE
+    assert instrumentation.records == []
+    assert NULL_STAGE.record == {}
+
+
+def test_report_totals():
+    instrumentation = Instrumentation(enabled=True)
+    for characters in (100, 200):
+        with instrumentation.stage('score', 'standard', 'корпус') as record:
+            record['characters'] = characters
+    with instrumentation.stage('load', file='корпус') as record:
+        record['bytes'] = 4096
+    score, load = instrumentation.report()
+    assert (score['stage'], score['layout'], score['file']) == ('score', 'standard', 'корпус')
+    assert score['calls'] == 2
+    assert score['characters'] == 300
+    assert score['chars_per_second'] == pytest.approx(300 / score['seconds'])
+    assert load['bytes'] == 4096 and load['calls'] == 1
+
+
+def test_memory_only_under_tracemalloc():
+    instrumentation = Instrumentation(enabled=True)
+    with instrumentation.stage('score', 'standard', 'корпус'):
+        pass
+    [total] = instrumentation.report()
+    # Без трассировки пик за этап не измерить: ru_maxrss только растёт
+    assert total['peak_memory_bytes'] is None
+    assert 'peak_memory_bytes{' not in instrumentation.to_prometheus()
+    assert json.loads(instrumentation.to_json())[0]['peak_memory_bytes'] is None
+    stream = io.StringIO()
+    instrumentation.print_report(stream)
+    assert stream.getvalue().splitlines()[-1].split()[-1] == '-'
+
+
+def test_stage_peak_is_its_own(tracing):
+    instrumentation = Instrumentation(enabled=True)
+    instrumentation.reset_peak()
+    block = bytearray(8 * MB)  # занято до этапов: в пик этапов не входит
+    with instrumentation.stage('small'):
+        small = bytearray(MB // 2)
+    with instrumentation.stage('big'):
+        big = bytearray(4 * MB)
+        del big
+    del small, block
+    small_total, big_total = instrumentation.report()
+    assert MB // 2 <= small_total['peak_memory_bytes'] < MB
+    assert 4 * MB <= big_total['peak_memory_bytes'] < 5 * MB
+    assert instrumentation.peak_memory() >= 12 * MB
+
+
+def test_nested_stage_keeps_outer_peak(tracing):
+    instrumentation = Instrumentation(enabled=True)
+    with instrumentation.stage('output'):
+        block = bytearray(6 * MB)
+        del block
+        with instrumentation.stage('print'):
+            inner = bytearray(MB)
+            del inner
+        with instrumentation.stage('print'):
+            pass
+    # Вложенные этапы сбрасывают пик tracemalloc, но пик внешнего этапа не теряется
+    records = {record['stage']: record for record in instrumentation.records}
+    assert records['output']['peak_memory_bytes'] >= 6 * MB
+    assert MB <= instrumentation.report()[0]['peak_memory_bytes'] < 2 * MB
+
+
+def test_nested_stage_peak_counts_in_outer(tracing):
+    instrumentation = Instrumentation(enabled=True)
+    with instrumentation.stage('output'):
+        with instrumentation.stage('print'):
+            inner = bytearray(3 * MB)
+            del inner
+    inner_record, outer_record = instrumentation.records
+    assert outer_record['peak_memory_bytes'] >= inner_record['peak_memory_bytes'] >= 3 * MB
+
+
+def test_prometheus_labels_escaped():
+    instrumentation = Instrumentation(enabled=True)
+    with instrumentation.stage('load', file='"книга"\\1\n'):
+        pass
+    text = instrumentation.to_prometheus()
+    assert 'file="\\"книга\\"\\\\1\\n"' in text
+    assert '# TYPE keyboard_typing_stage_seconds_total counter' in text
+
+
+def corpus(tmp_path):
+    path = tmp_path / 'корпус.txt'
+    path.write_text('Съешь же ещё этих мягких французских булок!\n' * 50, encoding='utf-8')
+    return str(path)
+
+
+def test_metrics_json(capsys, tmp_path, global_instrumentation):
+    metrics = tmp_path / 'metrics.json'
+    code = keyboard_typing.main(['analyze', '--files', corpus(tmp_path), '--layout', 'standard',
+                                 '--no-cache', '--metrics', str(metrics),
+                                 '--metrics-format', 'json'])
+    assert code == 0
+    report = json.loads(metrics.read_text(encoding='utf-8'))
+    stages = {(total['stage'], total['layout'], total['file']) for total in report}
+    assert {('load', '', 'корпус.txt'), ('lower', 'standard', 'корпус.txt'),
+            ('score', 'standard', 'корпус.txt'),
+            ('output', 'standard', 'корпус.txt')} <= stages
+    assert all(total['peak_memory_bytes'] is None for total in report)
+
+
+def test_profile_reports_memory(capsys, tmp_path, global_instrumentation):
+    code = keyboard_typing.main(['analyze', '--files', corpus(tmp_path), '--layout', 'standard',
+                                 '--no-cache', '--profile', '--metrics', '-',
+                                 '--metrics-format', 'json'])
+    assert code == 0
+    err = capsys.readouterr().err
+    report = json.loads(err[err.index('[\n'):err.index('\n]\n') + 3])
+    assert all(total['peak_memory_bytes'] is not None for total in report)
+    assert 'Память Python' in err
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,133 @@
+"""Реестр раскладок: файлы layouts/*.json против исходных словарей и проверка описаний"""
+import json
+import os
+
+import pytest
+
+from baseline_layouts import BASELINE_LAYOUTS, KEYBOARD_MAP as BASELINE_KEYBOARD_MAP, baseline_penalty
+from layout_registry import (FINGERS, KEYBOARD_MAP, LAYOUTS_DIR, CompiledLayout, LayoutError,
+                             LayoutRegistry, get_layout, load_layout_file, save_layout_file)
+
+
+def definition(**sections):
+    """Минимальная правильная раскладка с заменой разделов"""
+    layout = {
+        'keys': {'а': [33, 'left_index'], ' ': [57, 'right_thumb']},
+        'shift_keys': {'!': [2, 'left_pinky']},
+        'home_positions': {'left_index': 33, 'left_pinky': 30, 'right_thumb': 57}
+    }
+    layout.update(sections)
+    return layout
+
+
+def test_keyboard_map_unchanged():
+    assert KEYBOARD_MAP == BASELINE_KEYBOARD_MAP
+
+
+@pytest.mark.parametrize('name', list(BASELINE_LAYOUTS))
+def test_layout_files_match_baseline(name):
+    keys, shift_keys, home_positions = BASELINE_LAYOUTS[name]
+    layout = get_layout(name)
+    assert layout.keys == keys
+    assert layout.shift_keys == shift_keys
+    assert layout.home_positions == home_positions
+
+
+@pytest.mark.parametrize('name', list(BASELINE_LAYOUTS))
+def test_char_table_matches_baseline_penalty(name):
+    keys, shift_keys, home_positions = BASELINE_LAYOUTS[name]
+    table = get_layout(name).char_table
+    # Обычная клавиша имеет приоритет, как в исходном analyze_text
+    for shift, layer in ((1, shift_keys), (0, keys)):
+        for char, (key_code, finger) in layer.items():
+            if shift and char in keys:
+                continue
+            assert table[ord(char)] == (FINGERS.index(finger),
+                                        baseline_penalty(key_code, finger, home_positions), shift)
+
+
+def test_shared_key_is_a_warning():
+    layout = get_layout('zubachev')
+    assert layout.warnings == ["shift_keys: на клавише 12 символы '_', '-'",
+                               "shift_keys: на клавише 13 символы '=', '+'"]
+    assert get_layout('standard').warnings == []
+
+
+@pytest.mark.parametrize('sections, message', [
+    ({'keys': {'а': [99, 'left_index']}}, "неизвестный код клавиши 99"),
+    ({'keys': {'а': [True, 'left_index']}}, "неизвестный код клавиши True"),
+    ({'keys': {'а': [33, 'left_toe']}}, "неизвестный палец 'left_toe'"),
+    ({'keys': {'аб': [33, 'left_index']}}, "ожидается один символ"),
+    ({'keys': {'а': 33}}, "ожидается [код клавиши, палец]"),
+    ({'shift_keys': ['!']}, "раздел shift_keys должен быть объектом"),
+    ({'home_positions': {'left_pinky': 30, 'right_thumb': 57}},
+     "нет домашней позиции для left_index"),
+    ({'home_positions': {'left_index': 33, 'left_pinky': 30, 'right_thumb': 57, 'nose': 30}},
+     "неизвестный палец 'nose'"),
+])
+def test_invalid_definition(sections, message):
+    with pytest.raises(LayoutError, match=message.replace('[', r'\[').replace(']', r'\]')):
+        CompiledLayout('test', definition(**sections))
+
+
+def test_missing_sections_reported_together():
+    with pytest.raises(LayoutError) as error:
+        CompiledLayout('test', {})
+    assert "нет раздела keys" in str(error.value)
+    assert "нет раздела home_positions" in str(error.value)
+
+
+def test_duplicate_json_keys_rejected(tmp_path):
+    path = tmp_path / 'dup.json'
+    path.write_text('{"keys": {"а": [33, "left_index"], "а": [34, "left_index"]},'
+                    ' "home_positions": {"left_index": 33}}', encoding='utf-8')
+    with pytest.raises(LayoutError, match="повторяющиеся ключи: 'а'"):
+        load_layout_file(str(path))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    layout = get_layout('challenge')
+    path = str(tmp_path / 'copy.json')
+    save_layout_file(path, layout)
+    loaded = load_layout_file(path)
+    assert loaded.name == 'copy'
+    assert loaded.definition() == layout.definition()
+    assert loaded.char_table == layout.char_table
+
+
+def test_toml_layout(tmp_path):
+    (tmp_path / 'mini.toml').write_text(
+        'keys = { "а" = [33, "left_index"] }\n'
+        '[home_positions]\nleft_index = 33\n', encoding='utf-8')
+    layout = load_layout_file(str(tmp_path / 'mini.toml'))
+    assert layout.keys == {'а': (33, 'left_index')}
+
+
+def test_registry_reloads_changed_file(tmp_path):
+    path = tmp_path / 'mini.json'
+    path.write_text(json.dumps(definition()), encoding='utf-8')
+    registry = LayoutRegistry([str(tmp_path)])
+    assert registry.names() == ['mini']
+    first = registry.get('mini')
+    assert registry.get('mini') is first  # неизменённый файл не компилируется заново
+
+    path.write_text(json.dumps(definition(keys={'б': [34, 'left_index']})), encoding='utf-8')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert registry.get('mini').keys == {'б': (34, 'left_index')}
+
+
+def test_registry_later_directory_overrides(tmp_path):
+    override = tmp_path / 'standard.json'
+    override.write_text(json.dumps(definition()), encoding='utf-8')
+    registry = LayoutRegistry([LAYOUTS_DIR, str(tmp_path)])
+    assert registry.get('standard').keys == {'а': (33, 'left_index'), ' ': (57, 'right_thumb')}
+
+
+def test_registry_unknown_and_registered():
+    registry = LayoutRegistry([])
+    with pytest.raises(LayoutError, match="Неизвестная раскладка: nope"):
+        registry.get('nope')
+    layout = registry.register('mine', definition())
+    assert registry.get('mine') is layout
+    assert registry.names() == ['mine']
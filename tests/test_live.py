@@ -0,0 +1,109 @@
+"""Анализ во время набора: посимвольный ввод, нажатия клавиш, отмена и снимки"""
+import pytest
+
+from layout_registry import FINGERS, get_layout, key_penalty
+from live import LiveAnalyzer
+from main import KeyboardAnalyzer, get_common_chars
+
+TEXT = 'Ёлка, «ёж» и Щука: 100% (Ъ)!\nПривет, мир.'
+
+
+@pytest.mark.parametrize('layout', ['standard', 'challenge', 'zubachev'])
+@pytest.mark.parametrize('common', [False, True])
+@pytest.mark.parametrize('capital_shift', [False, True])
+def test_typing_matches_analyze_text(layout, common, capital_shift):
+    common_chars = get_common_chars() if common else None
+    live = LiveAnalyzer(layout, common_chars, capital_shift=capital_shift)
+    for char in TEXT:
+        live.type_char(char)
+    expected = KeyboardAnalyzer(layout, capital_shift).analyze_text(TEXT, 'Набор', common_chars)
+    assert dict(live.snapshot()) == dict(expected)
+
+
+def test_type_char_counts():
+    live = LiveAnalyzer('standard')
+    assert live.type_char('ф') == 1
+    assert live.type_char('€') == 0  # нет в раскладке
+    assert live.type_text('Ая') == 2
+    assert live.snapshot().shift_count == 1
+
+
+def test_press_key_scores_the_pressed_key():
+    # В раскладке Вызов Shift+2 печатает 'ё', которая есть и без Shift на клавише 21
+    layout = get_layout('challenge')
+    live = LiveAnalyzer('challenge', capital_shift=False)
+    assert live.press_key(2, shift=True) == 1
+    result = live.snapshot()
+    assert result.shift_count == 1
+    assert result.finger_counts['left_pinky'] == 1
+    assert result.finger_counts['right_index'] == 0
+    assert result.total_penalty == key_penalty(2, 'left_pinky', layout.home_positions) + 1
+
+    live.reset()
+    assert live.press_key(21) == 1  # та же 'ё' без Shift
+    assert live.snapshot().finger_counts['right_index'] == 1
+    assert live.snapshot().shift_count == 0
+
+
+@pytest.mark.parametrize('layout', ['standard', 'challenge', 'zubachev'])
+def test_press_key_matches_layout(layout):
+    compiled = get_layout(layout)
+    for shift, keys in ((False, compiled.keys), (True, compiled.shift_keys)):
+        for char, (key_code, finger) in keys.items():
+            live = LiveAnalyzer(layout)
+            if live.key_entries[key_code, shift][0] != char:
+                continue  # на клавише слоя несколько символов: печатается последний
+            live.press_key(key_code, shift)
+            result = live.snapshot()
+            assert result.finger_counts[finger] == 1
+            assert result.shift_count == int(shift)
+            assert result.total_penalty == key_penalty(key_code, finger,
+                                                       compiled.home_positions) + int(shift)
+
+
+def test_press_key_capital_letter():
+    live = LiveAnalyzer('standard')
+    assert live.press_key(30, shift=True) == 1  # Shift+ф -> 'Ф'
+    typed = LiveAnalyzer('standard')
+    typed.type_char('Ф')
+    assert dict(live.snapshot()) == dict(typed.snapshot())
+    # Без учёта заглавных у клавиши буквы нет shift-символа
+    assert LiveAnalyzer('standard', capital_shift=False).press_key(30, shift=True) == 0
+
+
+def test_press_key_skips_unknown_and_filtered_keys():
+    live = LiveAnalyzer('standard', common_chars=get_common_chars())
+    assert live.press_key(14) == 0      # клавиша без символа
+    assert live.press_key(43) == 0      # '\\' не входит в общие символы
+    assert live.snapshot().characters_analyzed == 0
+
+
+def test_undo_restores_previous_snapshot():
+    live = LiveAnalyzer('zubachev')
+    live.type_text('Привет')
+    before = dict(live.snapshot())
+    live.type_text(', Мир!')
+    live.press_key(2, shift=True)
+    assert live.undo(7) == 7
+    assert dict(live.snapshot()) == before
+    assert live.undo(100) == 6
+    assert live.snapshot().characters_analyzed == 0
+    assert live.snapshot().finger_counts == dict.fromkeys(FINGERS, 0)
+    assert live.undo() == 0
+
+
+def test_undo_depth_limit():
+    live = LiveAnalyzer('standard', undo_depth=3)
+    live.type_text('абвгд')
+    assert live.undo(10) == 3
+    assert live.snapshot().characters_analyzed == 2
+
+
+def test_snapshot_is_independent():
+    live = LiveAnalyzer('standard')
+    live.type_text('аб')
+    snapshot = live.snapshot('первый')
+    live.type_text('вгд')
+    assert snapshot.text_name == 'первый'
+    assert snapshot.characters_analyzed == 2
+    assert live.snapshot().characters_analyzed == 5
@@ -0,0 +1,88 @@
+"""Частотные таблицы n-грамм: разбор строк и анализ таблицы вместо текста"""
+from collections import Counter
+
+import pytest
+
+from corpus import read_ngram_table
+from main import KeyboardAnalyzer, get_common_chars, load_ngram_table
+from transitions import TransitionAnalyzer
+
+TABLE = ('<html><body>\n'
+         'Частоты символов\n'
+         'о\t1097\n'
+         'О\t15\n'
+         ' \t2000\n'
+         '\t\t7\n'
+         'ст\t320\n'
+         'О,\t4\n'
+         'сто\t99\n'
+         'а\t-3\n'
+         'б\t١٢\n'
+         'в\t 41 \n'
+         '</body></html>\n')
+
+
+@pytest.fixture
+def table_file(tmp_path):
+    path = tmp_path / 'ngrams.txt'
+    path.write_text(TABLE, encoding='utf-8')
+    return str(path)
+
+
+def test_read_ngram_table(table_file):
+    unigrams, pairs, skipped = read_ngram_table(table_file)
+    # Табуляция сама может быть 1-граммой: разделитель - последняя табуляция строки
+    assert unigrams == Counter({'о': 1097, 'О': 15, ' ': 2000, '\t': 7, 'в': 41})
+    assert pairs == Counter({('с', 'т'): 320, ('О', ','): 4})
+    # Разметка, заголовок, 3-грамма, отрицательная и не-ASCII частота
+    assert skipped == 6
+
+
+def test_read_ngram_table_progress(tmp_path):
+    path = tmp_path / 'big.txt'
+    path.write_text('а\t1\n' * 250000, encoding='utf-8')
+    calls = []
+    unigrams, _, _ = read_ngram_table(str(path), progress=lambda done, total: calls.append(
+        (done, total)))
+    assert unigrams == Counter({'а': 250000})
+    assert len(calls) == 2
+    assert all(total == path.stat().st_size and 0 < done <= total for done, total in calls)
+
+
+def test_table_equals_text():
+    # Таблица частот даёт тот же результат, что и текст с такими частотами
+    text = 'Съешь же ещё этих мягких французских булок, да выпей чаю!'
+    unigrams = Counter(text)
+    for layout in ('standard', 'zubachev'):
+        analyzer = KeyboardAnalyzer(layout)
+        for common_chars in (None, get_common_chars()):
+            assert dict(analyzer.analyze_histogram(unigrams, 'таблица', common_chars)) == \
+                dict(analyzer.analyze_text(text, 'таблица', common_chars))
+
+
+def test_analyze_ngram_file(capsys, table_file):
+    analyzer = KeyboardAnalyzer('standard')
+    result = analyzer.analyze_ngram_file(table_file, 'таблица')
+    unigrams, _, _ = read_ngram_table(table_file)
+    assert dict(result) == dict(analyzer.analyze_histogram(unigrams, 'таблица'))
+    assert '5 1-грамм, 2 2-грамм, пропущено строк: 6' in capsys.readouterr().out
+
+    transitions = TransitionAnalyzer(analyzer)
+    assert transitions.analyze_ngram_file(table_file, 'таблица') == transitions.analyze_pairs(
+        Counter({('с', 'т'): 320, ('О', ','): 4}), 'таблица')
+
+
+def test_table_without_ngrams(capsys, tmp_path):
+    path = tmp_path / 'page.html'
+    path.write_text('<html>\nтекст без частот\n</html>\n', encoding='utf-8')
+    assert load_ngram_table(str(path)) is None
+    assert "нет строк вида 'n-грамма<TAB>частота'" in capsys.readouterr().out
+    assert load_ngram_table(str(tmp_path / 'нет.txt')) is None
+    assert 'не найден' in capsys.readouterr().out
+
+
+def test_pairs_only_table(capsys, tmp_path):
+    path = tmp_path / 'pairs.txt'
+    path.write_text('ст\t3\n', encoding='utf-8')
+    assert KeyboardAnalyzer('standard').analyze_ngram_file(str(path), 'пары') is None
+    assert 'нет 1-грамм' in capsys.readouterr().out
@@ -0,0 +1,75 @@
+"""Поиск раскладки: быстрый штраф обмена против полного пересчёта и результат отжига"""
+import random
+
+import pytest
+
+from baseline_layouts import CORPUS
+from corpus import char_histogram, pair_histogram
+from main import KeyboardAnalyzer, get_common_chars
+from optimizer import LayoutSearch, optimize_layout
+from prefilter import fold_case
+
+HISTOGRAM = char_histogram(CORPUS)
+PAIRS = pair_histogram(CORPUS)
+
+
+@pytest.mark.parametrize('layout', ['standard', 'challenge', 'zubachev'])
+@pytest.mark.parametrize('transition_weight', [0, 1, 2.5])
+def test_swap_delta_matches_cost(layout, transition_weight):
+    search = LayoutSearch(HISTOGRAM, layout, get_common_chars(), pairs=PAIRS,
+                          transition_weight=transition_weight)
+    rng = random.Random(3)
+    size = len(search.chars)
+    assignment = list(range(size))
+    rng.shuffle(assignment)
+    for _ in range(200):
+        i, j = rng.sample(range(size), 2)
+        delta = search.swap_delta(assignment, i, j)
+        before = search.cost(assignment)
+        assignment[i], assignment[j] = assignment[j], assignment[i]
+        assert search.cost(assignment) - before == pytest.approx(delta)
+
+
+def test_cost_is_penalty_of_movable_chars():
+    search = LayoutSearch(HISTOGRAM, 'standard', pinned=' ')
+    lowered, _ = fold_case(HISTOGRAM, capital_shift=False)
+    movable = {char: lowered[char] for char in search.chars}
+    expected = KeyboardAnalyzer('standard', capital_shift=False).analyze_histogram(
+        movable, 'подвижные')
+    assert search.cost(list(range(len(search.chars)))) == expected.total_penalty
+    assert ' ' not in search.chars
+
+
+def test_key_codes_limit_slots():
+    search = LayoutSearch(HISTOGRAM, 'standard', key_codes={30, 31, 32})
+    assert sorted(key_code for key_code, _ in search.slots) == [30, 31, 32]
+
+
+def test_anneal_is_reproducible():
+    search = LayoutSearch(HISTOGRAM, 'standard', pairs=PAIRS, transition_weight=1)
+    best, assignment = search.anneal(3000, seed=5)
+    assert sorted(assignment) == list(range(len(search.chars)))
+    assert best == pytest.approx(search.cost(assignment))
+    assert best <= search.cost(list(range(len(search.chars))))
+    assert search.anneal(3000, seed=5) == (best, assignment)
+
+
+def test_no_iterations_keeps_layout():
+    result = optimize_layout(HISTOGRAM, 'zubachev', iterations=0, restarts=1, jobs=1)
+    original = KeyboardAnalyzer('zubachev').analyze_histogram(HISTOGRAM, 'optimized')
+    assert result['keys'] == KeyboardAnalyzer('zubachev').keys
+    assert result['total_penalty'] == original.total_penalty
+
+
+def test_optimize_layout_improves_penalty():
+    result = optimize_layout(HISTOGRAM, 'standard', iterations=5000, restarts=2, jobs=1)
+    original = KeyboardAnalyzer('standard').analyze_histogram(HISTOGRAM, 'исходная')
+    assert result['total_penalty'] < original.total_penalty
+    assert sorted(result['keys'].values()) == sorted(KeyboardAnalyzer('standard').keys.values())
+    assert result['compiled_layout'].name == 'standard-optimized'
+    assert result['seed'] in (0, 1)
+
+
+def test_restarts_must_be_positive():
+    with pytest.raises(ValueError):
+        optimize_layout(HISTOGRAM, restarts=0)
@@ -0,0 +1,56 @@
+"""Параллельное чтение корпусов: куски по границам символов и совпадение с последовательным чтением"""
+import pytest
+
+from baseline_layouts import CORPUS
+from corpus import byte_ranges, file_histogram, parallel_file_histograms, range_histogram
+from main import load_corpora
+
+
+@pytest.fixture
+def corpus_files(tmp_path):
+    """Два файла корпуса: весь CORPUS и его вторая половина"""
+    files = []
+    for name, text in (('first.txt', CORPUS), ('second.txt', CORPUS[len(CORPUS) // 2:])):
+        path = tmp_path / name
+        path.write_text(text, encoding='utf-8')
+        files.append((str(path), name))
+    return files
+
+
+def test_parallel_matches_sequential(corpus_files):
+    sequential = load_corpora(corpus_files, jobs=1)
+    assert load_corpora(corpus_files, jobs=2) == sequential
+    # Мелкие куски: файл делится по границам символов на несколько задач
+    filenames = [filename for filename, _ in corpus_files]
+    assert parallel_file_histograms(filenames, jobs=2, chunk_bytes=4096) == [
+        histogram for _, histogram in sequential]
+
+
+def test_byte_ranges_split_on_characters(tmp_path):
+    # Двухбайтовые буквы и NFD-последовательности: кусок не начинается с середины символа
+    # и не отрывает диакритический знак от буквы, а чамо хангыля - от слога
+    text = 'же\u0308лтый и\u0306од \u1100\u1161\u11a8 ' * 300
+    path = tmp_path / 'nfd.txt'
+    path.write_text(text, encoding='utf-8')
+    ranges = byte_ranges(str(path), chunk_bytes=7)
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(text.encode('utf-8'))
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+
+    total = {}
+    for start, end in ranges:
+        for char, count in range_histogram(str(path), start, end).items():
+            total[char] = total.get(char, 0) + count
+    assert total == file_histogram(str(path))
+
+
+def test_missing_file_reported_in_place(tmp_path, corpus_files):
+    filenames = [corpus_files[0][0], str(tmp_path / 'нет.txt')]
+    first, missing = parallel_file_histograms(filenames, jobs=2)
+    assert first == file_histogram(filenames[0])
+    assert isinstance(missing, OSError)
+
+
+def test_load_corpora_skips_missing_file(tmp_path, corpus_files):
+    files = [(str(tmp_path / 'нет.txt'), 'нет')] + corpus_files
+    assert load_corpora(files, jobs=2) == load_corpora(corpus_files, jobs=1)
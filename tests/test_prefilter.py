@@ -0,0 +1,55 @@
+"""Предварительная фильтрация: NFC, фильтр алфавита и перевод гистограммы в нижний регистр"""
+from collections import Counter
+
+import pytest
+
+from main import get_common_chars
+from prefilter import Prefilter, fold_case, nfc, nfc_chunks, nfc_inert
+
+
+def test_nfc_composes_letters():
+    assert nfc('и\u0306 е\u0308') == 'й ё'
+    text = 'уже в NFC'
+    assert nfc(text) is text
+
+
+@pytest.mark.parametrize('text', [
+    'и\u0306 е\u0308\u0301',
+    '\u1100\u1161\u11a8 \uac00\u11a8',  # '각' из чамо и из слога '가' с конечной согласной
+    '\u0995\u09c7\u09be',                  # бенгальская 'о' из двух знаков гласной
+    '\u2126\u0301 \u212b',
+])
+def test_nfc_chunks_at_every_split(text):
+    for cut in range(len(text) + 1):
+        assert ''.join(nfc_chunks([text[:cut], text[cut:]])) == nfc(text)
+    assert ''.join(nfc_chunks(text)) == nfc(text)  # по одному символу
+
+
+def test_nfc_inert():
+    assert all(nfc_inert(char) for char in 'aZ ё\n\u1100\uac00')
+    assert not any(nfc_inert(char) for char in '\u0306\u1161\u11a8\u09be\u2126')
+
+
+def test_fold_case_counts_capitals():
+    lowered, capitals = fold_case(Counter({'Ё': 2, 'ё': 1, 'A': 3, '!': 4}))
+    assert lowered == Counter({'ё': 3, 'a': 3, '!': 4})
+    assert capitals == Counter({'ё': 2, 'a': 3})
+
+
+def test_fold_case_without_capital_shift():
+    lowered, capitals = fold_case(Counter({'Ё': 2, 'ё': 1}), capital_shift=False)
+    assert lowered == Counter({'ё': 3})
+    assert capitals == Counter()
+
+
+def test_fold_case_multichar_lower():
+    # 'İ'.lower() - два символа, как и в text.lower(); Shift - один
+    lowered, capitals = fold_case(Counter({'İ': 1}))
+    assert lowered == Counter('İ'.lower())
+    assert capitals == Counter({'i': 1})
+
+
+def test_prefilter_keeps_case_and_alphabet():
+    prefilter = Prefilter(get_common_chars())
+    assert prefilter.translate('Ёлка, Q «ёж»!\n') == 'Ёлка,  ёж!'
+    assert prefilter.translate('Е\u0308ж') == 'Ёж'  # NFD приводится к NFC до фильтра
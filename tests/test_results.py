@@ -0,0 +1,95 @@
+"""Компактные результаты анализа: словарь прежнего вида, сложение и таблица в .npy"""
+import pickle
+
+import pytest
+
+from corpus import char_histogram
+from layout_registry import FINGERS
+from main import KeyboardAnalyzer
+from results import RESULT_KEYS, AnalysisResult, ResultTable
+
+TEXT = 'Князь Андрей, «ёж» и €!\n' * 100 + 'край: \U0001f600'
+
+
+def test_result_reads_as_dict():
+    result = KeyboardAnalyzer('standard').analyze_histogram(char_histogram(TEXT), 'корпус')
+    as_dict = result.to_dict()
+    assert list(as_dict) == list(RESULT_KEYS)
+    assert as_dict['total_penalty'] == sum(as_dict['finger_penalties'].values())
+    assert as_dict['average_penalty'] == result.total_penalty / result.characters_analyzed
+    assert as_dict['left_hand_count'] + as_dict['right_hand_count'] <= sum(
+        as_dict['finger_counts'].values())
+    assert as_dict['left_hand_percentage'] + as_dict['right_hand_percentage'] == \
+        pytest.approx(100)
+    with pytest.raises(KeyError):
+        result['totals']
+
+
+def test_result_pickle_and_merge():
+    analyzer = KeyboardAnalyzer('zubachev')
+    half = len(TEXT) // 2
+    first = analyzer.analyze_text(TEXT[:half], 'первая')
+    second = analyzer.analyze_text(TEXT[half:], 'вторая')
+    assert pickle.loads(pickle.dumps(first)) == first
+    merged = first.merge(second, 'корпус')
+    assert dict(merged) == dict(analyzer.analyze_text(TEXT, 'корпус'))
+    with pytest.raises(ValueError):
+        first.merge(KeyboardAnalyzer('standard').analyze_text(TEXT, 'корпус'))
+
+
+def test_empty_result():
+    result = AnalysisResult.from_lists('пусто', 'standard', [0] * len(FINGERS),
+                                       [0] * len(FINGERS), 0, 0)
+    assert result.average_penalty == 0
+    assert result.left_hand_percentage == result.right_hand_percentage == 0
+
+
+def result_table():
+    histogram = char_histogram(TEXT)
+    return ResultTable(KeyboardAnalyzer(layout).analyze_histogram(histogram, name)
+                       for layout in ('standard', 'challenge', 'zubachev')
+                       for name in ('Война и мир', 'корпус'))
+
+
+def test_npy_round_trip(tmp_path):
+    table = result_table()
+    path = str(tmp_path / 'results.npy')
+    table.save_npy(path)
+    loaded = ResultTable.load_npy(path)
+    assert [dict(result) for result in loaded] == [dict(result) for result in table]
+
+
+def test_table_indexing():
+    table = result_table()
+    assert len(table) == 6
+    assert dict(table[-1]) == dict(list(table)[5])
+    with pytest.raises(IndexError):
+        table[6]
+
+
+def test_npy_empty_table(tmp_path):
+    path = str(tmp_path / 'results.npy')
+    ResultTable().save_npy(path)
+    assert len(ResultTable.load_npy(path)) == 0
+
+
+def test_npy_readable_by_numpy(tmp_path):
+    np = pytest.importorskip('numpy')
+    table = result_table()
+    path = str(tmp_path / 'results.npy')
+    table.save_npy(path)
+    records = np.load(path)
+    assert records['text_name'].tolist() == table.text_names
+    assert records['layout'].tolist() == table.layouts
+    for record, result in zip(records, table):
+        assert record['finger_penalties'].tolist() == result.finger_penalty_list.tolist()
+        assert record['finger_counts'].tolist() == result.finger_count_list.tolist()
+        assert int(record['characters_analyzed']) == result.characters_analyzed
+        assert int(record['shift_count']) == result.shift_count
+
+
+def test_npy_rejects_other_files(tmp_path):
+    path = tmp_path / 'results.npy'
+    path.write_bytes(b'not numpy')
+    with pytest.raises(ValueError):
+        ResultTable.load_npy(str(path))
@@ -0,0 +1,88 @@
+"""Оценка раскладок: все пути подсчёта сверяются с исходным посимвольным analyze_text"""
+import pytest
+
+from baseline_layouts import BASELINE_LAYOUTS, CORPUS, baseline_penalty
+from layout_registry import FINGERS
+from main import LAYOUTS, KeyboardAnalyzer, get_common_chars, load_corpora
+
+LAYOUT_NAMES = [layout for layout, _ in LAYOUTS]
+
+
+def baseline_analyze_text(layout, text, text_name, common_chars=None):
+    """Исходный analyze_text на исходных словарях раскладки (baseline_layouts)
+
+    Заглавные буквы здесь Shift не добавляют, поэтому сравнивается
+    с KeyboardAnalyzer(layout, capital_shift=False).
+    """
+    keys, shift_keys, home_positions = BASELINE_LAYOUTS[layout]
+    if common_chars:
+        clean_text = ''.join(c for c in text.lower() if c in common_chars)
+    else:
+        all_chars = set(keys).union(shift_keys)
+        clean_text = ''.join(c for c in text.lower() if c in all_chars)
+
+    penalties = dict.fromkeys(FINGERS, 0)
+    finger_counts = dict.fromkeys(FINGERS, 0)
+    total_penalty = 0
+    shift_count = 0
+    for char in clean_text:
+        if char in keys:
+            key_code, finger = keys[char]
+            penalty = baseline_penalty(key_code, finger, home_positions)
+            penalties[finger] += penalty
+            finger_counts[finger] += 1
+            total_penalty += penalty
+        elif char in shift_keys:
+            key_code, finger = shift_keys[char]
+            key_penalty = baseline_penalty(key_code, finger, home_positions)
+            total_penalty += key_penalty + 1
+            penalties[finger] += key_penalty
+            penalties['left_thumb'] += 1
+            finger_counts[finger] += 1
+            finger_counts['left_thumb'] += 1
+            shift_count += 1
+
+    return {
+        'text_name': text_name,
+        'layout': layout,
+        'total_penalty': total_penalty,
+        'finger_penalties': penalties,
+        'finger_counts': finger_counts,
+        'characters_analyzed': len(clean_text),
+        'shift_count': shift_count,
+    }
+
+
+def assert_matches(result, expected):
+    for key, value in expected.items():
+        assert result[key] == value, key
+
+
+@pytest.mark.parametrize('layout', LAYOUT_NAMES)
+@pytest.mark.parametrize('common', [False, True])
+def test_analyze_text_matches_baseline(layout, common):
+    common_chars = get_common_chars() if common else None
+    analyzer = KeyboardAnalyzer(layout, capital_shift=False)
+    expected = baseline_analyze_text(layout, CORPUS, 'корпус', common_chars)
+    assert_matches(analyzer.analyze_text(CORPUS, 'корпус', common_chars), expected)
+
+
+@pytest.mark.parametrize('layout', LAYOUT_NAMES)
+def test_file_and_histogram_match_text(tmp_path, layout):
+    analyzer = KeyboardAnalyzer(layout)
+    path = tmp_path / 'corpus.txt'
+    path.write_text(CORPUS, encoding='utf-8')
+    expected = dict(analyzer.analyze_text(CORPUS, 'корпус'))
+
+    assert dict(analyzer.analyze_file(str(path), 'корпус')) == expected
+    histogram = dict(load_corpora([(str(path), 'корпус')]))['корпус']
+    assert dict(analyzer.analyze_histogram(histogram, 'корпус')) == expected
+
+
+def test_capitals_add_shift():
+    analyzer = KeyboardAnalyzer('standard')
+    plain = analyzer.analyze_text('привет', 'текст')
+    capital = analyzer.analyze_text('Привет', 'текст')
+    assert capital.shift_count == plain.shift_count + 1
+    assert capital.total_penalty == plain.total_penalty + 1
+    assert capital.characters_analyzed == plain.characters_analyzed
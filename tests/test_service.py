@@ -0,0 +1,151 @@
+"""Локальный сервис анализа: маршруты dispatch и запросы клиента через Unix-сокет"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from baseline_layouts import CORPUS
+from corpus import char_histogram
+from layout_registry import get_layout
+from main import KeyboardAnalyzer, get_common_chars
+from service import AnalysisService, ServiceClient, ServiceError, serve
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = tmp_path / 'корпус.txt'
+    path.write_text(CORPUS, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def service(corpus_file):
+    service = AnalysisService([(corpus_file, 'корпус')], jobs=1, use_cache=False)
+    yield service
+    service.close()
+
+
+def json_round_trip(payload):
+    return json.loads(json.dumps(payload, ensure_ascii=False))
+
+
+def expected_score(layout, common=True, capital_shift=True):
+    analyzer = KeyboardAnalyzer(layout, capital_shift)
+    result = analyzer.analyze_histogram(char_histogram(CORPUS), 'корпус',
+                                        get_common_chars() if common else None)
+    return result.to_dict()
+
+
+@pytest.mark.parametrize('common', [False, True])
+@pytest.mark.parametrize('capital_shift', [False, True])
+def test_score_matches_analyzer(service, common, capital_shift):
+    status, response = asyncio.run(service.dispatch('POST', '/score', json.dumps(
+        {'layout': 'zubachev', 'corpus': 'корпус', 'common_chars': common,
+         'capital_shift': capital_shift})))
+    assert status == 200
+    assert response == expected_score('zubachev', common, capital_shift)
+
+
+def test_corpus_read_once(service):
+    async def run():
+        requests = [service.dispatch('POST', '/score', json.dumps({'layout': layout,
+                                                                   'corpus': 'корпус'}))
+                    for layout in ('standard', 'zubachev', 'standard')]
+        return await asyncio.gather(*requests)
+
+    responses = asyncio.run(run())
+    assert [status for status, _ in responses] == [200, 200, 200]
+    assert responses[0][1] == responses[2][1] == expected_score('standard')
+    # Одновременные запросы ждут одно чтение, дальше гистограмма берётся из памяти
+    assert list(service.histograms) == [('корпус', 'chars')]
+    assert service.loading == {}
+    assert ('analyzer', 'standard', True) in service.compiled
+
+
+def test_custom_layout_and_model(service):
+    definition = get_layout('standard').definition()
+    status, response = asyncio.run(service.dispatch('POST', '/score', json.dumps(
+        {'layout': definition, 'corpus': 'корпус', 'model': 'distance'})))
+    assert status == 200
+    assert response['characters_analyzed'] == expected_score('standard')['characters_analyzed']
+    assert ('корпус', 'pairs') in service.histograms
+
+
+@pytest.mark.parametrize('method, path, body, status, error', [
+    ('GET', '/nope', b'', 404, "Неизвестный адрес: /nope"),
+    ('GET', '/score', b'', 405, "Метод GET не поддерживается для /score"),
+    ('POST', '/score', b'{', 400, "тело запроса - не JSON"),
+    ('POST', '/score', b'[]', 400, "тело запроса - не объект JSON"),
+    ('POST', '/score', b'{"layout": "standard"}', 400, "corpus: id корпуса"),
+    ('POST', '/score', b'{"layout": 1, "corpus": "x"}', 400,
+     "layout: имя раскладки или её описание"),
+    ('POST', '/score', b'{"layout": "standard", "corpus": "x"}', 404, "Неизвестный корпус: x"),
+    ('POST', '/score', b'{"layout": "standard", "corpus": "x", "model": "nope"}', 400,
+     "Неизвестная модель стоимости: nope"),
+    ('POST', '/corpora', b'{"id": "x"}', 400, "нужны поля id и path"),
+])
+def test_errors(service, method, path, body, status, error):
+    assert asyncio.run(service.dispatch(method, path, body)) == (status, {'error': error})
+
+
+def test_missing_file(service, tmp_path):
+    missing = str(tmp_path / 'нет.txt')
+    service.add_corpus('нет', missing)
+    status, response = asyncio.run(service.dispatch('POST', '/score', json.dumps(
+        {'layout': 'standard', 'corpus': 'нет'})))
+    assert (status, response) == (404, {'error': f"Файл {missing} не найден!"})
+    assert service.loading == {}
+
+
+def test_add_corpus_forgets_old_histogram(service, tmp_path):
+    asyncio.run(service.histogram('корпус'))
+    other = tmp_path / 'другой.txt'
+    other.write_text('абв', encoding='utf-8')
+    status, info = asyncio.run(service.dispatch('POST', '/corpora', json.dumps(
+        {'id': 'корпус', 'path': str(other), 'preload': True})))
+    assert status == 200
+    assert (info['loaded'], info['characters'], info['text_name']) == (True, 3, 'другой.txt')
+
+
+@pytest.fixture
+def client(service, tmp_path):
+    """Сервис в отдельном потоке на Unix-сокете во временном каталоге"""
+    socket_path = str(tmp_path / 'service.sock')
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(serve(service, socket_path=socket_path), loop)
+    deadline = time.monotonic() + 10
+    while not (tmp_path / 'service.sock').exists():
+        assert time.monotonic() < deadline, "сервис не запустился"
+        time.sleep(0.01)
+    client = ServiceClient(socket_path=socket_path, timeout=30)
+    yield client
+    client.close()
+
+    async def stop():
+        # Отменяет сервер и открытые соединения и ждёт их завершения
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+
+
+def test_client_over_unix_socket(client):
+    assert 'zubachev' in client.layouts()
+    [info] = client.corpora()
+    assert (info['id'], info['loaded']) == ('корпус', False)
+    for layout in ('standard', 'zubachev'):
+        assert client.score(layout, 'корпус') == json_round_trip(expected_score(layout))
+    assert client.corpora()[0]['characters'] == len(CORPUS)
+    assert client.request('GET', '/health') == {'status': 'ok', 'loaded': 1}
+    with pytest.raises(ServiceError) as error:
+        client.score('standard', 'нет')
+    assert (error.value.status, error.value.message) == (404, "Неизвестный корпус: нет")
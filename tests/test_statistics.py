@@ -0,0 +1,160 @@
+"""Статистика по окнам и сегментам: однопроходные оценки и совпадение с анализом всего файла"""
+import importlib.util
+import os
+import random
+import statistics as reference
+
+import pytest
+
+from conftest import SRC_DIR
+from corpus import file_histogram
+from main import KeyboardAnalyzer, get_common_chars
+
+# src/statistics.py совпадает по имени с модулем стандартной библиотеки
+_spec = importlib.util.spec_from_file_location('keyboard_statistics',
+                                               os.path.join(SRC_DIR, 'statistics.py'))
+keyboard_statistics = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(keyboard_statistics)
+
+RunningStats = keyboard_statistics.RunningStats
+P2Quantile = keyboard_statistics.P2Quantile
+WindowStats = keyboard_statistics.WindowStats
+analyze_segments = keyboard_statistics.analyze_segments
+analyze_windows = keyboard_statistics.analyze_windows
+
+BOOK = ('ТОМ ПЕРВЫЙ\n\nЧАСТЬ ПЕРВАЯ\n\nI\n\n'
+        '— Eh bien, mon prince. Генуя и Лукка — поместья фамилии Бонапарте.\n'
+        'Так говорила в июле 1805 года Анна Павловна Шерер.\n\n\n'
+        '   \n'
+        'Князь Василий всегда говорил лениво!\n\n'
+        'II\n\n'
+        'Анна Павловна кашляла несколько дней; у неё был грипп.\n')
+
+
+@pytest.fixture
+def book_file(tmp_path):
+    path = tmp_path / 'book.txt'
+    path.write_text(BOOK, encoding='utf-8')
+    return str(path)
+
+
+def test_running_stats_matches_statistics():
+    generator = random.Random(1)
+    values = [generator.uniform(0, 10) for _ in range(7)] + [3.5, 0.25, 8.0]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(reference.mean(values))
+    assert stats.variance == pytest.approx(reference.variance(values))
+    assert stats.stddev == pytest.approx(reference.stdev(values))
+    assert (stats.min, stats.max) == (min(values), max(values))
+
+
+def test_running_stats_merge():
+    values = [float(value) for value in range(1, 20)]
+    left, right, whole = RunningStats(), RunningStats(), RunningStats()
+    for value in values[:5]:
+        left.add(value)
+    for value in values[5:]:
+        right.add(value)
+    for value in values:
+        whole.add(value)
+    left.merge(right)
+    left.merge(RunningStats())
+    assert left.count == whole.count
+    assert left.mean == pytest.approx(whole.mean)
+    assert left.variance == pytest.approx(whole.variance)
+    assert (left.min, left.max) == (whole.min, whole.max)
+
+
+def test_p2_quantile_close_to_exact():
+    generator = random.Random(7)
+    values = [generator.gauss(5, 1) for _ in range(5000)]
+    for percentile in (50, 90, 99):
+        estimator = P2Quantile(percentile)
+        for value in values:
+            estimator.add(value)
+        exact = reference.quantiles(values, n=100)[percentile - 1]
+        assert estimator.value == pytest.approx(exact, abs=0.1)
+
+
+def test_p2_quantile_few_values():
+    estimator = P2Quantile(50)
+    assert estimator.value == 0.0
+    for value in (3, 1, 2):
+        estimator.add(value)
+    assert estimator.value == 2
+
+
+@pytest.mark.parametrize('common', [False, True])
+@pytest.mark.parametrize('capital_shift', [False, True])
+def test_windows_match_analyze_histogram(book_file, common, capital_shift):
+    common_chars = get_common_chars() if common else None
+    windows = []
+    summary = analyze_windows(book_file, 'zubachev', 20, common_chars,
+                              on_window=windows.append, capital_shift=capital_shift)
+    assert summary['window_count'] == len(windows) > 3
+    assert [window['characters_analyzed'] for window in windows] == [20] * len(windows)
+
+    # Окно - это те же символы, что и в анализе отрезка текста подряд
+    analyzer = KeyboardAnalyzer('zubachev', capital_shift)
+    allowed = common_chars or set(analyzer.keys).union(analyzer.shift_keys)
+    text = ''.join(char for char in BOOK if char.lower() in allowed)
+    for window in windows:
+        start = window['window_start']
+        expected = analyzer.analyze_text(text[start:start + 20], window['text_name'], common_chars)
+        assert {key: window[key] for key in expected} == dict(expected)
+    assert summary['max_penalty'] == max(window['average_penalty'] for window in windows)
+    assert summary['peak_window']['average_penalty'] == summary['max_penalty']
+
+
+def test_windows_capital_shift():
+    stats = WindowStats('standard', window=4)
+    stats.feed('АБаб')
+    without = WindowStats('standard', window=4, capital_shift=False)
+    without.feed('АБаб')
+    assert stats.peak_window['shift_count'] == 2
+    assert without.peak_window['shift_count'] == 0
+
+
+@pytest.mark.parametrize('by', ['chapter', 'paragraph'])
+@pytest.mark.parametrize('common', [False, True])
+def test_segments_add_up_to_whole_file(book_file, by, common):
+    common_chars = get_common_chars() if common else None
+    segments = list(analyze_segments(book_file, 'standard', by, common_chars))
+    whole = KeyboardAnalyzer('standard').analyze_histogram(
+        file_histogram(book_file), 'book', common_chars)
+    for key in ('characters_analyzed', 'total_penalty', 'shift_count'):
+        assert sum(segment[key] for segment in segments) == whole[key]
+    for finger in whole.finger_counts:
+        assert sum(segment['finger_counts'][finger] for segment in segments) == \
+            whole.finger_counts[finger]
+
+
+def test_chapter_segments(book_file):
+    segments = list(analyze_segments(book_file, 'standard', 'chapter'))
+    assert [segment['text_name'] for segment in segments] == [
+        'ТОМ ПЕРВЫЙ', 'ЧАСТЬ ПЕРВАЯ', 'I', 'II']
+    assert [segment['segment_index'] for segment in segments] == [0, 1, 2, 3]
+    # Заголовок считается в главе, которую открывает
+    assert segments[3]['characters_analyzed'] == sum(
+        KeyboardAnalyzer('standard').analyze_text(text, 'II').characters_analyzed
+        for text in ('II\n\n', 'Анна Павловна кашляла несколько дней; у неё был грипп.\n'))
+
+
+def test_paragraph_segments(book_file):
+    segments = list(analyze_segments(book_file, 'standard', 'paragraph'))
+    assert [segment['text_name'] for segment in segments] == [
+        f"Абзац {number}" for number in range(1, 8)]
+    # Две строки подряд - один абзац, пустые строки и строка из пробелов - в нём же
+    paragraph = ('— Eh bien, mon prince. Генуя и Лукка — поместья фамилии Бонапарте.\n'
+                 'Так говорила в июле 1805 года Анна Павловна Шерер.\n\n\n   \n')
+    expected = KeyboardAnalyzer('standard').analyze_text(paragraph, 'Абзац 4')
+    assert {key: segments[3][key] for key in expected} == dict(expected)
+
+
+def test_segments_of_empty_file(tmp_path):
+    path = tmp_path / 'empty.txt'
+    path.write_text('', encoding='utf-8')
+    assert list(analyze_segments(str(path), 'standard', 'paragraph')) == []
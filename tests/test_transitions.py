@@ -0,0 +1,94 @@
+"""Переходы между клавишами: таблицы пар против прямого подсчёта по соседним символам текста"""
+import pytest
+
+from baseline_layouts import BASELINE_LAYOUTS, CORPUS, KEYBOARD_MAP
+from corpus import file_pair_histogram, pair_histogram
+from main import FINGERS, KeyboardAnalyzer, get_common_chars
+from transitions import TransitionAnalyzer
+
+LAYOUT_NAMES = list(BASELINE_LAYOUTS)
+
+
+def baseline_transitions(layout, text, common_chars=None):
+    """Метрики переходов прямым проходом по парам соседних символов"""
+    keys, shift_keys, _ = BASELINE_LAYOUTS[layout]
+    positions = dict(shift_keys)
+    positions.update(keys)
+    allowed_chars = common_chars if common_chars else positions
+    text = text.lower()
+
+    counts = dict.fromkeys(['pair_count', 'same_finger_count', 'hand_alternation_count',
+                            'row_jump_count'], 0)
+    hand_pairs = 0
+    travel = dict.fromkeys(FINGERS, 0)
+    for first, second in zip(text, text[1:]):
+        if first not in allowed_chars or second not in allowed_chars:
+            continue
+        if first not in positions or second not in positions:
+            continue
+        counts['pair_count'] += 1
+        (first_code, first_finger), (second_code, second_finger) = (positions[first],
+                                                                    positions[second])
+        first_row, first_col = KEYBOARD_MAP[first_code]
+        second_row, second_col = KEYBOARD_MAP[second_code]
+        if 'thumb' in first_finger or 'thumb' in second_finger:
+            continue
+        hand_pairs += 1
+        same_hand = first_finger.split('_')[0] == second_finger.split('_')[0]
+        counts['hand_alternation_count'] += not same_hand
+        counts['row_jump_count'] += same_hand and abs(first_row - second_row) >= 2
+        if first_finger == second_finger and first_code != second_code:
+            counts['same_finger_count'] += 1
+            travel[first_finger] += abs(first_row - second_row) + abs(first_col - second_col)
+    counts['finger_travel'] = travel
+    counts['total_travel'] = sum(travel.values())
+    return counts, hand_pairs
+
+
+@pytest.mark.parametrize('layout', LAYOUT_NAMES)
+@pytest.mark.parametrize('common', [False, True])
+def test_pairs_match_baseline(layout, common):
+    common_chars = get_common_chars() if common else None
+    transitions = TransitionAnalyzer(KeyboardAnalyzer(layout))
+    result = transitions.analyze_pairs(pair_histogram(CORPUS), 'корпус', common_chars)
+    expected, hand_pairs = baseline_transitions(layout, CORPUS, common_chars)
+    for key, value in expected.items():
+        assert result[key] == value, key
+    assert result['hand_alternation_percentage'] == pytest.approx(
+        expected['hand_alternation_count'] / hand_pairs * 100)
+    assert result['layout'] == layout
+
+
+def test_same_finger_and_alternation():
+    transitions = TransitionAnalyzer(KeyboardAnalyzer('standard'))
+    # 'ф' и 'я' - левый мизинец (ряд 2 -> ряд 3), 'ф' и 'о' - разные руки
+    result = transitions.analyze_pairs(pair_histogram('фяфо'), 'текст')
+    assert result['pair_count'] == 3
+    assert result['same_finger_count'] == 2
+    assert result['finger_travel']['left_pinky'] == 2
+    assert result['hand_alternation_count'] == 1
+    # Пробел - большой палец: пара считается, но не входит в чередование рук
+    spaced = transitions.analyze_pairs(pair_histogram('ф о'), 'текст')
+    assert spaced['pair_count'] == 2
+    assert spaced['hand_alternation_percentage'] == 0
+
+
+def test_pair_broken_by_foreign_char():
+    transitions = TransitionAnalyzer(KeyboardAnalyzer('standard'))
+    assert transitions.analyze_pairs(pair_histogram('ф€ф'), 'текст')['pair_count'] == 0
+    assert transitions.analyze_pairs(pair_histogram('Фф'), 'текст')['same_finger_count'] == 0
+
+
+def test_file_pairs_across_chunks(tmp_path):
+    path = tmp_path / 'corpus.txt'
+    path.write_text(CORPUS, encoding='utf-8')
+    assert file_pair_histogram(str(path), chunk_size=1000) == pair_histogram(CORPUS)
+    transitions = TransitionAnalyzer(KeyboardAnalyzer('zubachev'))
+    assert transitions.analyze_file(str(path), 'корпус') == transitions.analyze_pairs(
+        pair_histogram(CORPUS), 'корпус')
+
+
+def test_missing_file(capsys, tmp_path):
+    transitions = TransitionAnalyzer(KeyboardAnalyzer('standard'))
+    assert transitions.analyze_file(str(tmp_path / 'нет.txt'), 'нет') is None
+    assert 'ОШИБКА' in capsys.readouterr().out